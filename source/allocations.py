@@ -0,0 +1,157 @@
+'''
+allocation benchmark: runs the scene headlessly under tracemalloc and reports, per steady-state frame and phase,
+transient bytes (peak above the phase start), and live bytes gained over all measured frames (must be none)
+
+    step: one simulation step
+    frame_state: interpolated render snapshot of the scene
+    render: what Window.play draws for the scene (window.render_scene_no_camera_offset) to an offscreen surface,
+            dirty rects collected like DirtyRectCompositor does
+
+no phase creates numpy temporaries in steady state, what is left are python objects that can not be avoided
+from python, TRANSIENT_BOUNDS adds them up from their sizes (64 bit CPython 3.11, numpy 2, see the constants),
+the worst frame of a phase has to stay inside them
+
+    python source/allocations.py --enemies 100 --frames 300
+    python source/allocations.py --top 10   # also list the source lines that retain memory
+'''
+import gc
+import sys
+import argparse
+import tracemalloc
+import numpy as np
+import pygame
+
+import kernels
+from headless import HeadlessRunner, ScriptedInput
+from scene import Scene, WINDOW_WIDTH, WINDOW_HEIGHT
+from compositor import DirtyRectCompositor
+from window import render_scene_no_camera_offset
+
+MEASURED_PHASES = ('step', 'frame_state', 'render')
+PHASE_STEP, PHASE_FRAME_STATE, PHASE_RENDER = range(len(MEASURED_PHASES))
+
+# object sizes the bounds are made of
+SCALAR_BYTES = 32  # python float / int object, see live_bytes
+VIEW_BYTES = 136  # ndarray view object with its shape / strides (2-D: 129 bytes measured, 1-D: 113)
+LIST_BYTES = 56  # empty list object
+NUMBA_CALL_BYTES = 512  # boxed arguments and type fingerprint of one kernel call (240-370 bytes measured
+                        # for 5-14 arguments), freed on return, calls never overlap
+# a step rebinds player cooldowns / timers, hitpoints, counters and spawner time (new object before the old is freed)
+STEP_BYTES = NUMBA_CALL_BYTES + 8 * SCALAR_BYTES
+# spawning a single enemy: numpy runs in place ufuncs on one-row arrays through its generic path (~1.1 KB)
+SPAWN_BYTES = 1280
+# 7 read-only views handed out in FrameState (4 2-D, 3 1-D) + the FrameState object (105 bytes)
+# + the slice read_only views, alive while the view is made
+FRAME_STATE_BYTES = 8 * VIEW_BYTES + 112
+# kernel call of ViewTransform.project_circles, the corner / radius slices it returns and the list headers
+# of corners.tolist(), the blits result and the over-allocation of the dirty rect list
+RENDER_BYTES = NUMBA_CALL_BYTES + 2 * VIEW_BYTES + 4 * LIST_BYTES
+# per drawn sprite: [x, y] list of corners.tolist() (72) with two floats (2 * 24) and its outer list slot (8),
+# the (sprite, [x, y]) blits entry (56) with its slot (8), the Rect blits returns (40) with its slot (8),
+# and its slot in the dirty rect list (8)
+RENDER_BYTES_PER_SPRITE = 72 + 2 * 24 + 8 + 56 + 8 + 40 + 8 + 8
+TRANSIENT_BOUNDS = (STEP_BYTES + SPAWN_BYTES, FRAME_STATE_BYTES, RENDER_BYTES)
+# frames right after gc.collect refill the interpreter free lists it emptied, they are not measured
+REFILL_FRAMES = 10
+
+
+def measure_frames(runner: HeadlessRunner, surface: pygame.Surface, transient: np.array, sprites: np.array) -> None:
+    '''
+    fills transient bytes of every frame and phase (n_frames, len(MEASURED_PHASES)) and sprites drawn per frame
+    (dirty rects of the render phase), tracemalloc must be tracing
+    '''
+    scene = runner.scene
+    compositor = DirtyRectCompositor()
+    compositor.full_redraw = False
+    for frame in range(len(sprites)):
+        # dirty rects of the frame are kept until the next frame is drawn, as in Window.play
+        compositor.previous_rects, compositor.current_rects = compositor.current_rects, compositor.previous_rects
+        compositor.current_rects.clear()
+        for phase in range(len(MEASURED_PHASES)):
+            start, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            if phase == PHASE_STEP:
+                scene.store_previous_state()
+                runner.step()
+            elif phase == PHASE_FRAME_STATE:
+                frame_state = scene.frame_state(0.5)
+            else:
+                render_scene_no_camera_offset(surface, frame_state, compositor.current_rects)
+            _, peak = tracemalloc.get_traced_memory()
+            transient[frame, phase] = peak - start
+        sprites[frame] = len(compositor.current_rects)
+
+
+def live_snapshot() -> tracemalloc.Snapshot:
+    # a full collection also empties the interpreter free lists, what is traced after it is live memory
+    gc.collect()
+    return tracemalloc.take_snapshot()
+
+
+def live_bytes(snapshot: tracemalloc.Snapshot) -> int:
+    # blocks up to the size of a python float / int are left out: scene scalars (cooldowns, timers, counters)
+    # are rebound to new objects every step and can switch between cached and allocated ints,
+    # so are the snapshots themselves
+    return sum(
+        trace.size for trace in snapshot.traces
+        if trace.size > SCALAR_BYTES and trace.traceback[0].filename != tracemalloc.__file__
+    )
+
+
+def run(n_enemies: int, n_frames: int, warmup_frames: int, top: int, seed: int = 0) -> bool:
+    kernels.warmup()
+    transient = np.zeros((warmup_frames + n_frames, len(MEASURED_PHASES)), dtype=np.int64)
+    sprites = np.zeros(warmup_frames + n_frames, dtype=np.int64)
+    # traced from before the scene exists, objects the measured frames replace are traced too
+    tracemalloc.start()
+    scene = Scene(seed)
+    scene.max_enemies = n_enemies
+    runner = HeadlessRunner(scene, ScriptedInput())
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    # warmup fills the enemy population, grows every scratch buffer to its steady-state size,
+    # compiles the lazily jitted kernels and rasterizes the sprites
+    warmup = slice(0, warmup_frames - REFILL_FRAMES)
+    refill = slice(warmup.stop, warmup_frames)
+    measured = slice(warmup_frames, warmup_frames + n_frames)
+    measure_frames(runner, surface, transient[warmup], sprites[warmup])
+
+    before = live_snapshot()
+    measure_frames(runner, surface, transient[refill], sprites[refill])
+    measure_frames(runner, surface, transient[measured], sprites[measured])
+    after = live_snapshot()
+    tracemalloc.stop()
+    retained = live_bytes(after) - live_bytes(before)
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    lines = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')[:top] if top > 0 else []
+
+    transient, sprites = transient[measured], sprites[measured]
+    bounds = np.array(TRANSIENT_BOUNDS, dtype=np.int64)[None, :].repeat(n_frames, axis=0)
+    bounds[:, PHASE_RENDER] += RENDER_BYTES_PER_SPRITE * sprites
+    within = (transient <= bounds).sum(axis=0)
+    print(f'enemies: {n_enemies} frames: {n_frames} sprites/frame median: {int(np.median(sprites))}')
+    for phase, name in enumerate(MEASURED_PHASES):
+        phase_transient = transient[:, phase]
+        print(f'{name:12} transient bytes/frame  median: {int(np.median(phase_transient))} '
+              f'p99: {int(np.percentile(phase_transient, 99))} max: {int(phase_transient.max())}  '
+              f'within bound: {within[phase]}/{n_frames}')
+    print(f'bounds: {TRANSIENT_BOUNDS} bytes + {RENDER_BYTES_PER_SPRITE} bytes/drawn sprite in render')
+    print(f'retained bytes after {n_frames} frames: {max(retained, 0)}')
+    for stat in lines:
+        print(f'  {stat}')
+    return bool((within == n_frames).all()) and retained <= 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scene allocation benchmark')
+    parser.add_argument('--enemies', type=int, default=100)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=300, help=f'at least REFILL_FRAMES ({REFILL_FRAMES})')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top', type=int, default=0, help='list the top retaining source lines')
+    args = parser.parse_args(argv)
+    ok = run(args.enemies, args.frames, args.warmup, args.top, args.seed)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,27 +1,257 @@
 import numpy as np
-import numpy.linalg as linalg
-import numba
 import pygame
-import copy
-import ctypes
+
+from typing import List
+from kernels import kernel
+from scene import OPENGL_TO_SCREEN_SCALE, OPENGL_TO_SCREEN_OFFSET
+
+PARTICLE_CAPACITY = 1 << 15
+
+PARTICLE_KIND_BACKGROUND = 0
+PARTICLE_KIND_DEATH = 1
+
+DEATH_EFFECT_PARTICLES = 48
+DEATH_EFFECT_SPEED = (0.2, 0.9)  # gl units per second
+DEATH_EFFECT_LIFETIME = (0.25, 0.7)
+DEATH_EFFECT_COLORS = np.array([(255, 60, 20), (255, 140, 0), (255, 220, 120)], dtype=np.uint8)
+
+BG_SPAWN_RATE = 60.0  # particles per second
+BG_SPEED = 0.05
+BG_LIFETIME = (2.0, 5.0)
+BG_COLOR = np.array([90, 90, 120], dtype=np.uint8)
+
+PARTICLE_DRAG = 1.5  # velocity decays as exp(-drag * t)
+# dirty rects are reported per occupied tile of this size (px), particles of a burst share tiles,
+# sparse ambient particles get one small rect each instead of one rect spanning the screen
+PARTICLE_DIRTY_TILE = 4
+# above this many occupied tiles, rects are row runs of coarse tiles (PARTICLE_COARSE_TILES fine tiles wide),
+# sparse ambient particles (at most bg_max_particles) stay under it, dense death bursts go over
+PARTICLE_DIRTY_RECTS = 512
+PARTICLE_COARSE_TILES = 8
+PIXEL_DTYPES = {1: np.uint8, 2: np.uint16, 4: np.uint32}
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.ones(2, dtype=np.float32), np.zeros((2, 3), dtype=np.uint8), np.zeros(2, dtype=np.uint8),
+    2, np.float32(0.01), np.float32(0.99)
+))
+def step_particles(gl_pos, velocity, lifetime, max_lifetime, color, kind, n, dt, damping):
+    '''
+    integrates particles [0, n) and compacts the alive ones to the front in the same pass, returns new count
+    '''
+    alive = 0
+    for i in range(n):
+        life = lifetime[i] - dt
+        if life <= 0:
+            continue
+        velocity[i, 0] *= damping
+        velocity[i, 1] *= damping
+        gl_pos[alive, 0] = gl_pos[i, 0] + velocity[i, 0] * dt
+        gl_pos[alive, 1] = gl_pos[i, 1] + velocity[i, 1] * dt
+        velocity[alive, 0] = velocity[i, 0]
+        velocity[alive, 1] = velocity[i, 1]
+        lifetime[alive] = life
+        max_lifetime[alive] = max_lifetime[i]
+        color[alive, 0] = color[i, 0]
+        color[alive, 1] = color[i, 1]
+        color[alive, 2] = color[i, 2]
+        kind[alive] = kind[i]
+        alive += 1
+    return alive
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.zeros((2, 3), dtype=np.uint8), 2, OPENGL_TO_SCREEN_SCALE, OPENGL_TO_SCREEN_OFFSET,
+    np.zeros(3, dtype=np.int64), np.zeros(3, dtype=np.int64), np.zeros(64, dtype=np.uint32), 8, 8, 8,
+    np.zeros(9, dtype=np.uint8), np.zeros(9, dtype=np.int32), np.zeros((9, 4), dtype=np.int32)
+))
+def draw_particles(gl_pos, lifetime, max_lifetime, color, n, scale, offset, shifts, losses,
+                   pixels, pitch, width, height, tile_marks, tiles, rects):
+    '''
+    writes particles [0, n) as 2x2 px, faded by lifetime, into pixels (flat surface buffer, pitch in pixels)
+    and fills rects with dirty rects (x, y, w, h), returns their count
+    tile_marks: zeroed (tiles_x * tiles_y) grid of PARTICLE_DIRTY_TILE tiles, zeroed again before returning
+    tiles: scratch for occupied tile indices, same size as tile_marks
+    '''
+    tiles_y = height // PARTICLE_DIRTY_TILE + 1
+    n_tiles = 0
+    for i in range(n):
+        x = np.int32(gl_pos[i, 0] * scale[0] + offset[0])
+        y = np.int32(gl_pos[i, 1] * scale[1] + offset[1])
+        if x < 0 or x >= width - 1 or y < 0 or y >= height - 1:
+            continue
+        fade = lifetime[i] / max_lifetime[i]
+        mapped = 0
+        for channel in range(3):
+            value = np.uint32(color[i, channel] * fade)
+            mapped |= (value >> losses[channel]) << shifts[channel]
+        p = y * pitch + x
+        pixels[p] = mapped
+        pixels[p + 1] = mapped
+        pixels[p + pitch] = mapped
+        pixels[p + pitch + 1] = mapped
+        tile = (x // PARTICLE_DIRTY_TILE) * tiles_y + y // PARTICLE_DIRTY_TILE
+        if tile_marks[tile] == 0:
+            tile_marks[tile] = 1
+            tiles[n_tiles] = tile
+            n_tiles += 1
+
+    # a particle starting in a tile reaches at most 1 px into the next one
+    k = 0
+    if n_tiles <= PARTICLE_DIRTY_RECTS:
+        for t in range(n_tiles):
+            tile = tiles[t]
+            tile_marks[tile] = 0
+            rects[k, 0] = (tile // tiles_y) * PARTICLE_DIRTY_TILE
+            rects[k, 1] = (tile % tiles_y) * PARTICLE_DIRTY_TILE
+            rects[k, 2] = PARTICLE_DIRTY_TILE + 1
+            rects[k, 3] = PARTICLE_DIRTY_TILE + 1
+            k += 1
+        return k
+    # many tiles: coarse tiles (marked in the head of tile_marks), merged into runs along every coarse row
+    for t in range(n_tiles):
+        tile_marks[tiles[t]] = 0
+    coarse_size = PARTICLE_DIRTY_TILE * PARTICLE_COARSE_TILES
+    coarse_x = width // coarse_size + 1
+    coarse_y = height // coarse_size + 1
+    for t in range(n_tiles):
+        tile = tiles[t]
+        cx = (tile // tiles_y) // PARTICLE_COARSE_TILES
+        cy = (tile % tiles_y) // PARTICLE_COARSE_TILES
+        tile_marks[cy * coarse_x + cx] = 1
+    for cy in range(coarse_y):
+        cx = 0
+        while cx < coarse_x:
+            if tile_marks[cy * coarse_x + cx] == 0:
+                cx += 1
+                continue
+            run_start = cx
+            while cx < coarse_x and tile_marks[cy * coarse_x + cx] == 1:
+                tile_marks[cy * coarse_x + cx] = 0
+                cx += 1
+            rects[k, 0] = run_start * coarse_size
+            rects[k, 1] = cy * coarse_size
+            rects[k, 2] = (cx - run_start) * coarse_size + 1
+            rects[k, 3] = coarse_size + 1
+            k += 1
+    return k
 
 
 class Animation: 
+    '''
+    particle engine: struct-of-arrays pool (position, velocity, lifetime, colour) with dense [0, count) rows,
+    one batched kernel call per update and one per draw
+    '''
 
-    def __init__(self) -> None:
-        self.bg_max_particles = 0
+    def __init__(self, capacity: int = PARTICLE_CAPACITY, seed: int = None) -> None:
+        self.capacity = capacity
+        self.max_particles = capacity  # soft cap, can be lowered at runtime
+        self.bg_max_particles = 512
+        self.count = 0
+        self.gl_pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocity = np.zeros((capacity, 2), dtype=np.float32)
+        self.lifetime = np.zeros(capacity, dtype=np.float32)  # seconds left
+        self.max_lifetime = np.ones(capacity, dtype=np.float32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.kind = np.zeros(capacity, dtype=np.uint8)
+        # visual only, not part of the deterministic simulation
+        self.rng = np.random.default_rng(seed)
+        self.bg_spawn_debt = 0.0
+        # draw scratch, sized for the target surface on first draw
+        self.tile_marks = np.zeros(0, dtype=np.uint8)
+        self.tiles = np.zeros(0, dtype=np.int32)
+        self.dirty_rects = np.zeros((0, 4), dtype=np.int32)
+        self.shifts = np.zeros(3, dtype=np.int64)
+        self.losses = np.zeros(3, dtype=np.int64)
 
-    def create_enemy_death_effect(self):
-        # expolosion with particles
-        ...
-    
-    def remove_enemy_death_effect(self):
-        ...
+    def __len__(self) -> int:
+        return self.count
+
+    def emit(self, gl_pos: np.array, velocity: np.array, lifetime: np.array, color: np.array, kind: int) -> int:
+        '''
+        appends particles (arrays of equal length, colour can be one rgb), drops what does not fit, returns number emitted
+        '''
+        k = min(len(gl_pos), min(self.max_particles, self.capacity) - self.count)
+        if k <= 0:
+            return 0
+        rows = slice(self.count, self.count + k)
+        self.gl_pos[rows] = gl_pos[:k]
+        self.velocity[rows] = velocity[:k]
+        self.lifetime[rows] = lifetime[:k]
+        self.max_lifetime[rows] = lifetime[:k]
+        self.color[rows] = color[:k] if color.ndim == 2 else color
+        self.kind[rows] = kind
+        self.count += k
+        return k
+
+    def create_enemy_death_effect(self, dead_gl_pos: np.array, particles_per_enemy: int = DEATH_EFFECT_PARTICLES):
+        # expolosion with particles, all dead enemies of the step in one batch
+        if len(dead_gl_pos) == 0:
+            return
+        n = len(dead_gl_pos) * particles_per_enemy
+        angle = self.rng.random(n, dtype=np.float32) * np.float32(2 * np.pi)
+        speed = self.rng.uniform(*DEATH_EFFECT_SPEED, size=n).astype(np.float32)
+        velocity = np.stack((np.cos(angle) * speed, np.sin(angle) * speed), axis=1)
+        gl_pos = np.repeat(dead_gl_pos.astype(np.float32), particles_per_enemy, axis=0)
+        lifetime = self.rng.uniform(*DEATH_EFFECT_LIFETIME, size=n).astype(np.float32)
+        color = DEATH_EFFECT_COLORS[self.rng.integers(0, len(DEATH_EFFECT_COLORS), size=n)]
+        self.emit(gl_pos, velocity, lifetime, color, PARTICLE_KIND_DEATH)
     
-    def background(self):
+    def background(self, dt: float):
         # lonely chaotic particles appear and disappear
-        ...
-
+        self.bg_spawn_debt += BG_SPAWN_RATE * dt
+        n = int(self.bg_spawn_debt)
+        if n == 0:
+            return
+        self.bg_spawn_debt -= n
+        n_background = int(np.count_nonzero(self.kind[:self.count] == PARTICLE_KIND_BACKGROUND))
+        n = min(n, self.bg_max_particles - n_background)
+        if n <= 0:
+            return
+        gl_pos = self.rng.uniform(-1, 1, size=(n, 2)).astype(np.float32)
+        velocity = self.rng.uniform(-BG_SPEED, BG_SPEED, size=(n, 2)).astype(np.float32)
+        lifetime = self.rng.uniform(*BG_LIFETIME, size=n).astype(np.float32)
+        self.emit(gl_pos, velocity, lifetime, BG_COLOR, PARTICLE_KIND_BACKGROUND)
 
     def update_state(self, dt: float):
-        ...
+        self.background(dt)
+        if self.count == 0:
+            return
+        damping = np.float32(np.exp(-PARTICLE_DRAG * dt))
+        self.count = step_particles(
+            self.gl_pos, self.velocity, self.lifetime, self.max_lifetime, self.color, self.kind,
+            self.count, np.float32(dt), damping
+        )
+
+    def draw(self, screen_ptr: pygame.Surface) -> List[pygame.Rect]:
+        '''
+        writes all particles (2x2 px, fading with lifetime) straight into screen pixels in one kernel call,
+        returns dirty rects of drawn particles: one per occupied PARTICLE_DIRTY_TILE tile, or row runs
+        of coarse tiles above PARTICLE_DIRTY_RECTS tiles
+        '''
+        n = self.count
+        bytesize = screen_ptr.get_bytesize()
+        if n == 0 or bytesize not in PIXEL_DTYPES:
+            return []
+        width, height = screen_ptr.get_size()
+        n_tiles = (width // PARTICLE_DIRTY_TILE + 1) * (height // PARTICLE_DIRTY_TILE + 1)
+        if len(self.tile_marks) != n_tiles:
+            self.tile_marks = np.zeros(n_tiles, dtype=np.uint8)
+            self.tiles = np.zeros(n_tiles, dtype=np.int32)
+            coarse_size = PARTICLE_DIRTY_TILE * PARTICLE_COARSE_TILES
+            n_coarse = (width // coarse_size + 1) * (height // coarse_size + 1)
+            self.dirty_rects = np.zeros((max(PARTICLE_DIRTY_RECTS, n_coarse), 4), dtype=np.int32)
+        self.shifts[:] = screen_ptr.get_shifts()[:3]
+        self.losses[:] = screen_ptr.get_losses()[:3]
+
+        buffer = screen_ptr.get_buffer()  # locks the surface until released
+        pixels = np.frombuffer(buffer, dtype=PIXEL_DTYPES[bytesize])
+        k = draw_particles(
+            self.gl_pos, self.lifetime, self.max_lifetime, self.color, n,
+            OPENGL_TO_SCREEN_SCALE, OPENGL_TO_SCREEN_OFFSET, self.shifts, self.losses,
+            pixels, screen_ptr.get_pitch() // bytesize, width, height, self.tile_marks, self.tiles, self.dirty_rects
+        )
+        del pixels, buffer  # unlocks surface
+        return [pygame.Rect(*rect) for rect in self.dirty_rects[:k].tolist()]
@@ -0,0 +1,145 @@
+'''
+asset manager: catalogues assets/, reads and decodes files on a worker thread during startup,
+converts surfaces to display format once on the main thread and caches everything by key
+(key is path relative to assets folder, e.g. "Play Rect.png" or "music/Doom.mp3")
+'''
+import io
+import os
+import time
+import pygame
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, Tuple
+
+ASSETS_FOLDER = 'assets/'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+FONT_EXTENSIONS = ('.ttf', '.otf')
+SOUND_EXTENSIONS = ('.ogg', '.wav', '.mp3')
+# longer audio is streamed (see music.py) instead of decoded into memory
+SOUND_STREAM_THRESHOLD_BYTES = 512 * 1024
+
+
+def asset_kind(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return 'image'
+    if extension in FONT_EXTENSIONS:
+        return 'font'
+    if extension in SOUND_EXTENSIONS:
+        is_long = os.path.getsize(path) > SOUND_STREAM_THRESHOLD_BYTES
+        return 'music' if is_long or 'music' in path.split(os.sep) else 'sound'
+    return 'other'
+
+
+class AssetManager:
+
+    def __init__(self, root: str = ASSETS_FOLDER) -> None:
+        self.root = root
+        self.catalogue: Dict[str, Tuple[str, str]] = {}  # key -> (kind, path)
+        self.images: Dict[str, pygame.Surface] = {}
+        self.sounds: Dict[str, pygame.mixer.Sound] = {}
+        self.font_data: Dict[str, bytes] = {}
+        self.load_times: Dict[str, float] = {}  # key -> seconds (worker load + main thread conversion)
+        self.pending: Dict[str, Future] = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='asset-loader')
+        self.startup_started = 0.0
+        self.startup_seconds = 0.0
+        self.catalogue_assets()
+
+    def catalogue_assets(self) -> None:
+        for folder, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                path = os.path.join(folder, file_name)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                self.catalogue[key] = (asset_kind(path), path)
+
+    # ===== worker thread
+    def load_on_worker(self, key: str):
+        kind, path = self.catalogue[key]
+        t_start = time.perf_counter()
+        if kind == 'image':
+            asset = pygame.image.load(path)
+        elif kind == 'sound':
+            asset = pygame.mixer.Sound(path)
+        else:
+            with open(path, 'rb') as f:
+                asset = f.read()
+        return asset, time.perf_counter() - t_start
+
+    def start_preload(self) -> None:
+        '''
+        queue every image, font and short sound of the catalogue (music is streamed and skipped)
+        '''
+        self.startup_started = time.perf_counter()
+        for key, (kind, _) in self.catalogue.items():
+            if kind in ('image', 'font', 'sound') and key not in self.pending:
+                self.pending[key] = self.executor.submit(self.load_on_worker, key)
+
+    # ===== main thread
+    def finish(self, key: str) -> None:
+        kind, _ = self.catalogue[key]
+        asset, load_seconds = self.pending.pop(key).result()
+        t_start = time.perf_counter()
+        if kind == 'image':
+            # converted once to display pixel format, blits are then plain copies
+            has_alpha = asset.get_flags() & pygame.SRCALPHA or asset.get_alpha() is not None
+            asset = asset.convert_alpha() if has_alpha else asset.convert()
+            self.images[key] = asset
+        elif kind == 'sound':
+            self.sounds[key] = asset
+        elif kind == 'font':
+            self.font_data[key] = asset
+        self.load_times[key] = load_seconds + time.perf_counter() - t_start
+
+    def poll(self) -> bool:
+        '''
+        finishes assets loaded by worker so far without waiting, returns True when everything is loaded
+        '''
+        for key in [key for key, future in self.pending.items() if future.done()]:
+            self.finish(key)
+        is_ready = len(self.pending) == 0
+        if is_ready and self.startup_seconds == 0.0 and self.startup_started > 0.0:
+            self.startup_seconds = time.perf_counter() - self.startup_started
+        return is_ready
+
+    def progress(self) -> float:
+        total = len(self.pending) + len(self.load_times)
+        return 1.0 if total == 0 else len(self.load_times) / total
+
+    def wait(self, key: str) -> None:
+        if key in self.pending:
+            self.finish(key)
+
+    def image(self, key: str) -> pygame.Surface:
+        if key not in self.images:
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(self.load_on_worker, key)
+            self.wait(key)
+        return self.images[key]
+
+    def sound(self, key: str) -> pygame.mixer.Sound:
+        if key not in self.sounds:
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(self.load_on_worker, key)
+            self.wait(key)
+        return self.sounds[key]
+
+    def font_file(self, key: str) -> io.BytesIO:
+        # new file object for every pygame.font.Font (SDL_ttf keeps reading from it)
+        if key not in self.font_data:
+            if key not in self.pending:
+                self.pending[key] = self.executor.submit(self.load_on_worker, key)
+            self.wait(key)
+        return io.BytesIO(self.font_data[key])
+
+    def path(self, key: str) -> str:
+        return self.catalogue[key][1]
+
+    def report(self) -> str:
+        lines = [f'assets loaded in {self.startup_seconds * 1000:.1f} ms']
+        for key, seconds in sorted(self.load_times.items(), key=lambda item: -item[1]):
+            lines.append(f'  {key}: {seconds * 1000:.2f} ms')
+        return '\n'.join(lines)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
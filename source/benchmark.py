@@ -0,0 +1,156 @@
+'''
+scene benchmark suite: sweeps enemy and bullet counts with HeadlessRunner, reports per-phase ns/frame
+and scaling exponents, saves results as json so runs on different commits can be compared
+
+    python source/benchmark.py --enemies 10 100 1000 --bullets 0 256 --frames 300
+    python source/benchmark.py --compare bench_results/<old>.json
+'''
+import os
+import sys
+import json
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+from headless import HeadlessRunner, ScriptedInput
+from scene import Scene, SIMULATION_PHASES
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench_results')
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, 
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def fill_bullets(scene: Scene, n_bullets: int, rng: np.random.Generator) -> None:
+    # keeps bullet pool at n_bullets alive bullets (bullets culled or hit last frame are replaced)
+    bullets = scene.player.bullets
+    player = scene.player
+    while len(bullets) < n_bullets:
+        angle = rng.random() * 2 * np.pi
+        direction = np.array([np.cos(angle), np.sin(angle)], dtype=np.float32)
+        start = player.current_position + direction * rng.random()
+        if bullets.spawn(start, direction, player.base_bullet_radius, player.base_bullet_speed) < 0:
+            break
+
+
+def run_case(n_enemies: int, n_bullets: int, n_frames: int, warmup_frames: int, seed: int = 0) -> dict:
+    scene = Scene(seed)
+    scene.max_enemies = n_enemies
+    scene.spawner.budget = n_enemies  # refill the whole population every step, spawn cost is part of the case
+    # shooting is disabled so bullet count is controlled by fill_bullets only
+    runner = HeadlessRunner(scene, ScriptedInput(is_shooting=False))
+    rng = np.random.default_rng(seed)
+
+    for _ in range(warmup_frames):
+        fill_bullets(scene, n_bullets, rng)
+        runner.step()
+
+    runner.reset_timings()
+    for _ in range(n_frames):
+        fill_bullets(scene, n_bullets, rng)
+        runner.step(timed=True)
+
+    phase_ns = runner.phase_ns_per_frame(n_frames)
+    return {
+        'enemies': n_enemies,
+        'bullets': n_bullets,
+        'frames': n_frames,
+        'phase_ns_per_frame': phase_ns,
+        'total_ns_per_frame': sum(phase_ns.values()),
+    }
+
+
+def scaling_exponent(counts, ns_per_frame) -> float:
+    '''
+    slope of log(time) vs log(count): ~1 is linear, ~2 is quadratic
+    '''
+    counts = np.asarray(counts, dtype=np.float64)
+    ns_per_frame = np.asarray(ns_per_frame, dtype=np.float64)
+    valid = (counts > 0) & (ns_per_frame > 0)
+    if valid.sum() < 2:
+        return float('nan')
+    slope, _ = np.polyfit(np.log(counts[valid]), np.log(ns_per_frame[valid]), 1)
+    return float(slope)
+
+
+def run_suite(enemy_counts, bullet_counts, n_frames: int, warmup_frames: int) -> dict:
+    cases = []
+    for n_bullets in bullet_counts:
+        for n_enemies in enemy_counts:
+            case = run_case(n_enemies, n_bullets, n_frames, warmup_frames)
+            cases.append(case)
+            print(f"enemies: {n_enemies:6d} bullets: {n_bullets:5d} total: {case['total_ns_per_frame'] / 1000:9.1f} us/frame  " + 
+                  ' '.join(f"{phase}: {ns / 1000:.1f}" for phase, ns in case['phase_ns_per_frame'].items()))
+
+    # scaling over enemy count, per bullet count and phase
+    scaling = {}
+    for n_bullets in bullet_counts:
+        bullet_cases = [case for case in cases if case['bullets'] == n_bullets]
+        counts = [case['enemies'] for case in bullet_cases]
+        scaling[str(n_bullets)] = {
+            phase: scaling_exponent(counts, [case['phase_ns_per_frame'][phase] for case in bullet_cases])
+            for phase in SIMULATION_PHASES
+        }
+        scaling[str(n_bullets)]['total'] = scaling_exponent(counts, [case['total_ns_per_frame'] for case in bullet_cases])
+
+    return {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': cases,
+        'scaling_vs_enemies': scaling,
+    }
+
+
+def save_results(results: dict, results_dir: str = RESULTS_DIR) -> str:
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{results['revision']}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare_results(old: dict, new: dict) -> None:
+    old_cases = {(case['enemies'], case['bullets']): case for case in old['cases']}
+    print(f"comparing {new['revision']} against {old['revision']} (new / old, < 1 is faster)")
+    for case in new['cases']:
+        key = (case['enemies'], case['bullets'])
+        if key not in old_cases:
+            continue
+        old_case = old_cases[key]
+        ratios = ' '.join(
+            f"{phase}: {ns / max(old_case['phase_ns_per_frame'].get(phase, 0), 1):.2f}"
+            for phase, ns in case['phase_ns_per_frame'].items()
+        )
+        total_ratio = case['total_ns_per_frame'] / max(old_case['total_ns_per_frame'], 1)
+        print(f"enemies: {key[0]:6d} bullets: {key[1]:5d} total: {total_ratio:.2f}  {ratios}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scene benchmark suite')
+    parser.add_argument('--enemies', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--bullets', type=int, nargs='+', default=[0, 128, 512])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--out', default=RESULTS_DIR, help='directory for <revision>.json results')
+    parser.add_argument('--compare', default=None, help='results json to compare against')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.enemies, args.bullets, args.frames, args.warmup)
+    path = save_results(results, args.out)
+    print(f'results saved to {path}')
+    if args.compare is not None:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -6,7 +6,11 @@ class Button():
 		self.font = font
 		self.base_color, self.hovering_color = base_color, hovering_color
 		self.text_input = text_input
-		self.text = self.font.render(self.text_input, True, self.base_color)
+		# both states are rendered once, changeColor only swaps them
+		self.base_text = self.font.render(self.text_input, True, self.base_color)
+		self.hovering_text = self.font.render(self.text_input, True, self.hovering_color)
+		self.is_hovered = False
+		self.text = self.base_text
 		if self.image is None:
 			self.image = self.text
 		self.rect = self.image.get_rect(center=(self.x_pos, self.y_pos))
@@ -23,10 +27,11 @@ class Button():
 		return False
 
 	def changeColor(self, position):
-		if position[0] in range(self.rect.left, self.rect.right) and position[1] in range(self.rect.top, self.rect.bottom):
-			self.text = self.font.render(self.text_input, True, self.hovering_color)
-		else:
-			self.text = self.font.render(self.text_input, True, self.base_color)
+		is_hovered = self.checkForInput(position)
+		if is_hovered == self.is_hovered:
+			return
+		self.is_hovered = is_hovered
+		self.text = self.hovering_text if is_hovered else self.base_text
 
 
 
@@ -0,0 +1,138 @@
+import numpy as np
+
+from kernels import kernel
+
+# ===== HASHED GRID KERNELS =====
+# uniform grid broad phase: buffers are preallocated, build and queries are numba kernels
+
+# primes for spatial hashing of (cell_x, cell_y)
+HASH_PRIME_X = 73856093
+HASH_PRIME_Y = 19349663
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), 2, 0.1, 3,
+    np.zeros(5, dtype=np.int64), np.zeros(2, dtype=np.int64), np.zeros(2, dtype=np.int64)
+), nogil=True)
+def build_hash_grid(points, n, cell_size, table_mask, cell_start, cell_items, item_cell):
+    '''
+    counting sort of items by hashed cell: items of bucket b are cell_items[cell_start[b]:cell_start[b + 1]]
+    '''
+    cell_start[:] = 0
+    for i in range(n):
+        cx = np.int64(np.floor(points[i, 0] / cell_size))
+        cy = np.int64(np.floor(points[i, 1] / cell_size))
+        bucket = ((cx * HASH_PRIME_X) ^ (cy * HASH_PRIME_Y)) & table_mask
+        item_cell[i] = bucket
+        cell_start[bucket + 1] += 1
+    for b in range(table_mask + 1):
+        cell_start[b + 1] += cell_start[b]
+    # cell_start[b] is used as write cursor, shifted back afterwards
+    for i in range(n):
+        bucket = item_cell[i]
+        cell_items[cell_start[bucket]] = i
+        cell_start[bucket] += 1
+    for b in range(table_mask, 0, -1):
+        cell_start[b] = cell_start[b - 1]
+    cell_start[0] = 0
+
+
+@kernel(warmup_args=lambda: (np.ones(2, dtype=np.float32), 2), nogil=True)
+def column_max(values, n):
+    '''
+    max of values[:n] (n > 0), numpy reductions set up an iterator (~1 KB allocated) on every call
+    '''
+    result = values[0]
+    for i in range(1, n):
+        result = max(result, values[i])
+    return result
+
+
+class HashGrid:
+    '''
+    hashed uniform grid over the first n rows of a points array, buffers grow by doubling
+    cell size must be >= the largest interaction distance (3x3 cells around a query point are enough),
+    different cells can share a bucket, queries filter candidates by distance
+    '''
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = 0
+        self.table_mask = 0
+        self.cell_size = 1.0
+        self.cell_start = np.zeros(1, dtype=np.int64)
+        self.cell_items = np.zeros(0, dtype=np.int64)
+        self.item_cell = np.zeros(0, dtype=np.int64)
+        self.reserve(capacity)
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        self.capacity = capacity
+        # power of two table with ~2 buckets per item keeps collisions rare
+        table_size = 1 << int(2 * capacity - 1).bit_length()
+        self.table_mask = table_size - 1
+        self.cell_start = np.zeros(table_size + 1, dtype=np.int64)
+        self.cell_items = np.zeros(capacity, dtype=np.int64)
+        self.item_cell = np.zeros(capacity, dtype=np.int64)
+
+    def build(self, points: np.array, n: int, cell_size: float) -> None:
+        self.reserve(n)
+        self.cell_size = cell_size
+        build_hash_grid(points, n, cell_size, self.table_mask, self.cell_start, self.cell_items, self.item_cell)
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros(2, dtype=np.float32), 15.0, np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.ones(2, dtype=np.float32), 0.1, 3, np.zeros(5, dtype=np.int64), np.zeros(2, dtype=np.int64)
+), nogil=True)
+def nearest_overlap(point, radius, items, item_radius, pixel_scale, cell_size, table_mask, cell_start, cell_items):
+    '''
+    index of the nearest item overlapping circle (point, radius) or -1
+    positions are gl, radii are pixels, distances are measured in pixels (gl delta * pixel_scale)
+    '''
+    cx = np.int64(np.floor(point[0] / cell_size))
+    cy = np.int64(np.floor(point[1] / cell_size))
+    nearest = -1
+    nearest_dist_sq = np.inf
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            bucket = (((cx + dx) * HASH_PRIME_X) ^ ((cy + dy) * HASH_PRIME_Y)) & table_mask
+            for k in range(cell_start[bucket], cell_start[bucket + 1]):
+                j = cell_items[k]
+                delta_x = (point[0] - items[j, 0]) * pixel_scale[0]
+                delta_y = (point[1] - items[j, 1]) * pixel_scale[1]
+                dist_sq = delta_x * delta_x + delta_y * delta_y
+                reach = radius + item_radius[j]
+                if dist_sq <= reach * reach and dist_sq < nearest_dist_sq:
+                    nearest = j
+                    nearest_dist_sq = dist_sq
+    return nearest
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32), np.zeros(2, dtype=np.bool_),
+    np.zeros(2, dtype=np.int32), 2, np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.ones(2, dtype=np.float32), 1.0, np.ones(2, dtype=np.float32), 0.1, 3,
+    np.zeros(5, dtype=np.int64), np.zeros(2, dtype=np.int64)
+), nogil=True)
+def collide_bullets(bullets, bullet_radius, alive, free_slots, free_count, items, item_radius, item_hitpoints,
+                    damage, pixel_scale, cell_size, table_mask, cell_start, cell_items):
+    '''
+    every alive bullet hits its nearest overlapping item: item_hitpoints -= damage, bullet slot is freed
+    (pushed on free_slots from free_count), returns number of bullets that hit
+    '''
+    hits = 0
+    for slot in range(len(alive)):
+        if not alive[slot]:
+            continue
+        nearest = nearest_overlap(
+            bullets[slot], bullet_radius[slot], items, item_radius, pixel_scale,
+            cell_size, table_mask, cell_start, cell_items
+        )
+        if nearest < 0:
+            continue
+        item_hitpoints[nearest] -= damage
+        alive[slot] = False
+        free_slots[free_count + hits] = slot
+        hits += 1
+    return hits
@@ -0,0 +1,59 @@
+import pygame
+
+from typing import List
+
+
+class DirtyRectCompositor:
+    '''
+    dirty rectangle bookkeeping for the play screen:
+    - begin_frame erases only what was drawn last frame (full fill on first frame or after invalidate)
+    - everything drawn this frame is registered with add / add_rects
+    - end_frame passes previous + current rects to pygame.display.update
+    '''
+    def __init__(self, background_color='black') -> None:
+        self.background_color = background_color
+        self.previous_rects: List[pygame.Rect] = []
+        self.current_rects: List[pygame.Rect] = []
+        self.full_redraw = True
+
+    def invalidate(self) -> None:
+        self.full_redraw = True
+
+    def begin_frame(self, screen_ptr: pygame.Surface) -> List[pygame.Rect]:
+        '''
+        returns rects erased this frame (retained elements under them must be redrawn)
+        '''
+        if self.full_redraw:
+            screen_ptr.fill(self.background_color)
+            return [screen_ptr.get_rect()]
+        for rect in self.previous_rects:
+            screen_ptr.fill(self.background_color, rect)
+        return self.previous_rects
+
+    def add(self, rect: pygame.Rect) -> None:
+        if rect is not None:
+            self.current_rects.append(rect)
+
+    def add_rects(self, rects: List[pygame.Rect]) -> None:
+        self.current_rects.extend(rects)
+
+    def blit(self, screen_ptr: pygame.Surface, surface: pygame.Surface, pos) -> pygame.Rect:
+        rect = screen_ptr.blit(surface, pos)
+        self.current_rects.append(rect)
+        return rect
+
+    def end_frame(self) -> int:
+        '''
+        returns number of rects sent to display
+        '''
+        if self.full_redraw:
+            pygame.display.update()
+            self.full_redraw = False
+            updated = 1
+        else:
+            pygame.display.update(self.previous_rects + self.current_rects)
+            updated = len(self.previous_rects) + len(self.current_rects)
+        # swap buffers, current frame rects are erased next frame
+        self.previous_rects, self.current_rects = self.current_rects, self.previous_rects
+        self.current_rects.clear()
+        return updated
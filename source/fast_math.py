@@ -0,0 +1,150 @@
+'''
+loader for native fast_math library (source_c/, build with `make -C source_c`)
+every function has a numpy fallback which is used automatically when the library
+(or the kernel, old dll builds do not have batch kernels) is missing
+'''
+import os
+import sys
+import ctypes
+import numpy as np
+
+LIB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'lib')
+
+if sys.platform.startswith('win'):
+    LIB_NAME = 'fast_math.dll'
+elif sys.platform == 'darwin':
+    LIB_NAME = 'libfast_math.dylib'
+else:
+    LIB_NAME = 'libfast_math.so'
+
+
+def load_library(lib_dir: str = LIB_DIR, lib_name: str = LIB_NAME):
+    try:
+        return ctypes.CDLL(os.path.join(lib_dir, lib_name))
+    except OSError:
+        return None
+
+
+ctypes_fast_math_lib = load_library()
+
+c_float_p = ctypes.POINTER(ctypes.c_float)
+# numpy buffers go to batch kernels as plain addresses: ctypes pointer objects (array.ctypes.data_as)
+# cost an allocation and a reference cycle per argument on every call
+c_data_p = ctypes.c_void_p
+
+# signature of every kernel: name -> (argtypes, restype)
+KERNEL_SIGNATURES = {
+    'Q_rsqrt': ([ctypes.c_float], ctypes.c_float),
+    'map_opengl_to_screen_2d': ([ctypes.c_float, ctypes.c_float, ctypes.c_short, ctypes.c_short, c_float_p], None),
+    'map_screen_to_opengl': ([ctypes.c_float, ctypes.c_float, ctypes.c_short, ctypes.c_short, c_float_p], None),
+    'batch_rsqrt': ([c_data_p, c_data_p, ctypes.c_int], None),
+    'batch_normalize_2d': ([c_data_p, ctypes.c_int], None),
+    'distance_matrix_2d': ([c_data_p, ctypes.c_int, c_data_p, ctypes.c_int, c_data_p], None),
+    'affine_transform_2d': ([c_data_p, c_data_p, ctypes.c_int, c_data_p, c_data_p], None),
+}
+
+native_kernels = {}
+if ctypes_fast_math_lib is not None:
+    for kernel_name, (argtypes, restype) in KERNEL_SIGNATURES.items():
+        if not hasattr(ctypes_fast_math_lib, kernel_name):
+            continue
+        kernel = getattr(ctypes_fast_math_lib, kernel_name)
+        kernel.argtypes = argtypes
+        kernel.restype = restype
+        native_kernels[kernel_name] = kernel
+
+HAVE_NATIVE = len(native_kernels) > 0
+
+
+def has_kernel(kernel_name: str) -> bool:
+    return kernel_name in native_kernels
+
+
+def as_float_ptr(array: np.array) -> int:
+    # address of the first element (argument type c_data_p)
+    return array.__array_interface__['data'][0]
+
+
+def is_native_compatible(*arrays) -> bool:
+    # kernels work only on contiguous float32 memory
+    return all(a.dtype == np.float32 and a.flags['C_CONTIGUOUS'] for a in arrays)
+
+
+# ======== scalar functions
+def fast_inverse_root(number: float) -> float:
+    if 'Q_rsqrt' in native_kernels:
+        return native_kernels['Q_rsqrt'](number)
+    # Q_rsqrt(0) is finite, keep x * fast_inverse_root(x . x) == 0 for zero vectors
+    return 1.0 / np.sqrt(number) if number > 0 else 0.0
+
+
+# ======== batch functions
+def batch_inverse_root(numbers: np.array, out: np.array = None) -> np.array:
+    '''
+    1 / sqrt(x) for a whole array at once
+    '''
+    if out is None:
+        out = np.empty(numbers.shape, dtype=np.float32)
+    if 'batch_rsqrt' in native_kernels and is_native_compatible(numbers, out):
+        native_kernels['batch_rsqrt'](as_float_ptr(numbers), as_float_ptr(out), numbers.size)
+        return out
+    np.sqrt(numbers, out=out)
+    np.divide(1.0, out, out=out, where=out > 0)
+    return out
+
+
+def normalize_2d(vectors: np.array) -> np.array:
+    '''
+    normalizes (N, 2) vectors in place
+    '''
+    if 'batch_normalize_2d' in native_kernels and is_native_compatible(vectors):
+        native_kernels['batch_normalize_2d'](as_float_ptr(vectors), len(vectors))
+        return vectors
+    norm = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))[:, None]
+    np.divide(vectors, norm, out=vectors, where=norm > 0)
+    return vectors
+
+
+def distance_matrix(a: np.array, b: np.array, out: np.array = None) -> np.array:
+    '''
+    a: (N, 2), b: (M, 2) -> (N, M) euclidean distances
+    '''
+    if out is None:
+        out = np.empty((len(a), len(b)), dtype=np.float32)
+    if 'distance_matrix_2d' in native_kernels and is_native_compatible(a, b, out):
+        native_kernels['distance_matrix_2d'](as_float_ptr(a), len(a), as_float_ptr(b), len(b), as_float_ptr(out))
+        return out
+    delta = a[:, None, :] - b[None, :, :]
+    np.sqrt(np.einsum('ijk,ijk->ij', delta, delta), out=out)
+    return out
+
+
+def affine_transform(points: np.array, scale: np.array, offset: np.array, out: np.array) -> np.array:
+    '''
+    out = points * scale + offset for (N, 2) points (out can be points itself)
+    '''
+    if 'affine_transform_2d' in native_kernels and is_native_compatible(points, out, scale, offset):
+        native_kernels['affine_transform_2d'](
+            as_float_ptr(points), as_float_ptr(out), len(points), as_float_ptr(scale), as_float_ptr(offset)
+        )
+        return out
+    np.multiply(points, scale, out=out)
+    np.add(out, offset, out=out)
+    return out
+
+
+# ======== single point viewport transforms (kept for old callers)
+def map_opengl_to_screen_2d(x: float, y: float, w: int, h: int) -> tuple:
+    if 'map_opengl_to_screen_2d' in native_kernels:
+        result = (ctypes.c_float * 2)()
+        native_kernels['map_opengl_to_screen_2d'](x, y, w, h, result)
+        return result[0], result[1]
+    return (x + 1) * 0.5 * w, (-y + 1) * 0.5 * h
+
+
+def map_screen_to_opengl_2d(x: float, y: float, w: int, h: int) -> tuple:
+    if 'map_screen_to_opengl' in native_kernels:
+        result = (ctypes.c_float * 2)()
+        native_kernels['map_screen_to_opengl'](x, y, w, h, result)
+        return result[0], result[1]
+    return -1 + x * (2.0 / w), -y * (2.0 / h) + 1
@@ -0,0 +1,72 @@
+import pygame
+import functools
+
+from collections import OrderedDict
+
+FONT_PATH = "assets/font.ttf"
+TEXT_CACHE_SIZE = 256
+
+
+# font file opener, asset manager replaces it with in-memory copy of the font (see use_font_source)
+font_source = lambda: FONT_PATH
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size: int) -> pygame.font.Font:
+    # font is created once per size
+    return pygame.font.Font(font_source(), size)
+
+
+def use_font_source(source) -> None:
+    '''
+    source: callable returning path or file object for pygame.font.Font
+    '''
+    global font_source
+    font_source = source
+    clear_font_caches()
+
+
+class TextCache:
+    '''
+    LRU cache of rendered text surfaces keyed by (text, color, size, antialias)
+    labels that did not change since last frame are reused instead of rendered again
+    '''
+    def __init__(self, max_size: int = TEXT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.surfaces)
+
+    def render(self, text: str, size: int, color, antialias: bool = True) -> pygame.Surface:
+        key = (text, color, size, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = get_font(size).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)  # evict least recently used
+        return surface
+
+    def clear(self) -> None:
+        self.surfaces.clear()
+
+
+text_cache = TextCache()
+
+
+def render_text(text: str, size: int, color, antialias: bool = True) -> pygame.Surface:
+    return text_cache.render(text, size, color, antialias)
+
+
+def clear_font_caches() -> None:
+    # fonts and surfaces are invalid after pygame.quit()
+    text_cache.clear()
+    get_font.cache_clear()
@@ -0,0 +1,153 @@
+'''
+adaptive frame-budget governor: watches a rolling window of frame work times (time spent on a frame,
+without waiting in clock.tick) and walks a ladder of quality levels to hold the frame-time target
+
+    level 0 is full quality, every next level is cheaper: fewer particles, smaller enemy cap,
+    lower render detail
+
+hysteresis: quality drops as soon as a full window is over budget, it comes back only after the window
+is well under budget for UPGRADE_DELAY_FRAMES, and the window is cleared after every change
+so one decision is never made twice from the same frames
+
+the only knob that changes the simulation (Scene.max_enemies) is left alone when simulation_knobs
+is False, input recordings stay replayable
+'''
+import numpy as np
+
+from collections import deque
+
+TARGET_FRAME_TIME = 1 / 120  # seconds, RENDER_FPS of the window
+GOVERNOR_WINDOW = 60  # frames in rolling window
+GOVERNOR_PERCENTILE = 90  # frame work time percentile compared against the budget
+DOWNGRADE_RATIO = 1.0  # percentile above budget * ratio => one level down
+UPGRADE_RATIO = 0.6  # percentile below budget * ratio => one level up (gap to DOWNGRADE_RATIO is the hysteresis)
+UPGRADE_DELAY_FRAMES = 240  # frames of headroom needed before quality goes up again
+DECISIONS_KEPT = 64
+
+RENDER_DETAIL_NONE = 0  # particles are neither simulated nor drawn
+RENDER_DETAIL_LOW = 1  # death effects with a quarter of the particles
+RENDER_DETAIL_FULL = 2
+
+
+class QualityLevel:
+    '''
+    particles, enemies: fractions of the particle / enemy caps the governor was attached with
+    '''
+    __slots__ = ('particles', 'enemies', 'render_detail')
+
+    def __init__(self, particles: float, enemies: float, render_detail: int) -> None:
+        self.particles = particles
+        self.enemies = enemies
+        self.render_detail = render_detail
+
+
+QUALITY_LEVELS = (
+    QualityLevel(1.0, 1.0, RENDER_DETAIL_FULL),
+    QualityLevel(0.5, 1.0, RENDER_DETAIL_FULL),
+    QualityLevel(0.5, 1.0, RENDER_DETAIL_LOW),
+    QualityLevel(0.25, 0.75, RENDER_DETAIL_LOW),
+    QualityLevel(0.0, 0.5, RENDER_DETAIL_NONE),
+)
+
+
+class FrameGovernor:
+
+    def __init__(self, target_frame_time: float = TARGET_FRAME_TIME, window: int = GOVERNOR_WINDOW,
+                 levels=QUALITY_LEVELS, simulation_knobs: bool = True) -> None:
+        self.target_frame_time = target_frame_time
+        self.levels = levels
+        self.simulation_knobs = simulation_knobs
+        self.level = 0
+        self.frame_times = np.zeros(window, dtype=np.float64)  # ring buffer, seconds
+        self.count = 0  # valid samples in frame_times since last change
+        self.frame = 0
+        self.headroom_frames = 0
+        self.last_percentile = 0.0
+        self.downgrades = 0
+        self.upgrades = 0
+        self.decisions = deque(maxlen=DECISIONS_KEPT)  # (frame, old level, new level, percentile seconds)
+        self.scene = None
+        self.animation = None
+        self.base_max_enemies = 0
+        self.base_max_particles = 0
+        self.base_bg_max_particles = 0
+
+    @property
+    def quality(self) -> QualityLevel:
+        return self.levels[self.level]
+
+    @property
+    def render_detail(self) -> int:
+        return self.quality.render_detail
+
+    def attach(self, scene, animation) -> None:
+        '''
+        current caps of scene and animation become the full quality baseline
+        '''
+        self.scene = scene
+        self.animation = animation
+        self.base_max_enemies = scene.max_enemies
+        self.base_max_particles = animation.max_particles
+        self.base_bg_max_particles = animation.bg_max_particles
+        self.apply()
+
+    def apply(self) -> None:
+        quality = self.quality
+        if self.animation is not None:
+            self.animation.max_particles = int(self.base_max_particles * quality.particles)
+            self.animation.bg_max_particles = int(self.base_bg_max_particles * quality.particles)
+        if self.scene is not None and self.simulation_knobs:
+            self.scene.max_enemies = max(1, round(self.base_max_enemies * quality.enemies))
+
+    def update(self, frame_time: float) -> bool:
+        '''
+        frame_time: seconds of work of the last frame, returns True if quality level changed
+        '''
+        window = len(self.frame_times)
+        self.frame_times[self.frame % window] = frame_time
+        self.frame += 1
+        self.count = min(self.count + 1, window)
+        if self.count < window:
+            return False
+
+        percentile = float(np.percentile(self.frame_times, GOVERNOR_PERCENTILE))
+        self.last_percentile = percentile
+        if percentile > self.target_frame_time * DOWNGRADE_RATIO:
+            self.headroom_frames = 0
+            return self.set_level(self.level + 1)
+        if percentile < self.target_frame_time * UPGRADE_RATIO:
+            self.headroom_frames += 1
+            if self.headroom_frames >= UPGRADE_DELAY_FRAMES:
+                return self.set_level(self.level - 1)
+        else:
+            self.headroom_frames = 0
+        return False
+
+    def set_level(self, level: int) -> bool:
+        level = min(max(level, 0), len(self.levels) - 1)
+        if level == self.level:
+            return False
+        self.decisions.append((self.frame, self.level, level, self.last_percentile))
+        if level > self.level:
+            self.downgrades += 1
+        else:
+            self.upgrades += 1
+        self.level = level
+        self.count = 0
+        self.headroom_frames = 0
+        self.apply()
+        return True
+
+    def metrics(self) -> dict:
+        quality = self.quality
+        return {
+            'level': self.level,
+            'target_ms': self.target_frame_time * 1000,
+            'percentile_ms': self.last_percentile * 1000,
+            'particles_cap': None if self.animation is None else self.animation.max_particles,
+            'max_enemies': None if self.scene is None else self.scene.max_enemies,
+            'render_detail': quality.render_detail,
+            'downgrades': self.downgrades,
+            'upgrades': self.upgrades,
+            'decisions': list(self.decisions),
+        }
@@ -0,0 +1,111 @@
+'''
+headless driver for Scene: steps the simulation with scripted input, no window is opened
+(SDL dummy video driver), used by benchmarks and replays
+'''
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import time
+import numpy as np
+import pygame
+
+from typing import Tuple
+from scene import Scene, SIMULATION_PHASES, WINDOW_WIDTH, WINDOW_HEIGHT
+
+SIMULATION_DT = 1 / 120
+
+MOVEMENT_KEYS = (pygame.K_d, pygame.K_a, pygame.K_s, pygame.K_w)
+
+
+class ScriptedKeys:
+    '''
+    stands in for pygame.key.get_pressed() result, only movement keys are tracked
+    '''
+    __slots__ = ('pressed',)
+
+    def __init__(self, pressed=()) -> None:
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key) -> bool:
+        return key in self.pressed
+
+
+class ScriptedInput:
+    '''
+    deterministic input script: player walks around in a square and aims/shoots along a circle around the screen center
+    '''
+    def __init__(self, walk_period: int = 120, aim_period: int = 240, is_shooting: bool = True) -> None:
+        self.walk_period = walk_period
+        self.aim_period = aim_period
+        self.is_shooting = is_shooting
+        self.walk_keys = tuple(ScriptedKeys((key,)) for key in MOVEMENT_KEYS)
+
+    def keys(self, frame: int) -> ScriptedKeys:
+        return self.walk_keys[(frame // self.walk_period) % len(self.walk_keys)]
+
+    def keys_changed(self, frame: int) -> bool:
+        return frame % self.walk_period == 0
+
+    def mouse(self, frame: int) -> Tuple[int, int]:
+        angle = 2 * np.pi * (frame % self.aim_period) / self.aim_period
+        return (
+            int(WINDOW_WIDTH / 2 + 0.4 * WINDOW_WIDTH * np.cos(angle)),
+            int(WINDOW_HEIGHT / 2 + 0.4 * WINDOW_HEIGHT * np.sin(angle))
+        )
+
+    def shooting(self, frame: int) -> bool:
+        return self.is_shooting
+
+    def dt(self, frame: int) -> float:
+        return SIMULATION_DT
+
+
+class HeadlessRunner:
+
+    def __init__(self, scene: Scene = None, script: ScriptedInput = None) -> None:
+        pygame.display.init()  # dummy driver, nothing is shown
+        self.scene = scene if scene is not None else Scene()
+        self.script = script if script is not None else ScriptedInput()
+        self.frame = 0
+        self.phase_ns = np.zeros(len(SIMULATION_PHASES), dtype=np.int64)
+
+    def step(self, timed: bool = False) -> int:
+        frame = self.frame
+        if self.script.keys_changed(frame):
+            self.scene.player.update_velocity_vector(self.script.keys(frame))
+        m_xpos, m_ypos = self.script.mouse(frame)
+        enemies_dead = self.scene.step(
+            self.script.dt(frame), m_xpos, m_ypos, self.script.shooting(frame), 
+            phase_ns=self.phase_ns if timed else None
+        )
+        self.frame += 1
+        return enemies_dead
+
+    @property
+    def score(self) -> int:
+        return self.scene.score
+
+    def run(self, n_frames: int, timed: bool = False) -> float:
+        '''
+        returns wall time in seconds
+        '''
+        t_start = time.perf_counter()
+        for _ in range(n_frames):
+            self.step(timed)
+        return time.perf_counter() - t_start
+
+    def reset_timings(self) -> None:
+        self.phase_ns[:] = 0
+
+    def phase_ns_per_frame(self, n_frames: int) -> dict:
+        return {phase: self.phase_ns[i] / n_frames for i, phase in enumerate(SIMULATION_PHASES)}
+
+
+if __name__ == '__main__':
+    runner = HeadlessRunner()
+    n_frames = 1200
+    elapsed = runner.run(n_frames, timed=True)
+    print(f'{n_frames} frames in {elapsed:.3f}s ({n_frames / elapsed:.0f} frames/s), score: {runner.score}')
+    for phase, ns in runner.phase_ns_per_frame(n_frames).items():
+        print(f'{phase:>12}: {ns:10.0f} ns/frame')
@@ -1,12 +1,15 @@
 import pygame
 import ctypes
-from typing import Tuple
+from typing import Tuple, List, Union
 from config import *
 
 
-class HitpointsBar:
+class RetainedWidget:
+    '''
+    hud element that is redrawn only when its value changed (or something was drawn over it)
+    '''
 
-    def __init__(self, pos_tuple: Tuple, wh_tuple: Tuple, max_hp: float):
+    def __init__(self, pos_tuple: Tuple, wh_tuple: Tuple) -> None:
         if len(pos_tuple) != 2:
             raise ValueError("position tuple must be 2-element (upper-left rect corner pos)")
         
@@ -15,34 +18,67 @@ class HitpointsBar:
 
         self.x, self.y = pos_tuple
         self.w, self.h = wh_tuple
+        self.rect = pygame.Rect(self.x, self.y, self.w, self.h)
+        self.is_dirty = True
+
+    def invalidate(self) -> None:
+        self.is_dirty = True
+
+    def draw(self, screen_ptr: pygame.Surface) -> Union[pygame.Rect, None]:
+        '''
+        returns updated rect or None if nothing was drawn
+        '''
+        if not self.is_dirty:
+            return None
+        self.redraw(screen_ptr)
+        self.is_dirty = False
+        return self.rect
+
+    def redraw(self, screen_ptr: pygame.Surface) -> None:
+        raise NotImplementedError
+
+
+class HitpointsBar(RetainedWidget):
+
+    def __init__(self, pos_tuple: Tuple, wh_tuple: Tuple, max_hp: float):
+        super().__init__(pos_tuple, wh_tuple)
         self.current_hp = max_hp
         self.max_hp = max_hp
 
     def update_hp_status(self, player_hp):
+        if player_hp == self.current_hp:
+            return
         self.current_hp = player_hp
+        self.is_dirty = True
 
-    def draw(self, screen_ptr: pygame.Surface):
+    def redraw(self, screen_ptr: pygame.Surface):
         #calculate health ratio
-        ratio = self.current_hp / self.max_hp
+        ratio = max(self.current_hp, 0) / self.max_hp
         pygame.draw.rect(screen_ptr, "red", (self.x, self.y, self.w, self.h))
         pygame.draw.rect(screen_ptr, "green", (self.x, self.y, self.w * ratio, self.h))
 
 
-class EnergyBar:
-
-    def __init__(self) -> None:
-        pass
-
-
 class HeadupDisplay():
 
     def __init__(self, player_max_hp: float) -> None:
 
         self.hp_bar = HitpointsBar((HP_BAR_XPOS, HP_BAR_YPOS), (HP_BAR_WIDTH, HP_BAR_HEIGHT), player_max_hp)
-        # self.energy_bar = EnergyBar()
+        self.widgets: List[RetainedWidget] = [self.hp_bar]
     
     def update_hud(self, player_current_hp: float) -> None:
         self.hp_bar.update_hp_status(player_current_hp)
 
-    def draw_hud_elements(self, screen_ptr: pygame.Surface) -> None:
-        self.hp_bar.draw(screen_ptr)
+    def invalidate_overlapping(self, rects: List[pygame.Rect]) -> None:
+        # widgets partially erased by the compositor have to be redrawn
+        for widget in self.widgets:
+            if widget.rect.collidelist(rects) != -1:
+                widget.invalidate()
+
+    def draw_hud_elements(self, screen_ptr: pygame.Surface) -> List[pygame.Rect]:
+        # returns rects of redrawn widgets
+        updated_rects = []
+        for widget in self.widgets:
+            rect = widget.draw(screen_ptr)
+            if rect is not None:
+                updated_rects.append(rect)
+        return updated_rects
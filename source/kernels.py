@@ -0,0 +1,132 @@
+'''
+lazily compiled numba kernels
+
+numba is imported only when the first kernel is compiled, kernels are compiled with cache=True
+(machine code is stored in __pycache__, next start only loads it), and warmup() compiles every
+registered kernel up front so no jit compilation happens inside the frame loop.
+kernels can call other kernels (the callee is compiled first and bound in place of the LazyKernel).
+without numba installed kernels run as plain python functions
+'''
+import time
+import types
+import startup
+
+from typing import Callable, Dict, List
+
+numba_module = None
+numba_missing = False
+
+# kernels write `for i in prange(n)`: plain range in python, numba.prange once compiled (see jit_function)
+prange = range
+
+
+def import_numba():
+    global numba_module, numba_missing
+    if numba_module is None and not numba_missing:
+        try:
+            with startup.timed('import numba'):
+                import numba
+            # typing / target registries load lazily on the first compile or cache load (~0.3 s once per process),
+            # done here so that kernel timings are the kernels only
+            with startup.timed('init numba'):
+                from numba.core.registry import cpu_target
+                cpu_target.typing_context.refresh()
+                cpu_target.target_context.refresh()
+            numba_module = numba
+        except ImportError:
+            numba_missing = True
+    return numba_module
+
+
+class LazyKernel:
+    '''
+    numba.njit wrapper compiling on first call (or in warmup)
+    warmup_args: callable returning example arguments, they fix the compiled signature
+    '''
+    def __init__(self, py_func: Callable, warmup_args: Callable, options: dict) -> None:
+        self.py_func = py_func
+        self.warmup_args = warmup_args
+        self.options = options
+        self.name = py_func.__name__
+        self.compiled = None
+        self.compile_seconds = 0.0
+
+    def compile(self) -> None:
+        if self.compiled is not None:
+            return
+        # numba import is timed on its own (startup 'import numba'), compile_seconds is this kernel only
+        numba = import_numba()
+        t_start = time.perf_counter()
+        if numba is None:
+            self.compiled = self.py_func
+        else:
+            self.compiled = numba.njit(cache=True, **self.options)(self.jit_function(numba))
+            self.compiled(*self.warmup_args())  # triggers compilation (or cache load)
+        self.compile_seconds = time.perf_counter() - t_start
+        startup.record(f'jit {self.name}', self.compile_seconds)
+
+    def jit_function(self, numba):
+        '''
+        py_func with numba.prange and compiled callee kernels in its globals (module globals stay untouched)
+        '''
+        overrides = {}
+        globals_ = self.py_func.__globals__
+        if globals_.get('prange') is range:
+            overrides['prange'] = numba.prange
+        for name in self.py_func.__code__.co_names:
+            callee = globals_.get(name)
+            if isinstance(callee, LazyKernel):
+                callee.compile()
+                overrides[name] = callee.compiled
+        if not overrides:
+            return self.py_func
+        py_func = types.FunctionType(
+            self.py_func.__code__, {**globals_, **overrides}, self.py_func.__name__,
+            self.py_func.__defaults__, self.py_func.__closure__
+        )
+        py_func.__qualname__ = self.py_func.__qualname__
+        py_func.__module__ = self.py_func.__module__
+        return py_func
+
+    @property
+    def is_compiled(self) -> bool:
+        return self.compiled is not None
+
+    def __call__(self, *args):
+        if self.compiled is None:
+            self.compile()
+        return self.compiled(*args)
+
+
+registry: Dict[str, LazyKernel] = {}
+
+
+def kernel(warmup_args: Callable, **options):
+    '''
+    decorator: @kernel(warmup_args=lambda: (np.zeros(2), np.zeros(2)), parallel=True)
+    '''
+    def register(py_func: Callable) -> LazyKernel:
+        lazy_kernel = LazyKernel(py_func, warmup_args, options)
+        registry[lazy_kernel.name] = lazy_kernel
+        return lazy_kernel
+    return register
+
+
+def pending_kernels() -> List[LazyKernel]:
+    return [lazy_kernel for lazy_kernel in registry.values() if not lazy_kernel.is_compiled]
+
+
+def warmup_next() -> bool:
+    '''
+    compiles one pending kernel, returns True when nothing is left (lets loading screen stay responsive)
+    '''
+    pending = pending_kernels()
+    if len(pending) == 0:
+        return True
+    pending[0].compile()
+    return len(pending) == 1
+
+
+def warmup() -> None:
+    for lazy_kernel in pending_kernels():
+        lazy_kernel.compile()
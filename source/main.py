@@ -1,8 +1,43 @@
-import window
+import argparse
+import startup
 
 
 def main():
-    game_window = window.Window()
+    parser = argparse.ArgumentParser(description='Happy Days')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the game scene')
+    parser.add_argument('--record', default=None, metavar='PATH', help='record inputs of the session to PATH')
+    parser.add_argument('--world', default=None, metavar='PATH', help='world file with walls (see world.py)')
+    parser.add_argument('--waves', action='store_true', help='enemies come in repeating waves (see spawning.py)')
+    parser.add_argument('--no-governor', action='store_true', help='fixed full quality, no frame-budget governor')
+    parser.add_argument('--replay', default=None, metavar='PATH', help='replay recorded session headlessly and exit')
+    parser.add_argument('--startup-report', default=None, metavar='PATH', 
+                        help='import game modules, compile kernels, save startup timings (json) to PATH and exit')
+    args = parser.parse_args()
+    if args.waves and args.record is not None:
+        # recordings store seed and world only, a replay would spawn without the waves
+        parser.error('--waves sessions can not be recorded')
+
+    if args.startup_report is not None:
+        with startup.timed('import window'):
+            import window
+        import kernels
+        kernels.warmup()
+        print(startup.report())
+        startup.save_report(args.startup_report)
+        return
+
+    if args.replay is not None:
+        # no window, runs as fast as the cpu allows
+        import recording
+        runner, elapsed, matches = recording.replay(args.replay)
+        print(f'{runner.frame} steps replayed in {elapsed:.3f}s, score: {runner.score}, '
+              f'fingerprint {"ok" if matches else "MISMATCH"}')
+        return
+
+    with startup.timed('import window'):
+        import window
+    game_window = window.Window(seed=args.seed, record_path=args.record, world_path=args.world,
+                                governor=not args.no_governor, waves=args.waves)
     game_window.window_game_main_loop()
 
 
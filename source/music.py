@@ -0,0 +1,62 @@
+import io
+import os
+import random
+import pygame
+
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Tuple
+
+MUSIC_VOLUME = 0.02
+MUSIC_FADE_MS = 3000
+
+
+class MusicStreamer:
+    '''
+    background music through pygame.mixer.music, which decodes the track in small chunks while playing
+    (pygame.mixer.Sound would decode whole track to PCM on the main thread)
+    next track is picked and its compressed bytes are read on a worker thread while current one plays,
+    so track change in update() never waits for disk and memory is bounded by one compressed file
+    '''
+    def __init__(self, folder: str, track_list: List[str], volume: float = MUSIC_VOLUME) -> None:
+        self.folder = folder
+        self.track_list = track_list
+        self.volume = volume
+        self.prev_track = ''
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='music-prefetch')
+        self.prefetched: Future = None
+
+    def pick_next_track(self) -> str:
+        tracklist_copy = [track for track in self.track_list if track != self.prev_track]
+        if len(tracklist_copy) == 0:
+            tracklist_copy = self.track_list
+        return random.choice(tracklist_copy)
+
+    def read_track(self, track_name: str) -> Tuple[str, io.BytesIO]:
+        with open(os.path.join(self.folder, track_name), 'rb') as f:
+            return track_name, io.BytesIO(f.read())
+
+    def prefetch_next(self) -> None:
+        if self.prefetched is None and len(self.track_list) > 0:
+            self.prefetched = self.executor.submit(self.read_track, self.pick_next_track())
+
+    def update(self) -> None:
+        # called every frame, never blocks
+        if pygame.mixer.music.get_busy():
+            return
+        self.prefetch_next()
+        if not self.prefetched.done():
+            return
+        track_name, track_data = self.prefetched.result()
+        self.prefetched = None
+        pygame.mixer.music.load(track_data, namehint=track_name)
+        pygame.mixer.music.set_volume(self.volume)
+        pygame.mixer.music.play(fade_ms=MUSIC_FADE_MS)
+        self.prev_track = track_name
+        # following track is read while this one plays
+        self.prefetch_next()
+
+    def stop(self) -> None:
+        pygame.mixer.music.stop()
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
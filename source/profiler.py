@@ -0,0 +1,167 @@
+'''
+per-phase frame profiler: phase timings of every frame go into a ring buffer,
+overlay shows frame time percentiles and graph, traces can be dumped to csv or chrome trace json
+(open in chrome://tracing or https://ui.perfetto.dev)
+
+when profiling is disabled the window keeps profiler = None, so the frame loop pays only `is not None` checks
+'''
+import json
+import time
+import numpy as np
+import pygame
+
+from typing import Dict
+from scene import SIMULATION_PHASES
+from fonts import render_text
+
+FRAME_PHASES = ('input',) + SIMULATION_PHASES + ('render', 'present')
+PHASE_INPUT = 0
+PHASE_RENDER = FRAME_PHASES.index('render')
+PHASE_PRESENT = FRAME_PHASES.index('present')
+SIMULATION_PHASES_SLICE = slice(1, 1 + len(SIMULATION_PHASES))
+
+PROFILER_CAPACITY = 1024  # frames kept in ring buffer
+GRAPH_WIDTH = 240
+GRAPH_HEIGHT = 60
+
+
+class FrameProfiler:
+
+    def __init__(self, capacity: int = PROFILER_CAPACITY) -> None:
+        self.capacity = capacity
+        self.phase_ns = np.zeros((capacity, len(FRAME_PHASES)), dtype=np.int64)
+        self.frame_start_ns = np.zeros(capacity, dtype=np.int64)
+        self.frame_ns = np.zeros(capacity, dtype=np.int64)  # start to start, includes waiting in clock.tick
+        self.index = 0  # next slot to write
+        self.count = 0
+
+        self.current = np.zeros(len(FRAME_PHASES), dtype=np.int64)
+        # view passed to Scene.step, simulation phases of all steps of a frame add up here
+        self.simulation_phase_ns = self.current[SIMULATION_PHASES_SLICE]
+        self.current_start_ns = 0
+        self.last_mark_ns = 0
+
+        # graph scratch buffers
+        self._graph_points = np.zeros((capacity, 2), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def begin_frame(self) -> None:
+        now = time.perf_counter_ns()
+        if self.current_start_ns != 0:
+            self.frame_ns[(self.index - 1) % self.capacity] = now - self.current_start_ns
+        self.current[:] = 0
+        self.current_start_ns = now
+        self.last_mark_ns = now
+
+    def mark(self, phase_index: int) -> None:
+        '''
+        time since previous mark goes to phase_index
+        '''
+        now = time.perf_counter_ns()
+        self.current[phase_index] += now - self.last_mark_ns
+        self.last_mark_ns = now
+
+    def resync(self) -> None:
+        # after Scene.step timed its own phases
+        self.last_mark_ns = time.perf_counter_ns()
+
+    def end_frame(self) -> None:
+        i = self.index
+        self.phase_ns[i] = self.current
+        self.frame_start_ns[i] = self.current_start_ns
+        self.frame_ns[i] = self.current.sum()  # replaced by start to start time on next begin_frame
+        self.index = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    # ===== statistics
+    def ordered_slots(self) -> np.array:
+        # ring buffer slots from oldest to newest
+        return (np.arange(self.count) + self.index - self.count) % self.capacity
+
+    def work_ns(self) -> np.array:
+        return self.phase_ns[self.ordered_slots()].sum(axis=1)
+
+    def percentiles(self) -> Dict[str, float]:
+        '''
+        frame work time percentiles in ms (without time spent waiting for next frame)
+        '''
+        if self.count == 0:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        p50, p95, p99 = np.percentile(self.work_ns(), (50, 95, 99)) / 1e6
+        return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+
+    def phase_percentiles(self, q: float = 50) -> Dict[str, float]:
+        if self.count == 0:
+            return {phase: 0.0 for phase in FRAME_PHASES}
+        values = np.percentile(self.phase_ns[self.ordered_slots()], q, axis=0) / 1e6
+        return dict(zip(FRAME_PHASES, values.tolist()))
+
+    def fps(self) -> float:
+        if self.count < 2:
+            return 0.0
+        median_frame_ns = np.median(self.frame_ns[self.ordered_slots()[:-1]])
+        return float(1e9 / median_frame_ns) if median_frame_ns > 0 else 0.0
+
+    # ===== export
+    def export_csv(self, path: str) -> None:
+        slots = self.ordered_slots()
+        with open(path, 'w') as f:
+            f.write('frame,start_ns,frame_ns,' + ','.join(f'{phase}_ns' for phase in FRAME_PHASES) + '\n')
+            for frame, slot in enumerate(slots):
+                f.write(f'{frame},{self.frame_start_ns[slot]},{self.frame_ns[slot]},' + 
+                        ','.join(map(str, self.phase_ns[slot].tolist())) + '\n')
+
+    def export_chrome_trace(self, path: str) -> None:
+        '''
+        phases are laid out back to back from frame start 
+        (simulation phases of several fixed steps in one frame are merged into one event per phase)
+        '''
+        slots = self.ordered_slots()
+        if len(slots) == 0:
+            events = []
+        else:
+            origin_ns = self.frame_start_ns[slots[0]]
+            events = []
+            for frame, slot in enumerate(slots):
+                t_ns = self.frame_start_ns[slot] - origin_ns
+                events.append({
+                    'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0,
+                    'ts': t_ns / 1000, 'dur': int(self.phase_ns[slot].sum()) / 1000, 'args': {'frame': frame}
+                })
+                for phase_index, phase in enumerate(FRAME_PHASES):
+                    dur_ns = int(self.phase_ns[slot, phase_index])
+                    if dur_ns == 0:
+                        continue
+                    events.append({'name': phase, 'ph': 'X', 'pid': 0, 'tid': 1, 'ts': t_ns / 1000, 'dur': dur_ns / 1000})
+                    t_ns += dur_ns
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+    # ===== overlay
+    def draw_overlay(self, screen_ptr: pygame.Surface, pos=(10, 40), target_ms: float = 1000 / 120) -> pygame.Rect:
+        x, y = pos
+        rect = pygame.Rect(x, y, GRAPH_WIDTH, GRAPH_HEIGHT + 40)
+        screen_ptr.fill((0, 0, 0), rect)
+
+        stats = self.percentiles()
+        label = f"p50 {stats['p50']:.2f}ms p95 {stats['p95']:.2f}ms p99 {stats['p99']:.2f}ms fps {self.fps():.0f}"
+        screen_ptr.blit(render_text(label, 8, 'white'), (x, y))
+        phases = self.phase_percentiles(50)
+        slowest = sorted(phases.items(), key=lambda item: -item[1])[:3]
+        screen_ptr.blit(render_text(' '.join(f'{phase} {ms:.2f}' for phase, ms in slowest), 8, 'gray70'), (x, y + 12))
+
+        # frame work time graph, dashed line is target frame time
+        graph_top = y + 36
+        n = min(self.count, GRAPH_WIDTH)
+        if n >= 2:
+            work_ms = self.work_ns()[-n:] / 1e6
+            points = self._graph_points[:n]
+            points[:, 0] = x + np.arange(n) * (GRAPH_WIDTH / n)
+            points[:, 1] = graph_top + GRAPH_HEIGHT - np.minimum(work_ms / (2 * target_ms), 1.0) * GRAPH_HEIGHT
+            pygame.draw.lines(screen_ptr, 'green', False, points.tolist())
+        target_y = graph_top + GRAPH_HEIGHT // 2
+        for dash_x in range(x, x + GRAPH_WIDTH, 8):
+            pygame.draw.line(screen_ptr, 'red', (dash_x, target_y), (dash_x + 4, target_y))
+        return rect
@@ -0,0 +1,201 @@
+'''
+deterministic input recording and replay
+
+file layout (little endian):
+    header: magic b'HDRC', version u16, reserved u16, seed u64, frame count u64, final state fingerprint u64,
+            world hash u64, world path length u32
+    world path: utf-8, absolute path of the world file loaded for the session (empty without world)
+    frames: frame count records of FRAME_DTYPE (one record per simulation step)
+
+version 1 files (no world fields) are still read as sessions without world
+
+replaying a recording headlessly with the same seed (and the same world) reproduces the session exactly,
+fingerprint of the final scene state is checked against the one stored on save
+'''
+import os
+import struct
+import hashlib
+import numpy as np
+
+from typing import Tuple
+from scene import Scene
+from headless import HeadlessRunner, MOVEMENT_KEYS
+
+RECORDING_MAGIC = b'HDRC'
+RECORDING_VERSION = 2
+HEADER_FORMAT = '<4sHHQQQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+WORLD_FORMAT = '<QI'  # follows the header since version 2
+WORLD_SIZE = struct.calcsize(WORLD_FORMAT)
+
+FRAME_DTYPE = np.dtype([
+    ('dt', '<f8'),  # exact float64 step, float32 would make replays diverge
+    ('keys', 'u1'),  # bit i = MOVEMENT_KEYS[i] pressed, VELOCITY_UPDATE_BIT = key event handled this step
+    ('mouse_x', '<i2'),
+    ('mouse_y', '<i2'),
+    ('buttons', 'u1'),  # bit 0 = left mouse button
+])
+VELOCITY_UPDATE_BIT = 0x80
+
+
+def movement_keys_bitmask(keys_pressed) -> int:
+    bitmask = 0
+    for i, key in enumerate(MOVEMENT_KEYS):
+        if keys_pressed[key]:
+            bitmask |= 1 << i
+    return bitmask
+
+
+class BitmaskKeys:
+    '''
+    pygame.key.get_pressed() stand-in built from recorded movement keys bitmask
+    '''
+    __slots__ = ('bitmask',)
+
+    def __init__(self, bitmask: int) -> None:
+        self.bitmask = bitmask
+
+    def __getitem__(self, key) -> bool:
+        if key not in MOVEMENT_KEYS:
+            return False
+        return bool(self.bitmask & (1 << MOVEMENT_KEYS.index(key)))
+
+
+def scene_fingerprint(scene: Scene) -> int:
+    '''
+    64 bit hash of simulation state (player, enemies, bullets), used as golden value for replays
+    '''
+    h = hashlib.blake2b(digest_size=8)
+    player = scene.player
+    h.update(np.asarray(player.current_position, dtype=np.float32).tobytes())
+    h.update(struct.pack('<dii', float(player.hitpoints), player.bullets_shot, player.bullets_hit))
+    n = scene.enemies.count
+    h.update(scene.enemies.gl_pos[:n].tobytes())
+    h.update(scene.enemies.hitpoints[:n].tobytes())
+    slots = player.bullets.alive_slots()
+    h.update(player.bullets.gl_pos[slots].tobytes())
+    return int.from_bytes(h.digest(), 'little')
+
+
+def world_file_hash(path: str) -> int:
+    '''
+    64 bit hash of world file contents, a replay must run on the exact walls of the session
+    '''
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as world_file:
+        for block in iter(lambda: world_file.read(1 << 20), b''):
+            h.update(block)
+    return int.from_bytes(h.digest(), 'little')
+
+
+class InputRecorder:
+
+    def __init__(self, seed: int, world_path: str = None, capacity: int = 1 << 14) -> None:
+        self.seed = seed
+        self.world_path = os.path.abspath(world_path) if world_path is not None else None
+        self.world_hash = world_file_hash(world_path) if world_path is not None else 0
+        self.frames = np.zeros(capacity, dtype=FRAME_DTYPE)
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, dt: float, keys_bitmask: int, m_xpos: int, m_ypos: int, is_shooting: bool) -> None:
+        if self.count == len(self.frames):
+            grown = np.zeros(2 * len(self.frames), dtype=FRAME_DTYPE)
+            grown[:self.count] = self.frames
+            self.frames = grown
+        self.frames[self.count] = (dt, keys_bitmask, m_xpos, m_ypos, int(is_shooting))
+        self.count += 1
+
+    def save(self, path: str, scene: Scene = None) -> None:
+        fingerprint = scene_fingerprint(scene) if scene is not None else 0
+        with open(path, 'wb') as f:
+            f.write(struct.pack(HEADER_FORMAT, RECORDING_MAGIC, RECORDING_VERSION, 0, self.seed, self.count, fingerprint))
+            world_path = self.world_path.encode() if self.world_path is not None else b''
+            f.write(struct.pack(WORLD_FORMAT, self.world_hash, len(world_path)))
+            f.write(world_path)
+            f.write(self.frames[:self.count].tobytes())
+
+
+def load_recording(path: str) -> Tuple[int, np.array, int, str, int]:
+    '''
+    returns (seed, frames, fingerprint, world path or None, world hash)
+    '''
+    world_path, world_hash = None, 0
+    with open(path, 'rb') as f:
+        magic, version, _, seed, frame_count, fingerprint = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        if magic != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a recording (magic: {magic})")
+        if version not in (1, RECORDING_VERSION):
+            raise ValueError(f"unsupported recording version {version}, expected {RECORDING_VERSION}")
+        frames_offset = HEADER_SIZE
+        if version >= 2:
+            world_hash, path_length = struct.unpack(WORLD_FORMAT, f.read(WORLD_SIZE))
+            if path_length > 0:
+                world_path = f.read(path_length).decode()
+            frames_offset += WORLD_SIZE + path_length
+    frames = np.fromfile(path, dtype=FRAME_DTYPE, count=frame_count, offset=frames_offset)
+    return seed, frames, fingerprint, world_path, world_hash
+
+
+class RecordedInput:
+    '''
+    input script for HeadlessRunner that plays back recorded frames
+    '''
+    def __init__(self, frames: np.array) -> None:
+        self.frames = frames
+        # plain python lists, indexing structured arrays per frame is slow
+        self.dts = frames['dt'].tolist()
+        self.keys_bitmasks = frames['keys'].tolist()
+        self.mouse_x = frames['mouse_x'].tolist()
+        self.mouse_y = frames['mouse_y'].tolist()
+        self.buttons = frames['buttons'].tolist()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def keys(self, frame: int) -> BitmaskKeys:
+        return BitmaskKeys(self.keys_bitmasks[frame] & ~VELOCITY_UPDATE_BIT)
+
+    def keys_changed(self, frame: int) -> bool:
+        return bool(self.keys_bitmasks[frame] & VELOCITY_UPDATE_BIT)
+
+    def mouse(self, frame: int) -> Tuple[int, int]:
+        return self.mouse_x[frame], self.mouse_y[frame]
+
+    def shooting(self, frame: int) -> bool:
+        return bool(self.buttons[frame] & 1)
+
+    def dt(self, frame: int) -> float:
+        return self.dts[frame]
+
+
+def replay(path: str, timed: bool = False) -> Tuple[HeadlessRunner, float, bool]:
+    '''
+    re-runs a recorded session as fast as possible
+    returns (runner, elapsed seconds, fingerprint matches)
+    '''
+    seed, frames, fingerprint, world_path, world_hash = load_recording(path)
+    script = RecordedInput(frames)
+    scene = Scene(seed)
+    if world_path is not None:
+        if not os.path.exists(world_path):
+            raise ValueError(f'world {world_path} of the recording is missing')
+        if world_file_hash(world_path) != world_hash:
+            raise ValueError(f'world {world_path} changed since the recording was made')
+        scene.load_world(world_path)
+    runner = HeadlessRunner(scene, script)
+    elapsed = runner.run(len(script), timed=timed)
+    matches = fingerprint == 0 or scene_fingerprint(runner.scene) == fingerprint
+    return runner, elapsed, matches
+
+
+if __name__ == '__main__':
+    import sys
+    runner, elapsed, matches = replay(sys.argv[1], timed=True)
+    n_frames = runner.frame
+    print(f'{n_frames} frames replayed in {elapsed:.3f}s ({n_frames / max(elapsed, 1e-9):.0f} frames/s), '
+          f'score: {runner.score}, fingerprint {"ok" if matches else "MISMATCH"}')
+    for phase, ns in runner.phase_ns_per_frame(max(n_frames, 1)).items():
+        print(f'{phase:>12}: {ns:10.0f} ns/frame')
@@ -3,11 +3,14 @@ import numpy.linalg as linalg
 import pygame
 import copy
 import ctypes
-import numba
-import functools
+import time
 
 from typing import Tuple, List, Union
 from config import *
+from collision import HashGrid, nearest_overlap, collide_bullets, column_max
+from kernels import kernel
+from steering import SteeringGrid
+from spawning import SpawnScheduler
 # ======= CONSTANTS ===========
 PLAYER_MAX_VELOCITY = 1
 EPSILON = 0.000001
@@ -16,29 +19,10 @@ WINDOW_HEIGHT = 400
 ENEMY_ON_SPAWN_MIN_DIST = 1.5
 VIEWPORT = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
 
-# ===== import some C
-ctypes_fast_math_lib = ctypes.CDLL('lib/fast_math.dll')
-# Define the argument and return types of the C functions
-ctypes_fast_math_lib.map_opengl_to_screen_2d.argtypes = [
-    ctypes.c_float,  # x
-    ctypes.c_float,  # y
-    ctypes.c_short,  # w
-    ctypes.c_short,  # h
-    ctypes.POINTER(ctypes.c_float)  # result
-]
-ctypes_fast_math_lib.map_opengl_to_screen_2d.restype = None
-
-ctypes_fast_math_lib.map_screen_to_opengl.argtypes = [
-    ctypes.c_float,  # x
-    ctypes.c_float,  # y
-    ctypes.c_short,  # w
-    ctypes.c_short,  # h
-    ctypes.POINTER(ctypes.c_float)  # result
-]
-ctypes_fast_math_lib.map_screen_to_opengl.restype = None
-
-ctypes_fast_math_lib.Q_rsqrt.argtypes = [ctypes.c_float]
-ctypes_fast_math_lib.Q_rsqrt.restype = ctypes.c_float
+# ===== import some C (native library is optional, fast_math falls back to numpy)
+from fast_math import (
+    fast_inverse_root, affine_transform, map_opengl_to_screen_2d, map_screen_to_opengl_2d
+)
 
 # ========== HELPER FUNCTIONS =======================
 def get_translation_matrix_2d(tx: float, ty: float) -> np.array:
@@ -109,7 +93,7 @@ def get_rotation_matrix_2d(theta: float):
 #     # return np.array([new_gl_xpos[0], new_gl_ypos[0]])
 
 
-@numba.njit
+@kernel(warmup_args=lambda: (np.zeros(2, dtype=np.float32), np.zeros(2, dtype=np.float32)))
 def fast_dist(v1: np.array, v2: np.array):
     v = (v1 - v2).astype('float64')
     return np.sqrt(v[0] ** 2 + v[1] ** 2)
@@ -118,71 +102,384 @@ def fast_dist(v1: np.array, v2: np.array):
 def ctypes_map_opengl_to_screen(gl_pos: np.array, viewport: np.array):
     if len(gl_pos) != 2 or len(viewport) != 2:
         raise ValueError(f"Wrong dimension of input vectors, pg_pos: {gl_pos.shape}, viewport: {viewport.shape}")
-     
-    result = np.zeros(2, dtype=np.float32)
-    
-    ctypes_fast_math_lib.map_opengl_to_screen_2d(
-        ctypes.c_float(gl_pos[0]), ctypes.c_float(gl_pos[1]),
-        ctypes.c_short(viewport[0]), ctypes.c_short(viewport[1]),
-        result.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-    )
-    
-    return tuple(result.tolist())
+    return map_opengl_to_screen_2d(gl_pos[0], gl_pos[1], viewport[0], viewport[1])
 
 
 def ctypes_map_screen_to_opengl(pg_pos: np.array, viewport: np.array):
     if len(pg_pos) != 2 or len(viewport) != 2:
         raise ValueError(f"Wrong dimension of input vectors, pg_pos: {pg_pos.shape}, viewport: {viewport.shape}")
-     
-    result = np.zeros(2, dtype=np.float32)
-    
-    ctypes_fast_math_lib.map_screen_to_opengl(
-        ctypes.c_float(pg_pos[0]), ctypes.c_float(pg_pos[1]),
-        ctypes.c_short(viewport[0]), ctypes.c_short(viewport[1]),
-        result.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
-    )
-    
-    return tuple(result.tolist())
+    return map_screen_to_opengl_2d(pg_pos[0], pg_pos[1], viewport[0], viewport[1])
+
+
+# ===== batched coordinate transforms
+# viewport affine precomputed once: pg = gl * scale + offset, gl = pg * inv_scale + inv_offset
+OPENGL_TO_SCREEN_SCALE = np.array([0.5 * WINDOW_WIDTH, -0.5 * WINDOW_HEIGHT], dtype=np.float32)
+OPENGL_TO_SCREEN_OFFSET = np.array([0.5 * WINDOW_WIDTH, 0.5 * WINDOW_HEIGHT], dtype=np.float32)
+SCREEN_TO_OPENGL_SCALE = np.array([2.0 / WINDOW_WIDTH, -2.0 / WINDOW_HEIGHT], dtype=np.float32)
+SCREEN_TO_OPENGL_OFFSET = np.array([-1.0, 1.0], dtype=np.float32)
+# pixels per gl unit along x and y (lengths only, sign of the y axis dropped)
+GL_TO_PIXELS = np.abs(OPENGL_TO_SCREEN_SCALE)
+GL_TO_PIXELS_MIN = float(GL_TO_PIXELS.min())
 
 
-def ctypes_fast_inverse_root(number: float):
-    return ctypes_fast_math_lib.Q_rsqrt(ctypes.c_float(number))#.value
+def map_opengl_to_screen_batch(gl_pos: np.array, out: np.array) -> np.array:
+    '''
+    gl_pos: (N, 2) float32, out: (N, 2) float32 buffer supplied by caller (can be gl_pos itself)
+    '''
+    return affine_transform(gl_pos, OPENGL_TO_SCREEN_SCALE, OPENGL_TO_SCREEN_OFFSET, out)
+
+
+def map_screen_to_opengl_batch(pg_pos: np.array, out: np.array) -> np.array:
+    '''
+    pg_pos: (N, 2) float32, out: (N, 2) float32 buffer supplied by caller (can be pg_pos itself)
+    '''
+    return affine_transform(pg_pos, SCREEN_TO_OPENGL_SCALE, SCREEN_TO_OPENGL_OFFSET, out)
 
-# ====================================
-# TODO
-class Wall: ...
-class Animation: ...
+
+# same viewport mapping as 3x3 homogeneous matrix, composed with camera view matrix
+OPENGL_TO_SCREEN_MATRIX = np.array([
+    [OPENGL_TO_SCREEN_SCALE[0], 0.0, OPENGL_TO_SCREEN_OFFSET[0]],
+    [0.0, OPENGL_TO_SCREEN_SCALE[1], OPENGL_TO_SCREEN_OFFSET[1]],
+    [0.0, 0.0, 1.0]
+], dtype=np.float64)
+CULL_MARGIN = 32  # pg pixels around the screen still drawn, must cover largest sprite radius
+
+
+def transform_points(matrix: np.array, points: np.array, out: np.array) -> np.array:
+    '''
+    out = matrix applied to (N, 2) points (out can be points itself)
+    '''
+    if matrix[0, 1] == 0 and matrix[1, 0] == 0:
+        # axis aligned (no camera rotation), goes through the same native kernel as the viewport mapping
+        scale = np.array([matrix[0, 0], matrix[1, 1]], dtype=np.float32)
+        offset = np.array([matrix[0, 2], matrix[1, 2]], dtype=np.float32)
+        return affine_transform(points, scale, offset, out)
+    linear = matrix[:2, :2].T.astype(np.float32)
+    translation = matrix[:2, 2].astype(np.float32)
+    np.add(points @ linear, translation, out=out)
+    return out
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32), np.zeros(2, dtype=np.float32),
+    np.ones(2, dtype=np.float32), np.ones(2, dtype=np.float32), np.zeros(2, dtype=np.float32),
+    np.zeros((2, 2), dtype=np.float32), np.zeros(2, dtype=np.int32)
+))
+def project_circles(gl_pos, radius, gl_min, gl_max, scale, offset, out_corner, out_radius):
+    '''
+    culls (N, 2) circles to the visible rectangle and maps the rest through an axis aligned view,
+    writes sprite top-left corners (pg) and rounded radii of the visible circles, returns their count
+    '''
+    k = 0
+    for i in range(len(gl_pos)):
+        x = gl_pos[i, 0]
+        y = gl_pos[i, 1]
+        if x < gl_min[0] or x > gl_max[0] or y < gl_min[1] or y > gl_max[1]:
+            continue
+        r = np.int32(np.rint(radius[i]))
+        out_corner[k, 0] = x * scale[0] + offset[0] - r
+        out_corner[k, 1] = y * scale[1] + offset[1] - r
+        out_radius[k] = r
+        k += 1
+    return k
+
+
+class ViewTransform:
+    '''
+    world (gl) -> screen (pg) affine matrix together with the world rectangle that is visible through it,
+    entities outside the rectangle (screen + margin) are culled before they are transformed and drawn
+    set_matrix updates the transform in place (camera keeps one instance, nothing allocated while it moves)
+    '''
+    __slots__ = ('matrix', 'gl_min', 'gl_max', 'scale', 'offset', 'axis_aligned', 'margin')
+
+    def __init__(self, matrix: np.array, margin: float = CULL_MARGIN) -> None:
+        self.matrix = np.zeros((3, 3), dtype=np.float64)
+        self.gl_min = np.zeros(2, dtype=np.float32)
+        self.gl_max = np.zeros(2, dtype=np.float32)
+        self.scale = np.zeros(2, dtype=np.float32)  # diagonal and translation of axis aligned matrices
+        self.offset = np.zeros(2, dtype=np.float32)
+        self.axis_aligned = True
+        self.margin = margin
+        self.set_matrix(matrix)
+
+    def set_matrix(self, matrix: np.array) -> None:
+        np.copyto(self.matrix, matrix)
+        self.axis_aligned = matrix[0, 1] == 0 and matrix[1, 0] == 0
+        margin = self.margin
+        if not self.axis_aligned:
+            screen_corners = np.array([
+                (-margin, -margin, 1.0), (WINDOW_WIDTH + margin, -margin, 1.0),
+                (-margin, WINDOW_HEIGHT + margin, 1.0), (WINDOW_WIDTH + margin, WINDOW_HEIGHT + margin, 1.0)
+            ])
+            world_corners = screen_corners @ np.linalg.inv(self.matrix).T
+            self.gl_min[:] = world_corners[:, :2].min(axis=0)
+            self.gl_max[:] = world_corners[:, :2].max(axis=0)
+            return
+        # pg = gl * scale + offset  =>  gl = (pg - offset) / scale, per axis
+        for axis, screen_size in ((0, WINDOW_WIDTH), (1, WINDOW_HEIGHT)):
+            scale = float(matrix[axis, axis])
+            offset = float(matrix[axis, 2])
+            self.scale[axis] = scale
+            self.offset[axis] = offset
+            low = (-margin - offset) / scale
+            high = (screen_size + margin - offset) / scale
+            self.gl_min[axis] = min(low, high)
+            self.gl_max[axis] = max(low, high)
+
+    def apply(self, points: np.array, out: np.array) -> np.array:
+        if self.axis_aligned:
+            return affine_transform(points, self.scale, self.offset, out)
+        return transform_points(self.matrix, points, out)
+
+    def visible(self, gl_pos: np.array) -> np.array:
+        '''
+        indices of (N, 2) gl positions inside visible rectangle
+        '''
+        inside = (gl_pos >= self.gl_min) & (gl_pos <= self.gl_max)
+        return np.flatnonzero(inside[:, 0] & inside[:, 1])
+
+    def project_visible(self, gl_pos: np.array, out_buffer: 'ScratchBuffer') -> Tuple[np.array, np.array]:
+        '''
+        returns (pg positions of visible entities written to out_buffer, their indices)
+        '''
+        visible = self.visible(gl_pos)
+        pg_pos = out_buffer.get(len(visible))
+        np.take(gl_pos, visible, axis=0, out=pg_pos)
+        return self.apply(pg_pos, out=pg_pos), visible
+
+    def project_circles(self, gl_pos: np.array, radius: np.array,
+                        corner_buffer: 'ScratchBuffer', radius_buffer: np.array) -> Tuple[np.array, np.array]:
+        '''
+        returns (sprite top-left corners, int32 radii) of visible circles, written to corner_buffer / radius_buffer
+        (radius_buffer must hold len(gl_pos) values)
+        '''
+        corners = corner_buffer.get(len(gl_pos))
+        if self.axis_aligned:
+            k = project_circles(gl_pos, radius, self.gl_min, self.gl_max, self.scale, self.offset, corners, radius_buffer)
+            return corners[:k], radius_buffer[:k]
+        # rotated views (not used by Camera) take the numpy path, it allocates
+        pg_pos, visible = self.project_visible(gl_pos, corner_buffer)
+        int_radius = radius_buffer[:len(visible)]
+        np.rint(radius[visible], out=int_radius, casting='unsafe')
+        pg_pos -= int_radius[:, None]
+        return pg_pos, int_radius
+
+
+SCREEN_VIEW = ViewTransform(OPENGL_TO_SCREEN_MATRIX)  # no camera
+
+
+class ScratchBuffer:
+    '''
+    (N, width) float32 output buffer for batch transforms, reallocates only when it has to grow
+    '''
+    def __init__(self, capacity: int = 64, width: int = 2) -> None:
+        self.data = np.zeros((capacity, width), dtype=np.float32)
+
+    def get(self, n: int) -> np.array:
+        if n > len(self.data):
+            self.data = np.zeros((max(n, 2 * len(self.data)), self.data.shape[1]), dtype=np.float32)
+        return self.data[:n]
 
 
 # ============ ENEMY LOGIC ==============
+ENEMY_RADIUS = 10  # in pg coordinates
+ENEMY_BASE_HITPOINTS = 5
+ENEMY_BASE_SPEED = 0.5
+ENEMY_BASE_DAMAGE = 1.0
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32),
+    np.ones(2, dtype=np.float32), np.ones(2, dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.ones(2, dtype=np.float32), 2, np.zeros((2, 2), dtype=np.float32)
+))
+def compact_enemies(gl_pos, prev_gl_pos, velocity, hitpoints, speed, damage, radius, n, dead_gl_pos):
+    '''
+    removes rows [0, n) with hitpoints <= 0: their positions go to dead_gl_pos in row order, holes left
+    inside the kept range are filled with alive rows from the tail in row order, returns number removed
+    '''
+    n_dead = 0
+    for i in range(n):
+        if hitpoints[i] <= 0:
+            dead_gl_pos[n_dead, 0] = gl_pos[i, 0]
+            dead_gl_pos[n_dead, 1] = gl_pos[i, 1]
+            n_dead += 1
+    new_count = n - n_dead
+    filler = new_count
+    for hole in range(new_count):
+        if hitpoints[hole] > 0:
+            continue
+        while hitpoints[filler] <= 0:
+            filler += 1
+        for axis in range(2):
+            gl_pos[hole, axis] = gl_pos[filler, axis]
+            prev_gl_pos[hole, axis] = prev_gl_pos[filler, axis]
+            velocity[hole, axis] = velocity[filler, axis]
+        hitpoints[hole] = hitpoints[filler]
+        speed[hole] = speed[filler]
+        damage[hole] = damage[filler]
+        radius[hole] = radius[filler]
+        filler += 1
+    return n_dead
+
+
+class EnemyStore:
+    '''
+    struct-of-arrays storage for all enemies of the scene
+    rows [0, count) are alive, removal moves rows from the tail into the holes (swap-remove)
+    so columns stay contiguous and every update is a whole-array operation
+    '''
+    COLUMNS = ('gl_pos', 'prev_gl_pos', 'velocity', 'hitpoints', 'speed', 'damage', 'radius')
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.count = 0
+        self.capacity = 0
+        self.gl_pos = np.zeros((0, 2), dtype=np.float32)
+        self.prev_gl_pos = np.zeros((0, 2), dtype=np.float32)  # position at previous simulation step
+        self.velocity = np.zeros((0, 2), dtype=np.float32)
+        self.hitpoints = np.zeros(0, dtype=np.float32)
+        self.speed = np.zeros(0, dtype=np.float32)
+        self.damage = np.zeros(0, dtype=np.float32)  # base damage * damage multiplier
+        self.radius = np.zeros(0, dtype=np.float32)
+        self.dead_buffer = np.zeros((0, 2), dtype=np.float32)  # capacity rows, backs dead_gl_pos
+        self.dead_gl_pos = self.dead_buffer[:0]  # positions of enemies removed by last remove_dead
+        self.steering = SteeringGrid()
+        self.reserve(capacity)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def reserve(self, capacity: int) -> None:
+        if capacity <= self.capacity:
+            return
+        for name in self.COLUMNS:
+            old_column = getattr(self, name)
+            new_column = np.zeros((capacity,) + old_column.shape[1:], dtype=np.float32)
+            new_column[:self.count] = old_column[:self.count]
+            setattr(self, name, new_column)
+        n_dead = len(self.dead_gl_pos)
+        self.dead_buffer = np.zeros((capacity, 2), dtype=np.float32)
+        self.dead_buffer[:n_dead] = self.dead_gl_pos
+        self.dead_gl_pos = self.dead_buffer[:n_dead]
+        self.capacity = capacity
+
+    def add(self, gl_pos: np.array, hitpoints: float = ENEMY_BASE_HITPOINTS,
+            speed: float = ENEMY_BASE_SPEED, damage: float = ENEMY_BASE_DAMAGE) -> int:
+        if self.count == self.capacity:
+            self.reserve(max(2 * self.capacity, 1))
+        i = self.count
+        self.gl_pos[i] = gl_pos
+        self.prev_gl_pos[i] = gl_pos
+        self.velocity[i] = 0
+        self.hitpoints[i] = hitpoints
+        self.speed[i] = speed
+        self.damage[i] = damage
+        self.radius[i] = ENEMY_RADIUS
+        self.count += 1
+        return i
+
+    def add_batch(self, gl_pos: np.array, hitpoints: float = ENEMY_BASE_HITPOINTS,
+                  speed: float = ENEMY_BASE_SPEED, damage: float = ENEMY_BASE_DAMAGE) -> slice:
+        '''
+        appends (k, 2) positions as k new enemies, returns slice of their rows
+        '''
+        k = len(gl_pos)
+        if self.count + k > self.capacity:
+            self.reserve(max(2 * self.capacity, self.count + k))
+        rows = slice(self.count, self.count + k)
+        self.gl_pos[rows] = gl_pos
+        self.prev_gl_pos[rows] = gl_pos
+        self.velocity[rows] = 0
+        self.hitpoints[rows] = hitpoints
+        self.speed[rows] = speed
+        self.damage[rows] = damage
+        self.radius[rows] = ENEMY_RADIUS
+        self.count += k
+        return rows
+
+    def remove_dead(self) -> int:
+        n = self.count
+        if n == 0:
+            return 0
+        # dead rows inside the kept range are filled with alive rows from the tail
+        n_dead = compact_enemies(
+            self.gl_pos, self.prev_gl_pos, self.velocity, self.hitpoints, self.speed, self.damage, self.radius,
+            n, self.dead_buffer
+        )
+        if n_dead == 0:
+            return 0  # usual case, dead_gl_pos still lists the last removed enemies
+        self.dead_gl_pos = self.dead_buffer[:n_dead]
+        self.count = n - n_dead
+        return n_dead
+
+    def update(self, dt: float, player_gl_pos: np.array) -> None:
+        n = self.count
+        if n == 0:
+            return
+        # seek player while keeping spacing (separation) and sticking to the horde (cohesion)
+        self.steering.step(self.gl_pos, self.velocity, self.speed, n, player_gl_pos, dt)
+
+
 class Enemy:
-    
-    def __init__(self, gl_pos: np.array) -> None:
-        self.gl_pos = gl_pos
-        self.current_velocity = np.array([0, 0])
-        self.radius = 10  # in pg coordinates
+    '''
+    lightweight view of one row of EnemyStore (kept for code that works with single enemies)
+    index goes stale after EnemyStore.remove_dead, do not hold views across frames
+    '''
+    __slots__ = ('store', 'index')
+
+    radius = ENEMY_RADIUS
+    base_armor = 0.0
+    damage_multiplier = 1.0
+
+    def __init__(self, store: EnemyStore, index: int) -> None:
+        self.store = store
+        self.index = index
+
+    @property
+    def gl_pos(self) -> np.array:
+        return self.store.gl_pos[self.index]
+
+    @gl_pos.setter
+    def gl_pos(self, value) -> None:
+        self.store.gl_pos[self.index] = value
+
+    @property
+    def current_velocity(self) -> np.array:
+        return self.store.velocity[self.index]
+
+    @current_velocity.setter
+    def current_velocity(self, value) -> None:
+        self.store.velocity[self.index] = value
+
+    @property
+    def hitpoints(self) -> float:
+        return float(self.store.hitpoints[self.index])
+
+    @hitpoints.setter
+    def hitpoints(self, value: float) -> None:
+        self.store.hitpoints[self.index] = value
+
+    @property
+    def base_speed(self) -> float:
+        return float(self.store.speed[self.index])
+
+    @property
+    def base_damage(self) -> float:
+        return float(self.store.damage[self.index])
 
-        self.hitpoints = 5
-        self.base_armor = 0.0
-        self.base_speed = 0.5
-        self.base_damage = 1.0
-        self.damage_multiplier = 1.0
-    
     def get_damage(self):
         return self.base_damage * self.damage_multiplier
 
     def update_velocity(self, player_gl_pos: np.array):
-        new_velocity_vector = player_gl_pos - self.gl_pos + EPSILON
-        # norm = fast_dist(player_gl_pos, self.gl_pos)
-        self.current_velocity = new_velocity_vector.copy() * \
-            ctypes_fast_inverse_root(np.dot(new_velocity_vector, new_velocity_vector))
-        # if norm < EPSILON:
-        #     return
-        # self.current_velocity /= norm
-    
+        velocity = self.current_velocity  # row view, updated in place
+        np.subtract(player_gl_pos, self.gl_pos, out=velocity)
+        velocity += EPSILON
+        velocity *= fast_inverse_root(float(np.dot(velocity, velocity)))
+
     def update_position(self, dt):
-        self.gl_pos += self.current_velocity * self.base_speed * dt
-    
+        gl_pos = self.gl_pos
+        gl_pos += self.current_velocity * np.float32(self.base_speed * dt)
+
     def update_state(self, dt: float, player_gl_pos: np.array):
         self.update_velocity(player_gl_pos)
         self.update_position(dt)
@@ -190,47 +487,218 @@ class Enemy:
 
 
 # ================== PLAYER LOGIC =================================
+BULLET_POOL_CAPACITY = 512
+BULLET_MAX_RANGE = 1.5  # bullets further than this from player are culled (gl units)
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.bool_), np.zeros(2, dtype=np.int32), 0,
+    np.zeros(2, dtype=np.float32), 1.0
+))
+def cull_bullets(gl_pos, alive, free_slots, free_count, center_gl_pos, max_range_sq):
+    '''
+    frees slots of alive bullets at least sqrt(max_range_sq) from center, returns number culled
+    '''
+    culled = 0
+    for slot in range(len(alive)):
+        if not alive[slot]:
+            continue
+        dx = gl_pos[slot, 0] - center_gl_pos[0]
+        dy = gl_pos[slot, 1] - center_gl_pos[1]
+        if dx * dx + dy * dy >= max_range_sq:
+            alive[slot] = False
+            free_slots[free_count + culled] = slot
+            culled += 1
+    return culled
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.zeros(2, dtype=np.float32),
+    np.ones(2, dtype=np.bool_), 0.01
+))
+def advance_bullets(gl_pos, dir_vec, speed, alive, dt):
+    for slot in range(len(alive)):
+        if alive[slot]:
+            gl_pos[slot, 0] += dir_vec[slot, 0] * speed[slot] * dt
+            gl_pos[slot, 1] += dir_vec[slot, 1] * speed[slot] * dt
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32),
+    np.ones(2, dtype=np.bool_), 1.0, np.zeros((2, 2), dtype=np.float32), np.zeros(2, dtype=np.float32)
+))
+def gather_alive_bullets(gl_pos, prev_gl_pos, pg_radius, alive, alpha, out_gl_pos, out_pg_radius):
+    '''
+    interpolated positions and radii of alive bullets in slot order, returns their count
+    '''
+    alpha = np.float32(alpha)
+    k = 0
+    for slot in range(len(alive)):
+        if not alive[slot]:
+            continue
+        for axis in range(2):
+            out_gl_pos[k, axis] = prev_gl_pos[slot, axis] + (gl_pos[slot, axis] - prev_gl_pos[slot, axis]) * alpha
+        out_pg_radius[k] = pg_radius[slot]
+        k += 1
+    return k
+
+
+class BulletPool:
+    '''
+    fixed-capacity bullet storage, every slot owns its own row in the numpy columns
+    free slots are kept on a preallocated stack so shooting never allocates
+    '''
+    COLUMNS = ('gl_pos', 'prev_gl_pos', 'dir_vec', 'speed', 'pg_radius')
+
+    def __init__(self, capacity: int = BULLET_POOL_CAPACITY) -> None:
+        self.capacity = capacity
+        self.gl_pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.prev_gl_pos = np.zeros((capacity, 2), dtype=np.float32)  # position at previous simulation step
+        self.dir_vec = np.zeros((capacity, 2), dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.pg_radius = np.zeros(capacity, dtype=np.float32)  # radius in pg coordinates
+        self.alive = np.zeros(capacity, dtype=np.bool_)
+
+        # stack of free slots, top is free_slots[free_count - 1]
+        self.free_slots = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+
+
+    def __len__(self) -> int:
+        return self.capacity - self.free_count
+
+    def spawn(self, gl_pos: np.array, dir_vec: np.array, pg_radius: float, speed: float) -> int:
+        '''
+        returns slot of the new bullet or -1 if pool is full
+        '''
+        if self.free_count == 0:
+            return -1
+        self.free_count -= 1
+        slot = self.free_slots[self.free_count]
+        self.gl_pos[slot] = gl_pos
+        self.prev_gl_pos[slot] = gl_pos
+        self.dir_vec[slot] = dir_vec
+        self.speed[slot] = speed
+        self.pg_radius[slot] = pg_radius
+        self.alive[slot] = True
+        return slot
+
+    def kill(self, slot: int) -> None:
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.free_slots[self.free_count] = slot
+        self.free_count += 1
+
+    def kill_slots(self, slots: np.array) -> int:
+        # slots must be alive and unique
+        k = len(slots)
+        if k == 0:
+            return 0
+        self.alive[slots] = False
+        self.free_slots[self.free_count:self.free_count + k] = slots
+        self.free_count += k
+        return k
+
+    def alive_slots(self) -> np.array:
+        return np.flatnonzero(self.alive)
+
+    def gather_alive(self, alpha: float, out_gl_pos: np.array, out_pg_radius: np.array) -> int:
+        '''
+        out buffers hold capacity rows, the first (returned) count are written
+        '''
+        return gather_alive_bullets(self.gl_pos, self.prev_gl_pos, self.pg_radius, self.alive, alpha, out_gl_pos, out_pg_radius)
+
+    def cull_out_of_range(self, center_gl_pos: np.array, max_range: float = BULLET_MAX_RANGE) -> int:
+        culled = cull_bullets(self.gl_pos, self.alive, self.free_slots, self.free_count, center_gl_pos, max_range * max_range)
+        self.free_count += culled
+        return culled
+
+    def update(self, dt: float) -> None:
+        advance_bullets(self.gl_pos, self.dir_vec, self.speed, self.alive, dt)
+
+
 class Bullet:
-    
-    def __init__(self, gl_pos: np.array, dir_vec: np.array, pg_radius, speed) -> None:
-        self.gl_pos = gl_pos
-        self.dir_vec = dir_vec
-        self.pg_radius = pg_radius  # radius in pg coordinates
-        self.speed = speed
+    '''
+    lightweight view of one BulletPool slot
+    '''
+    __slots__ = ('pool', 'slot')
+
+    def __init__(self, pool: BulletPool, slot: int) -> None:
+        self.pool = pool
+        self.slot = slot
+
+    @property
+    def gl_pos(self) -> np.array:
+        return self.pool.gl_pos[self.slot]
+
+    @gl_pos.setter
+    def gl_pos(self, value) -> None:
+        self.pool.gl_pos[self.slot] = value
+
+    @property
+    def dir_vec(self) -> np.array:
+        return self.pool.dir_vec[self.slot]
+
+    @property
+    def pg_radius(self) -> float:
+        return float(self.pool.pg_radius[self.slot])
+
+    @property
+    def speed(self) -> float:
+        return float(self.pool.speed[self.slot])
     
     def update(self, dt) -> None:
         self.gl_pos += self.dir_vec * self.speed * dt
     
     def check_collision(self, enemy_obj) -> bool:
-        # enemy_pg_pos = map_opengl_to_pg_coordinates_2d(enemy_obj.gl_pos.copy(), VIEWPORT)
-        # bullet_pg_pos = map_opengl_to_pg_coordinates_2d(self.gl_pos.copy(), VIEWPORT)
-        enemy_pg_pos = np.array(ctypes_map_opengl_to_screen(enemy_obj.gl_pos, VIEWPORT))
-        bullet_pg_pos = np.array(ctypes_map_opengl_to_screen(self.gl_pos, VIEWPORT))
-        bullet_enemy_dist = fast_dist(bullet_pg_pos, enemy_pg_pos)
+        pg_pos = map_opengl_to_screen_batch(np.stack((self.gl_pos, enemy_obj.gl_pos)), out=np.zeros((2, 2), dtype=np.float32))
+        bullet_enemy_dist = fast_dist(pg_pos[0], pg_pos[1])
         # print(bullet_enemy_dist)
         # print(self.pg_radius, enemy_obj.radius)
         return bullet_enemy_dist  <= (self.pg_radius + enemy_obj.radius)
 
 
-class Player:
+# movement keys (d, a, s, w) -> direction, velocity = keys_mask @ MOVE_DIRECTIONS
+MOVE_KEYS = (pygame.K_d, pygame.K_a, pygame.K_s, pygame.K_w)
+MOVE_DIRECTIONS = np.array([(1, 0), (-1, 0), (0, -1), (0, 1)], dtype=np.float32)
 
-    def __init__(self) -> None:
-        self.current_position = np.array([0, 0]).astype("float32")
-        self.current_weapon_direction = np.array([1, 0]).astype("float32")
-        self.current_velocity = np.array([0, 0]).astype("float32")
-        self.current_dv = np.array([0, 0]).astype("float32")
+PLAYER_HITPOINTS = 100
+PLAYER_RADIUS = 15  # in pg coordinates
+PLAYER_DAMAGE = 1
+PLAYER_SHOOT_PERIOD = 0.1
+PLAYER_BULLET_RADIUS = 5  # in pg coordinates
+PLAYER_BULLET_SPEED = 5
+PLAYER_INVINCIBILITY_TIME = 0.5  # after being hit
+PLAYER_KNOCKBACK_TIME = 0.2
+PLAYER_KNOCKBACK_SPEED = 2.0  # knockback moves the player at this many times its unit knockback vector
 
-        self.hitpoints = 100
-        self.base_damage = 1
+
+class Player:
+    '''
+    all vectors are float32 and updated in place (no per-frame allocations, render/recording code may hold views)
+    '''
+    def __init__(self) -> None:
+        self.current_position = np.zeros(2, dtype=np.float32)
+        self.previous_position = np.zeros(2, dtype=np.float32)  # at previous simulation step
+        self.current_weapon_direction = np.array([1, 0], dtype=np.float32)
+        self.current_velocity = np.zeros(2, dtype=np.float32)
+        self.current_dv = np.zeros(2, dtype=np.float32)
+        self.mouse_pos = np.zeros(2, dtype=np.float32)  # scratch for mouse coordinates transform
+        self.keys_mask = np.zeros(len(MOVE_KEYS), dtype=np.float32)
+        self.step_vec = np.zeros(2, dtype=np.float32)  # scratch for velocity * dt
+
+        self.hitpoints = PLAYER_HITPOINTS
+        self.base_damage = PLAYER_DAMAGE
         self.base_armor = 0.0
         self.base_dash_frequency = 1.0
-        self.base_radius = 15
+        self.base_radius = PLAYER_RADIUS
 
         self.damage_multiplier = 1.0
 
-        self.base_shoot_frequency = 0.1
-        self.base_bullet_radius = 5
-        self.base_bullet_speed = 5
+        self.base_shoot_frequency = PLAYER_SHOOT_PERIOD
+        self.base_bullet_radius = PLAYER_BULLET_RADIUS
+        self.base_bullet_speed = PLAYER_BULLET_SPEED
 
         self.cooldown_shoot = 0.0
         self.cooldown_dash = 0.0
@@ -238,11 +706,11 @@ class Player:
         self.invincibility_time_left = 0.0
         self.is_invincible = False
         
-        self.knockback_vector = np.array([0, 0])
+        self.knockback_vector = np.zeros(2, dtype=np.float32)
         self.knockback_time_left = 0.0
         self.is_knockbacked = False
 
-        self.bullets_alive: list[Bullet] = []
+        self.bullets = BulletPool()
         self.bullets_shot = 0
         self.bullets_hit = 0
 
@@ -251,73 +719,65 @@ class Player:
         if self.cooldown_shoot >= EPSILON:
             return
         
-        new_bullet = Bullet(
+        new_bullet_slot = self.bullets.spawn(
             self.current_position, self.current_weapon_direction, 
             self.base_bullet_radius, self.base_bullet_speed
         )
-        self.bullets_alive += [new_bullet]
+        if new_bullet_slot < 0:
+            return  # pool is full
         self.cooldown_shoot = self.base_shoot_frequency
         self.bullets_shot += 1
 
+    @property
+    def bullets_alive(self) -> List[Bullet]:
+        # views over bullet pool, prefer working with self.bullets columns directly
+        return [Bullet(self.bullets, slot) for slot in self.bullets.alive_slots()]
+
     def check_enemy_collision(self, enemy_obj) -> bool:
         if self.is_invincible:
             return False
         
-        enemy_pg_pos = np.array(ctypes_map_opengl_to_screen(enemy_obj.gl_pos, VIEWPORT))
-        player_pg_pos = np.array(ctypes_map_opengl_to_screen(self.current_position, VIEWPORT))
-        return fast_dist(player_pg_pos, enemy_pg_pos) <= (self.base_radius + enemy_obj.radius)
+        pg_pos = map_opengl_to_screen_batch(np.stack((self.current_position, enemy_obj.gl_pos)), out=np.zeros((2, 2), dtype=np.float32))
+        return fast_dist(pg_pos[0], pg_pos[1]) <= (self.base_radius + enemy_obj.radius)
 
     def get_current_damage(self):
         return self.base_damage * self.damage_multiplier
 
     def update_position(self, dt):
-        speed = 1
-        
         if self.is_knockbacked:
-            speed = 2
-            self.current_position = self.current_position + self.knockback_vector * dt * speed
-            return
-        # else
-        self.current_position = self.current_position + self.current_velocity * dt * speed
+            np.multiply(self.knockback_vector, dt * PLAYER_KNOCKBACK_SPEED, out=self.step_vec)
+        else:
+            np.multiply(self.current_velocity, dt, out=self.step_vec)
+        self.current_position += self.step_vec
 
     def update_current_weapon_direction(self, m_xpos, m_ypos):
-        viewport = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
-        # mpos_vector = map_pg_to_opengl_coordinates_2d(np.array([m_xpos, m_ypos]), viewport)
-        mpos_vector = np.array(ctypes_map_screen_to_opengl(np.array([m_xpos, m_ypos]), viewport))
+        mouse_pos = self.mouse_pos
+        mouse_pos[0] = m_xpos
+        mouse_pos[1] = m_ypos
+        # one point: in place ufuncs, the native kernel would build python objects for every pointer it gets,
+        # a flat (2,) vector keeps the ufuncs off numpy's broadcasting iterator (~1 KB allocated per call)
+        np.multiply(mouse_pos, SCREEN_TO_OPENGL_SCALE, out=mouse_pos)
+        mouse_pos += SCREEN_TO_OPENGL_OFFSET
+
+        direction = self.current_weapon_direction
+        np.subtract(mouse_pos, self.current_position, out=direction)
+        direction *= fast_inverse_root(float(np.dot(direction, direction)))
 
-        new_direction = mpos_vector - self.current_position
-        # self.current_weapon_direction = new_direction / linalg.norm(new_direction)
-        self.current_weapon_direction = new_direction * ctypes_fast_inverse_root(np.dot(new_direction, new_direction))
-
-    
     def update_velocity_vector(self, keys_pressed):
         # ignore key presses when knockbacked
         if self.is_knockbacked:
             return
-        keys_movement = (pygame.K_d, pygame.K_a, pygame.K_s, pygame.K_w)
-        vs = (np.array([1, 0]), np.array([-1, 0]), np.array([0, -1]), np.array([0, 1]))
-        keys_bitmask = tuple(map(lambda key: keys_pressed[key], keys_movement))
-        current_move_vectors = [vec if is_pressed else np.array([0, 0]) for is_pressed, vec in zip(keys_bitmask, vs)]
-        # print(current_move_vectors, keys_bitmask, keys_pressed)
-        new_velocity_vector = sum(current_move_vectors)
-        self.current_velocity = new_velocity_vector
-        # if linalg.norm(new_velocity_vector) < EPSILON:
-        #     return
-        
-        # self.current_velocity = self.current_velocity / linalg.norm(self.current_velocity)
-        self.current_velocity = self.current_velocity * \
-            ctypes_fast_inverse_root(np.dot(self.current_velocity, self.current_velocity))
+        keys_mask = self.keys_mask
+        for i, key in enumerate(MOVE_KEYS):
+            keys_mask[i] = keys_pressed[key]
+        velocity = self.current_velocity
+        np.dot(keys_mask, MOVE_DIRECTIONS, out=velocity)
+        # zero vector stays zero (fast_inverse_root(0) * 0)
+        velocity *= fast_inverse_root(float(np.dot(velocity, velocity)))
 
     def update_bullets_state(self, dt):
-        self.bullets_alive = list(filter(
-            lambda bullet: linalg.norm(self.current_position - bullet.gl_pos) < 1.5,
-            self.bullets_alive
-        ))
-        if len(self.bullets_alive) == 0:
-            return
-
-        for bullet in self.bullets_alive:
-            bullet.update(dt)
+        self.bullets.cull_out_of_range(self.current_position)
+        self.bullets.update(dt)
 
     def update_cooldowns(self, dt):
         self.cooldown_shoot -= dt
@@ -353,87 +813,268 @@ class Camera:
     used for moving all objects of the scene towards camera when rendering
     '''
     def __init__(self) -> None:
-        self.gl_pos = np.array([0, 0]).astype('float64')
-        self.current_velocity = np.array([0, 0])
+        self.gl_pos = np.zeros(2, dtype=np.float32)
+        self.current_velocity = np.zeros(2, dtype=np.float32)
+        self.step_vec = np.zeros(2, dtype=np.float32)  # scratch for velocity * dt
         self.speed = 0
-
-    def apply(self, object_gl_pos) -> np.array:
-        return object_gl_pos - self.gl_pos
+        self.zoom = 1.0
+        self.view = ViewTransform(OPENGL_TO_SCREEN_MATRIX)  # updated in place by view_transform
+        self.view_key = (0.0, 0.0, 1.0)  # camera position and zoom self.view was built for
+
+    def apply(self, object_gl_pos, out: np.array = None) -> np.array:
+        # whole (N, 2) batches at once, prefer view_transform().matrix for rendering
+        return np.subtract(object_gl_pos, self.gl_pos, out=out)
+
+    def view_matrix(self, gl_pos: np.array = None) -> np.array:
+        '''
+        world gl -> view gl: translate camera to origin, then zoom
+        '''
+        cam_x, cam_y = self.gl_pos if gl_pos is None else gl_pos
+        return np.array([
+            [self.zoom, 0.0, -self.zoom * cam_x],
+            [0.0, self.zoom, -self.zoom * cam_y],
+            [0.0, 0.0, 1.0]
+        ])
+
+    def view_transform(self, gl_pos: np.array = None) -> ViewTransform:
+        # viewport @ view: one matrix maps world straight to screen pixels
+        if gl_pos is not None:
+            return ViewTransform(OPENGL_TO_SCREEN_MATRIX @ self.view_matrix(gl_pos))
+        # own position: shared instance, rebuilt in place only when the camera moved or zoomed
+        cam_x, cam_y = self.gl_pos.tolist()
+        if (cam_x, cam_y, self.zoom) != self.view_key:
+            self.view_key = (cam_x, cam_y, self.zoom)
+            matrix = self.view.matrix
+            for axis, cam in ((0, cam_x), (1, cam_y)):
+                scale = float(OPENGL_TO_SCREEN_MATRIX[axis, axis])
+                matrix[axis, axis] = scale * self.zoom
+                matrix[axis, 2] = OPENGL_TO_SCREEN_MATRIX[axis, 2] - scale * self.zoom * cam
+            self.view.set_matrix(matrix)
+        return self.view
     
     def update_velocity_vector(self, player_gl_pos):
-        new_velocity_vector = player_gl_pos - self.gl_pos
-        # norm  = linalg.norm(new_velocity_vector)  # is it rly necessary to comput norm if i multiply it afterwards?
-        self.current_velocity = new_velocity_vector
+        # not normalized on purpose, camera is faster when player is further away
+        np.subtract(player_gl_pos, self.gl_pos, out=self.current_velocity)
 
     def update_position(self, dt: float):
-        self.gl_pos += self.current_velocity * dt
+        np.multiply(self.current_velocity, dt, out=self.step_vec)
+        self.gl_pos += self.step_vec
+
+
+def lerp(a: np.array, b: np.array, alpha: float, out: np.array) -> np.array:
+    # out = a + (b - a) * alpha, out can be b
+    np.subtract(b, a, out=out)
+    out *= alpha
+    out += a
+    return out
+
+
+def read_only(array: np.array) -> np.array:
+    view = array.view()
+    view.setflags(write=False)
+    return view
+
+
+NO_WALLS = np.zeros((0, 4), dtype=np.float32)
+
+
+class FrameState:
+    '''
+    read-only snapshot of what the renderer needs, arrays are views of scene storage (nothing is deep-copied)
+    valid until the next simulation step
+    '''
+    __slots__ = (
+        'player_gl_pos', 'player_radius',
+        'bullets_gl_pos', 'bullets_pg_radius',
+        'enemies_gl_pos', 'enemies_radius',
+        'camera_gl_pos', 'camera_view', 'walls_gl'
+    )
+
+    def __init__(self, player_gl_pos, player_radius, bullets_gl_pos, bullets_pg_radius,
+                 enemies_gl_pos, enemies_radius, camera_gl_pos, camera_view=SCREEN_VIEW, walls_gl=NO_WALLS) -> None:
+        self.player_gl_pos = player_gl_pos  # (1, 2)
+        self.player_radius = player_radius
+        self.bullets_gl_pos = bullets_gl_pos
+        self.bullets_pg_radius = bullets_pg_radius
+        self.enemies_gl_pos = enemies_gl_pos
+        self.enemies_radius = enemies_radius
+        self.camera_gl_pos = camera_gl_pos
+        self.camera_view = camera_view  # ViewTransform, world -> screen with camera applied
+        self.walls_gl = walls_gl  # (M, 4) wall boxes around the visible rectangle
+
+
+SIMULATION_PHASES = ('player', 'spawn', 'collisions', 'remove_dead', 'enemies', 'shoot')
+PHASE_PLAYER, PHASE_SPAWN, PHASE_COLLISIONS, PHASE_REMOVE_DEAD, PHASE_ENEMIES, PHASE_SHOOT = range(len(SIMULATION_PHASES))
+
+
+def lap(phase_ns: np.array, phase_index: int, t_start: int) -> int:
+    t_end = time.perf_counter_ns()
+    phase_ns[phase_index] += t_end - t_start
+    return t_end
+
+
+def new_seed() -> int:
+    return int(np.random.SeedSequence().generate_state(1, np.uint64)[0])
 
 
 class Scene():
 
-    def __init__(self) -> None:
+    def __init__(self, seed: int = None) -> None:
+        # every random decision of the scene goes through self.rng, same seed + same inputs => same game
+        self.seed = seed if seed is not None else new_seed()
+        self.rng = np.random.default_rng(self.seed)
         self.player = Player()
-        self.enemies_alive: list[Enemy] = []
+        self.enemies = EnemyStore()
         self.items = None
-        self.max_enemies = 5
+        self.max_enemies = 5  # population cap, spawner.curve can ask for less
+        self.score = 0  # enemies killed
+        self.spawner = SpawnScheduler()
         self.camera = Camera()
+        self.enemy_grid = HashGrid()  # collision broad phase, rebuilt every step
+        # alive bullets are gathered here for the renderer (bullet pool has holes)
+        self.render_bullets_gl_pos = np.zeros((self.player.bullets.capacity, 2), dtype=np.float32)
+        self.render_bullets_pg_radius = np.zeros(self.player.bullets.capacity, dtype=np.float32)
+        self.render_enemies_gl_pos = ScratchBuffer()
+        self.render_player_gl_pos = np.zeros((1, 2), dtype=np.float32)
+        self.player_radius = np.zeros(1, dtype=np.float32)  # player as one circle for world.resolve_circles
+        self.world = None  # static walls, see load_world
         
-    def add_random_enemy(self):
-        player_gl_pos = self.player.current_position
-        enemy_gl_pos = (np.random.random(size=2) - 0.5) * 2 + EPSILON
-        enemy_direction = enemy_gl_pos - player_gl_pos
-        # enemy_direction /= linalg.norm(enemy_gl_pos)
-        enemy_direction *= ctypes_fast_inverse_root(np.dot(enemy_direction, enemy_direction))
-        enemy_new_gl_pos = player_gl_pos + ENEMY_ON_SPAWN_MIN_DIST * enemy_direction
-        new_enemy = Enemy(enemy_new_gl_pos)
-        self.enemies_alive.append(new_enemy)
-
-    def add_enemies(self):
-        while len(self.enemies_alive) < self.max_enemies:
-            self.add_random_enemy()
+    def load_world(self, path: str) -> 'World':
+        from world import World  # world.py imports scene constants
+        self.world = World(path)
+        self.world.stream((self.player.current_position, self.camera.gl_pos))
+        return self.world
+
+    def store_previous_state(self) -> None:
+        # call before every simulation step, frame_state interpolates between previous and current
+        np.copyto(self.player.previous_position, self.player.current_position)
+        n = self.enemies.count
+        np.copyto(self.enemies.prev_gl_pos[:n], self.enemies.gl_pos[:n])
+        np.copyto(self.player.bullets.prev_gl_pos, self.player.bullets.gl_pos)
+
+    def step(self, dt: float, m_xpos: int, m_ypos: int, is_shooting: bool, phase_ns: np.array = None) -> int:
+        '''
+        one simulation step (phases in SIMULATION_PHASES order), returns number of enemies killed
+        phase_ns: optional int64 array, elapsed ns of every phase is added to it
+        '''
+        if phase_ns is not None: t = time.perf_counter_ns()
+
+        self.player.update_state(dt, m_xpos, m_ypos)
+        if self.world is not None:
+            self.world.stream((self.player.current_position, self.camera.gl_pos))
+            self.player_radius[0] = self.player.base_radius
+            self.world.resolve_circles(self.player.current_position[None, :], self.player_radius)
+        if phase_ns is not None: t = lap(phase_ns, PHASE_PLAYER, t)
+
+        self.add_enemies(dt)
+        if phase_ns is not None: t = lap(phase_ns, PHASE_SPAWN, t)
+
+        self.process_collisions()
+        if phase_ns is not None: t = lap(phase_ns, PHASE_COLLISIONS, t)
+
+        enemies_dead = self.remove_dead_enemies()
+        self.score += enemies_dead
+        if phase_ns is not None: t = lap(phase_ns, PHASE_REMOVE_DEAD, t)
+
+        self.update_enemies(dt, self.player.current_position)
+        if self.world is not None:
+            n = self.enemies.count
+            self.world.resolve_circles(self.enemies.gl_pos[:n], self.enemies.radius[:n])
+        if phase_ns is not None: t = lap(phase_ns, PHASE_ENEMIES, t)
+
+        # camera
+        # self.camera.update_velocity_vector(self.player.current_position)
+        # self.camera.update_position(dt)
+
+        if is_shooting:
+            self.player.shoot()
+        if phase_ns is not None: t = lap(phase_ns, PHASE_SHOOT, t)
+        return enemies_dead
+
+    def frame_state(self, alpha: float = 1.0) -> FrameState:
+        '''
+        alpha: interpolation factor between previous (0) and current (1) simulation step
+        '''
+        k = self.player.bullets.gather_alive(alpha, self.render_bullets_gl_pos, self.render_bullets_pg_radius)
+
+        lerp(self.player.previous_position, self.player.current_position, alpha, out=self.render_player_gl_pos[0])
+
+        n = self.enemies.count
+        enemies_gl_pos = lerp(
+            self.enemies.prev_gl_pos[:n], self.enemies.gl_pos[:n], alpha, out=self.render_enemies_gl_pos.get(n)
+        )
+        camera_view = self.camera.view_transform()
+        walls_gl = NO_WALLS if self.world is None else self.world.boxes_in(camera_view.gl_min, camera_view.gl_max, keep=True)
+        return FrameState(
+            read_only(self.render_player_gl_pos), self.player.base_radius,
+            read_only(self.render_bullets_gl_pos[:k]), read_only(self.render_bullets_pg_radius[:k]),
+            read_only(enemies_gl_pos), read_only(self.enemies.radius[:n]),
+            read_only(self.camera.gl_pos), camera_view, read_only(walls_gl)
+        )
+
+    @property
+    def enemies_alive(self) -> List[Enemy]:
+        # views over enemy store, prefer working with self.enemies columns directly
+        return [Enemy(self.enemies, i) for i in range(self.enemies.count)]
+
+    def add_enemies(self, dt: float = 0.0) -> int:
+        # whole batch per step (within spawner.budget), see spawning.py
+        return self.spawner.update(dt, self)
     
     def remove_dead_enemies(self) -> int:
-        # keep enemies that are alive
-        enemies_alive_length = self.enemies_alive.__len__()  # before enemies removal
-        self.enemies_alive = list(filter(lambda ememy: ememy.hitpoints > 0, self.enemies_alive))
-        return enemies_alive_length - self.enemies_alive.__len__()  # cound enemies dead
+        # returns number of enemies dead
+        return self.enemies.remove_dead()
 
     def update_enemies(self, dt: float, player_gl_pos: np.array):
-        # parallelizable
-        for enemy in self.enemies_alive:
-            enemy.update_state(dt, player_gl_pos)
+        self.enemies.update(dt, player_gl_pos)
         
     def process_collisions(self):
-        # player with enemies
-        for enemy in self.enemies_alive:
-            if self.player.check_enemy_collision(enemy):
-                
-                if not self.player.is_invincible:
-                    self.player.hitpoints -= enemy.get_damage()
-
-                # process event "player got hit from enemy" collision here
-                self.player.is_invincible = True
-                self.player.invincibility_time_left = 0.5
-
-                self.player.is_knockbacked = True
-                self.player.knockback_time_left = 0.2
-                knockback_vec = self.player.current_position - enemy.gl_pos
-                self.player.knockback_vector = knockback_vec * ctypes_fast_inverse_root(np.dot(knockback_vec, knockback_vec))
-
-        # bullets with enemies (for each bullet for each enemy)
-        for i, bullet in enumerate(self.player.bullets_alive.copy()):
-            # for each bullet sort enemies by dist
-            fast_dist_to_current_bullet_func = functools.partial(fast_dist, bullet.gl_pos)
-            bullet_enemy_dist_array = np.array(list(map(
-                lambda enemy: fast_dist_to_current_bullet_func(enemy.gl_pos), self.enemies_alive
-            )))
-            nearest_enemy_index = bullet_enemy_dist_array.argmin()
-            bullet_hit_enemy = bullet.check_collision(self.enemies_alive[nearest_enemy_index])
-            if bullet_hit_enemy:
-                self.player.bullets_hit += 1
-                # process event "bullet hit enemy"
-                self.enemies_alive[nearest_enemy_index].hitpoints -= self.player.get_current_damage()
-                # print(bullet_hit_enemy, bullet_enemy_dist_array[nearest_enemy_index], sep=', ')
-                self.player.bullets_alive.pop(i)
-                break
+        enemies = self.enemies
+        player = self.player
+        bullets = player.bullets
+        if self.world is not None and len(bullets) > 0:
+            # walls stop bullets, also between waves when there is no enemy to hit
+            bullet_slots = bullets.alive_slots()
+            blocked = self.world.hit_circles(bullets.gl_pos[bullet_slots], bullets.pg_radius[bullet_slots])
+            if blocked.any():
+                bullets.kill_slots(bullet_slots[blocked])
+        n = enemies.count
+        if n == 0:
+            return
+
+        # radii are in pg coordinates, so distances are measured in pixels (gl delta * GL_TO_PIXELS),
+        # grid cells are sized in gl units so that they cover max reach along the shorter pixel axis
+        max_reach = column_max(enemies.radius, n) + max(player.base_radius, column_max(bullets.pg_radius, bullets.capacity))
+        grid = self.enemy_grid
+        grid.build(enemies.gl_pos, n, max_reach / GL_TO_PIXELS_MIN)
 
+        # player with enemies
+        if not player.is_invincible:
+            nearest_enemy_index = nearest_overlap(
+                player.current_position, float(player.base_radius), enemies.gl_pos, enemies.radius, GL_TO_PIXELS,
+                grid.cell_size, grid.table_mask, grid.cell_start, grid.cell_items
+            )
+            if nearest_enemy_index >= 0:
+                # process event "player got hit from enemy" collision here (nearest enemy hits)
+                player.hitpoints -= float(enemies.damage[nearest_enemy_index])
+
+                player.is_invincible = True
+                player.invincibility_time_left = PLAYER_INVINCIBILITY_TIME
+
+                player.is_knockbacked = True
+                player.knockback_time_left = PLAYER_KNOCKBACK_TIME
+                knockback_vec = player.knockback_vector
+                np.subtract(player.current_position, enemies.gl_pos[nearest_enemy_index], out=knockback_vec)
+                knockback_vec *= fast_inverse_root(float(np.dot(knockback_vec, knockback_vec)))
+
+        if len(bullets) == 0:
+            return
+        # bullets with enemies, every bullet hits nearest overlapping enemy (event "bullet hit enemy"),
+        # damage and freeing of hit bullet slots happen inside the kernel
+        hits = collide_bullets(
+            bullets.gl_pos, bullets.pg_radius, bullets.alive, bullets.free_slots, bullets.free_count,
+            enemies.gl_pos, enemies.radius, enemies.hitpoints, float(player.get_current_damage()), GL_TO_PIXELS,
+            grid.cell_size, grid.table_mask, grid.cell_start, grid.cell_items
+        )
+        bullets.free_count += hits
+        player.bullets_hit += hits
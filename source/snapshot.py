@@ -0,0 +1,257 @@
+'''
+binary Scene snapshots for save / load, pause, quick retry and forking scenes (balancing runs)
+
+a snapshot is one flat byte buffer, every piece of state is a numpy view at a fixed offset into it,
+so capture and restore are a few dozen memcpy's instead of a deepcopy / pickle walk over the object graph,
+and a saved file is memory mapped and restored without parsing
+
+file layout (little endian, every section starts at a multiple of SECTION_ALIGN):
+    header: magic b'HDSN', version u16, reserved u16, bullet capacity u32, enemy count u32
+    state: one STATE_DTYPE record (scene, rng, spawner, camera and player scalars and vectors)
+    bullet columns: BULLET_COLUMNS, bullet capacity rows each
+    enemy columns: ENEMY_COLUMNS, enemy count rows each
+
+not stored: static world (restore keeps Scene.world), spawner curve (configuration, not state)
+and render scratch buffers
+'''
+import struct
+import numpy as np
+
+from typing import Dict, Tuple
+from scene import Scene
+
+SNAPSHOT_MAGIC = b'HDSN'
+SNAPSHOT_VERSION = 2
+HEADER_FORMAT = '<4sHHII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+SECTION_ALIGN = 8
+UINT64_MASK = (1 << 64) - 1
+
+# (owner, attribute, dtype, shape), owner is resolved by scene_owners
+# vectors are copied into the existing arrays on restore (other code holds views of them)
+STATE_FIELDS = (
+    ('scene', 'seed', '<u8', ()),
+    ('scene', 'max_enemies', '<i8', ()),
+    ('scene', 'score', '<i8', ()),
+    ('spawner', 'elapsed', '<f8', ()),
+    ('spawner', 'spawned', '<i8', ()),
+    ('camera', 'gl_pos', '<f4', (2,)),
+    ('camera', 'current_velocity', '<f4', (2,)),
+    ('camera', 'speed', '<f8', ()),
+    ('camera', 'zoom', '<f8', ()),
+    ('player', 'current_position', '<f4', (2,)),
+    ('player', 'previous_position', '<f4', (2,)),
+    ('player', 'current_weapon_direction', '<f4', (2,)),
+    ('player', 'current_velocity', '<f4', (2,)),
+    ('player', 'current_dv', '<f4', (2,)),
+    ('player', 'keys_mask', '<f4', (4,)),
+    ('player', 'knockback_vector', '<f4', (2,)),
+    ('player', 'hitpoints', '<f8', ()),
+    ('player', 'base_damage', '<i8', ()),
+    ('player', 'base_armor', '<f8', ()),
+    ('player', 'base_dash_frequency', '<f8', ()),
+    ('player', 'base_radius', '<i8', ()),
+    ('player', 'damage_multiplier', '<f8', ()),
+    ('player', 'base_shoot_frequency', '<f8', ()),
+    ('player', 'base_bullet_radius', '<i8', ()),
+    ('player', 'base_bullet_speed', '<i8', ()),
+    ('player', 'cooldown_shoot', '<f8', ()),
+    ('player', 'cooldown_dash', '<f8', ()),
+    ('player', 'invincibility_time_left', '<f8', ()),
+    ('player', 'is_invincible', '?', ()),
+    ('player', 'knockback_time_left', '<f8', ()),
+    ('player', 'is_knockbacked', '?', ()),
+    ('player', 'bullets_shot', '<i8', ()),
+    ('player', 'bullets_hit', '<i8', ()),
+    ('bullets', 'free_count', '<i8', ()),
+)
+# PCG64 state of Scene.rng, 128 bit integers are split into (low, high) u64 words
+RNG_FIELDS = (
+    ('rng_state', '<u8', (2,)),
+    ('rng_inc', '<u8', (2,)),
+    ('rng_has_uint32', '<u4', ()),
+    ('rng_uinteger', '<u4', ()),
+)
+STATE_DTYPE = np.dtype(
+    [(f'{owner}.{name}', dtype, shape) for owner, name, dtype, shape in STATE_FIELDS] + list(RNG_FIELDS)
+)
+
+BULLET_COLUMNS = (
+    ('gl_pos', '<f4', (2,)),
+    ('prev_gl_pos', '<f4', (2,)),
+    ('dir_vec', '<f4', (2,)),
+    ('speed', '<f4', ()),
+    ('pg_radius', '<f4', ()),
+    ('alive', '?', ()),
+    ('free_slots', '<i4', ()),
+)
+ENEMY_COLUMNS = (
+    ('gl_pos', '<f4', (2,)),
+    ('prev_gl_pos', '<f4', (2,)),
+    ('velocity', '<f4', (2,)),
+    ('hitpoints', '<f4', ()),
+    ('speed', '<f4', ()),
+    ('damage', '<f4', ()),
+    ('radius', '<f4', ()),
+)
+
+
+def align(offset: int) -> int:
+    return -(-offset // SECTION_ALIGN) * SECTION_ALIGN
+
+
+def snapshot_layout(bullet_capacity: int, enemy_count: int) -> Tuple[Dict[str, tuple], int]:
+    '''
+    section name -> (offset, dtype, shape), and total size in bytes
+    '''
+    sections = {}
+    offset = align(HEADER_SIZE)
+    sections['state'] = (offset, STATE_DTYPE, (1,))
+    offset = align(offset + STATE_DTYPE.itemsize)
+    for owner, columns, rows in (('bullets', BULLET_COLUMNS, bullet_capacity), ('enemies', ENEMY_COLUMNS, enemy_count)):
+        for name, dtype, shape in columns:
+            dtype = np.dtype(dtype)
+            sections[f'{owner}.{name}'] = (offset, dtype, (rows,) + shape)
+            offset = align(offset + dtype.itemsize * rows * int(np.prod(shape, dtype=np.int64)))
+    return sections, offset
+
+
+def scene_owners(scene: Scene) -> dict:
+    return {
+        'scene': scene,
+        'spawner': scene.spawner,
+        'camera': scene.camera,
+        'player': scene.player,
+        'bullets': scene.player.bullets,
+        'enemies': scene.enemies,
+    }
+
+
+class SceneSnapshot:
+    '''
+    buffer: uint8 array (owned bytes or read-only memmap of a snapshot file), may be longer than the snapshot
+    capture reuses the buffer while the snapshot fits, repeated quick saves do not allocate
+    '''
+    def __init__(self, buffer: np.array = None) -> None:
+        self.buffer = np.zeros(0, dtype=np.uint8) if buffer is None else buffer
+        self.bullet_capacity = 0
+        self.enemy_count = 0
+        self.nbytes = 0
+        self.views = {}
+        if buffer is not None:
+            self.parse_header()
+
+    def parse_header(self) -> None:
+        if len(self.buffer) < HEADER_SIZE:
+            raise ValueError('not a scene snapshot (too short)')
+        magic, version, _, bullet_capacity, enemy_count = struct.unpack(
+            HEADER_FORMAT, self.buffer[:HEADER_SIZE].tobytes()
+        )
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError('not a scene snapshot')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}')
+        sections, nbytes = snapshot_layout(bullet_capacity, enemy_count)
+        if len(self.buffer) < nbytes:
+            raise ValueError(f'truncated scene snapshot ({len(self.buffer)} of {nbytes} bytes)')
+        self.bind(sections, bullet_capacity, enemy_count, nbytes)
+
+    def bind(self, sections: dict, bullet_capacity: int, enemy_count: int, nbytes: int) -> None:
+        self.bullet_capacity = bullet_capacity
+        self.enemy_count = enemy_count
+        self.nbytes = nbytes
+        self.views = {
+            name: self.buffer[offset:offset + dtype.itemsize * int(np.prod(shape))].view(dtype).reshape(shape)
+            for name, (offset, dtype, shape) in sections.items()
+        }
+
+    def capture(self, scene: Scene) -> 'SceneSnapshot':
+        bullets = scene.player.bullets
+        enemy_count = scene.enemies.count
+        changed = bullets.capacity != self.bullet_capacity or enemy_count != self.enemy_count
+        if changed or not self.buffer.flags.writeable:
+            sections, nbytes = snapshot_layout(bullets.capacity, enemy_count)
+            if nbytes > len(self.buffer) or not self.buffer.flags.writeable:
+                # headroom for a growing enemy population, captures during play stay in place
+                self.buffer = np.zeros(max(nbytes, 2 * len(self.buffer)), dtype=np.uint8)
+            self.buffer[:HEADER_SIZE] = np.frombuffer(struct.pack(
+                HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, bullets.capacity, enemy_count
+            ), dtype=np.uint8)
+            self.bind(sections, bullets.capacity, enemy_count, nbytes)
+
+        owners = scene_owners(scene)
+        state = self.views['state']
+        for owner, name, _, _ in STATE_FIELDS:
+            state[f'{owner}.{name}'][0] = getattr(owners[owner], name)
+        rng_state = scene.rng.bit_generator.state
+        if rng_state['bit_generator'] != 'PCG64':
+            raise ValueError(f"scene rng {rng_state['bit_generator']} is not supported, expected PCG64")
+        state['rng_state'][0] = (rng_state['state']['state'] & UINT64_MASK, rng_state['state']['state'] >> 64)
+        state['rng_inc'][0] = (rng_state['state']['inc'] & UINT64_MASK, rng_state['state']['inc'] >> 64)
+        state['rng_has_uint32'][0] = rng_state['has_uint32']
+        state['rng_uinteger'][0] = rng_state['uinteger']
+
+        for owner, columns, rows in (('bullets', BULLET_COLUMNS, bullets.capacity), ('enemies', ENEMY_COLUMNS, enemy_count)):
+            for name, _, _ in columns:
+                np.copyto(self.views[f'{owner}.{name}'], getattr(owners[owner], name)[:rows])
+        return self
+
+    def restore(self, scene: Scene) -> None:
+        '''
+        overwrites scene state in place, the scene keeps its world, spawner curve and buffers
+        '''
+        bullets = scene.player.bullets
+        if bullets.capacity != self.bullet_capacity:
+            raise ValueError(f'snapshot has {self.bullet_capacity} bullet slots, scene has {bullets.capacity}')
+        owners = scene_owners(scene)
+        state = self.views['state']
+        for owner, name, _, shape in STATE_FIELDS:
+            value = state[f'{owner}.{name}'][0]
+            if shape:
+                np.copyto(getattr(owners[owner], name), value)
+            else:
+                setattr(owners[owner], name, value.item())
+
+        scene.rng.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {
+                'state': int(state['rng_state'][0, 0]) | (int(state['rng_state'][0, 1]) << 64),
+                'inc': int(state['rng_inc'][0, 0]) | (int(state['rng_inc'][0, 1]) << 64),
+            },
+            'has_uint32': int(state['rng_has_uint32'][0]),
+            'uinteger': int(state['rng_uinteger'][0]),
+        }
+
+        enemies = scene.enemies
+        enemies.reserve(self.enemy_count)
+        for owner, columns, rows in (('bullets', BULLET_COLUMNS, bullets.capacity), ('enemies', ENEMY_COLUMNS, self.enemy_count)):
+            for name, _, _ in columns:
+                np.copyto(getattr(owners[owner], name)[:rows], self.views[f'{owner}.{name}'])
+        enemies.count = self.enemy_count
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as snapshot_file:
+            snapshot_file.write(self.buffer[:self.nbytes].data)
+
+
+def snapshot_scene(scene: Scene) -> SceneSnapshot:
+    return SceneSnapshot().capture(scene)
+
+
+def load_snapshot(path: str) -> SceneSnapshot:
+    '''
+    memory mapped, read-only: pages are read while restoring
+    '''
+    return SceneSnapshot(np.memmap(path, dtype=np.uint8, mode='r'))
+
+
+def fork_scene(scene: Scene) -> Scene:
+    '''
+    independent copy of scene for what-if / balancing runs, the static world is shared
+    '''
+    forked = Scene(scene.seed)
+    forked.spawner.curve = scene.spawner.curve
+    forked.spawner.budget = scene.spawner.budget
+    forked.world = scene.world
+    snapshot_scene(scene).restore(forked)
+    return forked
@@ -0,0 +1,120 @@
+'''
+enemy spawning: wave curves say how many enemies should be alive at a given time,
+SpawnScheduler tops enemy storage up to that number in vectorized batches limited by a per-step budget
+'''
+import numpy as np
+
+from typing import Sequence
+from config import ENEMY_ON_SPAWN_MIN_DIST
+
+SPAWN_RING_WIDTH = 0.25  # gl units, enemies appear between ENEMY_ON_SPAWN_MIN_DIST and + width from player
+SPAWN_BUDGET_PER_STEP = 128  # large waves are spread over several steps instead of one long frame
+# repeating waves of the game (main.py --waves): population, seconds
+WAVE_BASE_POPULATION = 5
+WAVE_PEAK_POPULATION = 40
+WAVE_RISE_TIME = 10.0
+WAVE_HOLD_TIME = 5.0
+WAVE_REST_TIME = 10.0
+
+
+class WaveCurve:
+    '''
+    target enemy population over time, piecewise linear through (time, population) keyframes
+    period: if set, curve repeats every period seconds (endless waves)
+    '''
+    def __init__(self, times: Sequence[float], populations: Sequence[float], period: float = None) -> None:
+        self.times = np.asarray(times, dtype=np.float64)
+        self.populations = np.asarray(populations, dtype=np.float64)
+        if len(self.times) == 0 or len(self.times) != len(self.populations):
+            raise ValueError('wave curve needs matching, non-empty times and populations')
+        self.period = period
+
+    def __call__(self, t: float) -> int:
+        if self.period is not None:
+            t = t % self.period
+        return int(np.interp(t, self.times, self.populations))
+
+    @classmethod
+    def constant(cls, population: int) -> 'WaveCurve':
+        return cls((0.0,), (population,))
+
+    @classmethod
+    def ramp(cls, start: int, end: int, duration: float) -> 'WaveCurve':
+        return cls((0.0, duration), (start, end))
+
+    @classmethod
+    def waves(cls, base: int, peak: int, rise: float, hold: float, rest: float) -> 'WaveCurve':
+        '''
+        repeating wave: population rises from base to peak, holds, then drops back and rests
+        '''
+        times = (0.0, rise, rise + hold, rise + hold + 0.01, rise + hold + rest)
+        return cls(times, (base, peak, peak, base, base), period=times[-1])
+
+    @classmethod
+    def game_waves(cls) -> 'WaveCurve':
+        return cls.waves(WAVE_BASE_POPULATION, WAVE_PEAK_POPULATION, WAVE_RISE_TIME, WAVE_HOLD_TIME, WAVE_REST_TIME)
+
+
+class SpawnScheduler:
+    '''
+    curve: WaveCurve, None keeps population at Scene.max_enemies (the old behaviour)
+    population is always capped by Scene.max_enemies
+    '''
+    def __init__(self, curve: WaveCurve = None, budget: int = SPAWN_BUDGET_PER_STEP,
+                 spawn_distance: float = ENEMY_ON_SPAWN_MIN_DIST, ring_width: float = SPAWN_RING_WIDTH) -> None:
+        self.curve = curve
+        self.budget = budget
+        self.spawn_distance = spawn_distance
+        self.ring_width = ring_width
+        self.elapsed = 0.0
+        self.spawned = 0
+        # spawn_positions scratch, budget rows (grown if budget is raised later)
+        self.angle_distance = np.zeros((0, 2), dtype=np.float64)
+        self.ring_scratch = np.zeros((0, 2), dtype=np.float64)  # angle, distance
+        self.spawn_gl_pos = np.zeros((0, 2), dtype=np.float32)
+
+    def target(self, max_enemies: int) -> int:
+        if self.curve is None:
+            return max_enemies
+        return min(self.curve(self.elapsed), max_enemies)
+
+    def spawn_positions(self, rng: np.random.Generator, center_gl_pos: np.array, n: int) -> np.array:
+        '''
+        (n, 2) float32 positions on the spawn ring around center, one draw for the whole batch
+        written to a scratch buffer that is reused by the next call
+        '''
+        if n > len(self.spawn_gl_pos):
+            rows = max(n, self.budget)
+            self.angle_distance = np.zeros((rows, 2), dtype=np.float64)
+            self.ring_scratch = np.zeros((rows, 2), dtype=np.float64)
+            self.spawn_gl_pos = np.zeros((rows, 2), dtype=np.float32)
+        angle_distance = self.angle_distance[:n]
+        rng.random(out=angle_distance)
+        angle = np.multiply(angle_distance[:, 0], 2 * np.pi, out=self.ring_scratch[:n, 0])
+        distance = np.multiply(angle_distance[:, 1], self.ring_width, out=self.ring_scratch[:n, 1])
+        distance += self.spawn_distance
+        # angle column is free once its cos / sin are written out, offsets are summed in float64 and cast
+        # to float32 by copyto: a float64 + float32 -> float32 ufunc would set up a buffered iterator (~1.4 KB)
+        gl_pos = self.spawn_gl_pos[:n]
+        offset = angle_distance[:, 0]
+        np.cos(angle, out=offset)
+        offset *= distance
+        offset += float(center_gl_pos[0])
+        np.copyto(gl_pos[:, 0], offset)
+        np.sin(angle, out=offset)
+        offset *= distance
+        offset += float(center_gl_pos[1])
+        np.copyto(gl_pos[:, 1], offset)
+        return gl_pos
+
+    def update(self, dt: float, scene) -> int:
+        '''
+        spawns up to budget enemies towards the current target, returns number spawned
+        '''
+        self.elapsed += dt
+        n = min(self.target(scene.max_enemies) - len(scene.enemies), self.budget)
+        if n <= 0:
+            return 0
+        scene.enemies.add_batch(self.spawn_positions(scene.rng, scene.player.current_position, n))
+        self.spawned += n
+        return n
@@ -0,0 +1,51 @@
+import pygame
+import itertools
+import numpy as np
+
+
+class SpriteBatch:
+    '''
+    every circle (radius, colour) is rasterized once into a cached surface,
+    entities are queued with add_sprites and drawn with a single Surface.blits call in flush
+    '''
+    def __init__(self) -> None:
+        self.circle_sprites = {}
+        self.blit_sequence = []  # reused every frame
+
+    def __len__(self) -> int:
+        return len(self.blit_sequence)
+
+    def get_circle_sprite(self, radius: int, color) -> pygame.Surface:
+        key = (radius, color)
+        sprite = self.circle_sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            if pygame.display.get_surface() is not None:
+                sprite = sprite.convert_alpha()
+            self.circle_sprites[key] = sprite
+        return sprite
+
+    def add_sprites(self, corners: np.array, int_radius: np.array, color) -> None:
+        '''
+        corners: (N, 2) sprite top-left corners in screen space, int_radius: (N,) int32 radii
+        (ViewTransform.project_circles output), no numpy temporaries: blits only needs the corner lists
+        '''
+        if len(corners) == 0:
+            return
+        radius = int(int_radius[0])
+        if int_radius.min() == radius and int_radius.max() == radius:
+            self.blit_sequence.extend(zip(itertools.repeat(self.get_circle_sprite(radius, color)), corners.tolist()))
+            return
+        sprites = [self.get_circle_sprite(r, color) for r in int_radius.tolist()]
+        self.blit_sequence.extend(zip(sprites, corners.tolist()))
+
+    def flush(self, screen_ptr: pygame.Surface, dirty_rects: list = None) -> None:
+        '''
+        dirty_rects: if given, rects of all drawn sprites are appended to it
+        '''
+        if len(self.blit_sequence) > 0:
+            drawn_rects = screen_ptr.blits(self.blit_sequence, doreturn=dirty_rects is not None)
+            if dirty_rects is not None:
+                dirty_rects.extend(drawn_rects)
+        self.blit_sequence.clear()
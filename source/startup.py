@@ -0,0 +1,36 @@
+'''
+startup time bookkeeping (module imports, asset loading, kernel compilation)
+'''
+import json
+import time
+
+from contextlib import contextmanager
+from typing import Dict
+
+process_started = time.perf_counter()
+timings: Dict[str, float] = {}  # label -> seconds
+
+
+def record(label: str, seconds: float) -> None:
+    timings[label] = timings.get(label, 0.0) + seconds
+
+
+@contextmanager
+def timed(label: str):
+    t_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(label, time.perf_counter() - t_start)
+
+
+def report() -> str:
+    lines = [f'startup: {(time.perf_counter() - process_started) * 1000:.1f} ms since start']
+    for label, seconds in timings.items():
+        lines.append(f'  {label}: {seconds * 1000:.1f} ms')
+    return '\n'.join(lines)
+
+
+def save_report(path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump({label: seconds * 1000 for label, seconds in timings.items()}, f, indent=2)
@@ -0,0 +1,114 @@
+'''
+enemy steering: seek player + separation + cohesion (boids)
+
+neighbours come from collision.HashGrid (hashed uniform grid built in one counting sort pass),
+the per-enemy steering loop runs in parallel with prange and releases the gil
+'''
+import numpy as np
+
+from kernels import kernel, prange
+from collision import HashGrid, HASH_PRIME_X, HASH_PRIME_Y
+
+NEIGHBOUR_RADIUS = 0.12  # gl units, cohesion range and grid cell size
+SEPARATION_RADIUS = 0.05  # gl units, enemies closer than this push each other away
+SEEK_WEIGHT = 1.0
+SEPARATION_WEIGHT = 0.04
+COHESION_WEIGHT = 0.3
+STEERING_EPSILON = 1e-6
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32), 2,
+    np.zeros(2, dtype=np.float32), 0.01, NEIGHBOUR_RADIUS, 3,
+    np.zeros(5, dtype=np.int64), np.zeros(2, dtype=np.int64), np.zeros((2, 2), dtype=np.float32)
+), parallel=True, nogil=True)
+def steer_enemies(gl_pos, velocity, speed, n, player_gl_pos, dt, cell_size, table_mask, cell_start, cell_items, new_gl_pos):
+    '''
+    writes unit velocities and integrated positions to new_gl_pos (gl_pos is only read, so rows are independent),
+    then copies new_gl_pos over gl_pos
+    '''
+    neighbour_radius_sq = cell_size * cell_size
+    separation_radius_sq = SEPARATION_RADIUS * SEPARATION_RADIUS
+    for i in prange(n):
+        px = gl_pos[i, 0]
+        py = gl_pos[i, 1]
+        # seek
+        seek_x = player_gl_pos[0] - px
+        seek_y = player_gl_pos[1] - py
+        seek_len = np.sqrt(seek_x * seek_x + seek_y * seek_y) + STEERING_EPSILON
+        steer_x = SEEK_WEIGHT * seek_x / seek_len
+        steer_y = SEEK_WEIGHT * seek_y / seek_len
+
+        separation_x = 0.0
+        separation_y = 0.0
+        center_x = 0.0
+        center_y = 0.0
+        neighbours = 0
+        cx = np.int64(np.floor(px / cell_size))
+        cy = np.int64(np.floor(py / cell_size))
+        for dx in range(-1, 2):
+            for dy in range(-1, 2):
+                bucket = (((cx + dx) * HASH_PRIME_X) ^ ((cy + dy) * HASH_PRIME_Y)) & table_mask
+                for k in range(cell_start[bucket], cell_start[bucket + 1]):
+                    j = cell_items[k]
+                    if j == i:
+                        continue
+                    # hash collisions bring far items too, distance check filters them
+                    delta_x = px - gl_pos[j, 0]
+                    delta_y = py - gl_pos[j, 1]
+                    dist_sq = delta_x * delta_x + delta_y * delta_y
+                    if dist_sq > neighbour_radius_sq:
+                        continue
+                    center_x += gl_pos[j, 0]
+                    center_y += gl_pos[j, 1]
+                    neighbours += 1
+                    if dist_sq < separation_radius_sq:
+                        # push away, stronger when closer
+                        inv = 1.0 / (dist_sq + STEERING_EPSILON)
+                        separation_x += delta_x * inv
+                        separation_y += delta_y * inv
+
+        if neighbours > 0:
+            cohesion_x = center_x / neighbours - px
+            cohesion_y = center_y / neighbours - py
+            cohesion_len = np.sqrt(cohesion_x * cohesion_x + cohesion_y * cohesion_y) + STEERING_EPSILON
+            steer_x += SEPARATION_WEIGHT * separation_x + COHESION_WEIGHT * cohesion_x / cohesion_len
+            steer_y += SEPARATION_WEIGHT * separation_y + COHESION_WEIGHT * cohesion_y / cohesion_len
+
+        steer_len = np.sqrt(steer_x * steer_x + steer_y * steer_y)
+        if steer_len > STEERING_EPSILON:
+            steer_x /= steer_len
+            steer_y /= steer_len
+        velocity[i, 0] = steer_x
+        velocity[i, 1] = steer_y
+        new_gl_pos[i, 0] = px + steer_x * speed[i] * dt
+        new_gl_pos[i, 1] = py + steer_y * speed[i] * dt
+    for i in range(n):
+        gl_pos[i, 0] = new_gl_pos[i, 0]
+        gl_pos[i, 1] = new_gl_pos[i, 1]
+
+
+class SteeringGrid:
+    '''
+    owns neighbour grid and position buffers (grown on demand) and runs one boids step over array-backed enemies
+    '''
+    def __init__(self, capacity: int = 64, cell_size: float = NEIGHBOUR_RADIUS) -> None:
+        self.cell_size = cell_size
+        self.grid = HashGrid(capacity)
+        self.new_gl_pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.player_gl_pos = np.zeros(2, dtype=np.float32)
+
+    def step(self, gl_pos: np.array, velocity: np.array, speed: np.array, n: int, player_gl_pos: np.array, dt: float) -> None:
+        '''
+        updates the first n rows of velocity and gl_pos in place
+        '''
+        if n == 0:
+            return
+        grid = self.grid
+        grid.build(gl_pos, n, self.cell_size)
+        if n > len(self.new_gl_pos):
+            self.new_gl_pos = np.zeros((grid.capacity, 2), dtype=np.float32)
+        self.player_gl_pos[:] = player_gl_pos
+        steer_enemies(
+            gl_pos, velocity, speed, n, self.player_gl_pos, dt, grid.cell_size,
+            grid.table_mask, grid.cell_start, grid.cell_items, self.new_gl_pos
+        )
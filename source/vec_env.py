@@ -0,0 +1,623 @@
+'''
+batched simulator for balancing runs: K independent game sessions in stacked arrays, one call steps all of them
+
+rules are Scene.step (player, spawn, collisions, remove dead, enemies, shoot) with Player / enemy constants
+taken from scene.py, spawn ring from spawning.py and boids steering from steering.py, one numba kernel steps
+every environment (prange over envs) and writes into preallocated arrays, a step creates no numpy temporaries.
+deliberate differences to Scene:
+    - fixed per-env capacities (max_enemies, bullet_capacity), dead enemies and bullets stay in their rows
+      with alive = False instead of being compacted / pushed on a free slot stack (same hits, other row order)
+    - population is kept at max_enemies (SpawnScheduler without a curve), no worlds (walls) and no camera
+    - enemy neighbours for steering are all alive enemies of the env filtered by distance, not a HashGrid
+      (same neighbours, max_enemies is small)
+ShardedVecScene splits the environments across worker processes, each worker keeps its shard between calls.
+measured with `python source/vec_env.py` on one core (4096 envs): Scene loop ~23k env-frames/s,
+VecScene ~1.9M env-frames/s (~80x), the sharded run adds pickling of the results
+'''
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import time
+import argparse
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from kernels import kernel, prange
+from scene import (
+    Scene, EPSILON, ENEMY_ON_SPAWN_MIN_DIST, ENEMY_RADIUS, ENEMY_BASE_HITPOINTS, ENEMY_BASE_SPEED,
+    ENEMY_BASE_DAMAGE, BULLET_MAX_RANGE, GL_TO_PIXELS, PLAYER_HITPOINTS, PLAYER_RADIUS, PLAYER_DAMAGE,
+    PLAYER_SHOOT_PERIOD, PLAYER_BULLET_RADIUS, PLAYER_BULLET_SPEED, PLAYER_INVINCIBILITY_TIME,
+    PLAYER_KNOCKBACK_TIME, PLAYER_KNOCKBACK_SPEED, new_seed
+)
+from spawning import SPAWN_RING_WIDTH
+from steering import (
+    NEIGHBOUR_RADIUS, SEPARATION_RADIUS, SEEK_WEIGHT, SEPARATION_WEIGHT, COHESION_WEIGHT, STEERING_EPSILON
+)
+
+SIMULATION_DT = 1 / 120
+
+VEC_MAX_ENEMIES = 5
+VEC_BULLET_CAPACITY = 64
+
+# reward = enemies killed - HIT_PENALTY * hitpoints lost
+HIT_PENALTY = 0.1
+
+# observation row: player pos (2), weapon dir (2), hitpoints, cooldown, enemies relative pos (E * 2), enemies alive (E)
+OBSERVATION_HEADER = 6
+
+
+class VecSceneParams:
+    '''
+    per-environment balancing parameters, every field is a (num_envs,) float32 array
+    '''
+    FIELDS = ('enemy_speed', 'enemy_damage', 'enemy_hitpoints', 'shoot_period', 'spawn_distance')
+
+    def __init__(self, num_envs: int, **values) -> None:
+        defaults = {
+            'enemy_speed': ENEMY_BASE_SPEED, 'enemy_damage': ENEMY_BASE_DAMAGE, 'enemy_hitpoints': ENEMY_BASE_HITPOINTS,
+            'shoot_period': PLAYER_SHOOT_PERIOD, 'spawn_distance': ENEMY_ON_SPAWN_MIN_DIST,
+        }
+        for name in self.FIELDS:
+            column = np.empty(num_envs, dtype=np.float32)
+            column[:] = values.pop(name, defaults[name])  # scalar or per-env array
+            setattr(self, name, column)
+        if values:
+            raise TypeError(f'unknown parameters: {", ".join(values)}')
+
+    def __len__(self) -> int:
+        return len(self.enemy_speed)
+
+    def shard(self, begin: int, end: int) -> dict:
+        return {name: getattr(self, name)[begin:end] for name in self.FIELDS}
+
+
+def warmup_step_args() -> tuple:
+    K, E, B = 2, 3, 4
+    f32 = lambda *shape: np.zeros(shape, dtype=np.float32)
+    flags = lambda *shape: np.zeros(shape, dtype=np.bool_)
+    counters = lambda: np.zeros(K, dtype=np.int64)
+    return (
+        0.01, f32(K, 2), f32(K, 2), flags(K), np.zeros((K, E, 2)),
+        f32(K), f32(K), f32(K), f32(K), f32(K),
+        f32(K, 2), f32(K, 2), f32(K, 2), f32(K), f32(K), flags(K), f32(K), flags(K), f32(K), f32(K, 2),
+        counters(), counters(), counters(), counters(),
+        f32(K, E, 2), f32(K, E, 2), f32(K, E), flags(K, E), f32(K, E, 2),
+        f32(K, B, 2), f32(K, B, 2), flags(K, B),
+        np.ones(2, dtype=np.float32), f32(K), flags(K)
+    )
+
+
+@kernel(warmup_args=warmup_step_args, parallel=True, nogil=True)
+def step_envs(dt, move_dir, aim_gl_pos, is_shooting, spawn_random,
+              enemy_speed, enemy_damage, enemy_hitpoints, shoot_period, spawn_distance,
+              player_gl_pos, player_velocity, weapon_dir, hitpoints, cooldown_shoot, is_invincible,
+              invincibility_left, is_knockbacked, knockback_left, knockback_vec,
+              score, bullets_shot, bullets_hit, frames,
+              enemies_gl_pos, enemies_velocity, enemies_hitpoints, enemies_alive, enemies_new_gl_pos,
+              bullets_gl_pos, bullets_dir, bullets_alive,
+              pixel_scale, rewards, done):
+    '''
+    one Scene.step of every environment, writes rewards and done, state arrays are updated in place
+    spawn_random: (K, E, 2) uniform numbers (angle, distance) for enemies spawned into the slots this step
+    '''
+    num_envs, max_enemies = enemies_alive.shape
+    bullet_capacity = bullets_alive.shape[1]
+    player_reach_sq = (PLAYER_RADIUS + ENEMY_RADIUS) * (PLAYER_RADIUS + ENEMY_RADIUS)
+    bullet_reach_sq = (PLAYER_BULLET_RADIUS + ENEMY_RADIUS) * (PLAYER_BULLET_RADIUS + ENEMY_RADIUS)
+    max_range_sq = BULLET_MAX_RANGE * BULLET_MAX_RANGE
+    neighbour_radius_sq = NEIGHBOUR_RADIUS * NEIGHBOUR_RADIUS
+    separation_radius_sq = SEPARATION_RADIUS * SEPARATION_RADIUS
+    for k in prange(num_envs):
+        hitpoints_before = hitpoints[k]
+
+        # player (Player.update_state): move, aim, bullets, cooldowns
+        if is_knockbacked[k]:
+            player_gl_pos[k, 0] += knockback_vec[k, 0] * dt * PLAYER_KNOCKBACK_SPEED
+            player_gl_pos[k, 1] += knockback_vec[k, 1] * dt * PLAYER_KNOCKBACK_SPEED
+        else:
+            player_velocity[k, 0] = move_dir[k, 0]
+            player_velocity[k, 1] = move_dir[k, 1]
+            player_gl_pos[k, 0] += move_dir[k, 0] * dt
+            player_gl_pos[k, 1] += move_dir[k, 1] * dt
+        px = player_gl_pos[k, 0]
+        py = player_gl_pos[k, 1]
+        aim_x = aim_gl_pos[k, 0] - px
+        aim_y = aim_gl_pos[k, 1] - py
+        aim_len_sq = aim_x * aim_x + aim_y * aim_y
+        if aim_len_sq > 0:
+            aim_inv = 1.0 / np.sqrt(aim_len_sq)
+            weapon_dir[k, 0] = aim_x * aim_inv
+            weapon_dir[k, 1] = aim_y * aim_inv
+        for b in range(bullet_capacity):
+            if not bullets_alive[k, b]:
+                continue
+            dx = bullets_gl_pos[k, b, 0] - px
+            dy = bullets_gl_pos[k, b, 1] - py
+            if dx * dx + dy * dy >= max_range_sq:
+                bullets_alive[k, b] = False
+                continue
+            bullets_gl_pos[k, b, 0] += bullets_dir[k, b, 0] * PLAYER_BULLET_SPEED * dt
+            bullets_gl_pos[k, b, 1] += bullets_dir[k, b, 1] * PLAYER_BULLET_SPEED * dt
+        cooldown_shoot[k] -= dt
+        if is_invincible[k]:
+            invincibility_left[k] -= dt
+        if invincibility_left[k] < 0:
+            is_invincible[k] = False
+            invincibility_left[k] = 0.0
+        if is_knockbacked[k]:
+            knockback_left[k] -= dt
+        if knockback_left[k] < 0:
+            is_knockbacked[k] = False
+            knockback_left[k] = 0.0
+
+        # spawn (SpawnScheduler.spawn_positions): free slots get a point on the ring around the player
+        for e in range(max_enemies):
+            if enemies_alive[k, e]:
+                continue
+            angle = spawn_random[k, e, 0] * 2 * np.pi
+            distance = spawn_random[k, e, 1] * SPAWN_RING_WIDTH + spawn_distance[k]
+            enemies_gl_pos[k, e, 0] = np.cos(angle) * distance + px
+            enemies_gl_pos[k, e, 1] = np.sin(angle) * distance + py
+            enemies_velocity[k, e, 0] = 0.0
+            enemies_velocity[k, e, 1] = 0.0
+            enemies_hitpoints[k, e] = enemy_hitpoints[k]
+            enemies_alive[k, e] = True
+
+        # collisions (Scene.process_collisions), distances in pixels, the nearest overlapping enemy hits
+        if not is_invincible[k]:
+            nearest = -1
+            nearest_dist_sq = np.inf
+            for e in range(max_enemies):
+                delta_x = (px - enemies_gl_pos[k, e, 0]) * pixel_scale[0]
+                delta_y = (py - enemies_gl_pos[k, e, 1]) * pixel_scale[1]
+                dist_sq = delta_x * delta_x + delta_y * delta_y
+                if enemies_alive[k, e] and dist_sq <= player_reach_sq and dist_sq < nearest_dist_sq:
+                    nearest = e
+                    nearest_dist_sq = dist_sq
+            if nearest >= 0:
+                hitpoints[k] -= enemy_damage[k]
+                is_invincible[k] = True
+                invincibility_left[k] = PLAYER_INVINCIBILITY_TIME
+                is_knockbacked[k] = True
+                knockback_left[k] = PLAYER_KNOCKBACK_TIME
+                knock_x = px - enemies_gl_pos[k, nearest, 0]
+                knock_y = py - enemies_gl_pos[k, nearest, 1]
+                knock_len_sq = knock_x * knock_x + knock_y * knock_y
+                knock_inv = 1.0 / np.sqrt(knock_len_sq) if knock_len_sq > 0 else 0.0
+                knockback_vec[k, 0] = knock_x * knock_inv
+                knockback_vec[k, 1] = knock_y * knock_inv
+        for b in range(bullet_capacity):
+            if not bullets_alive[k, b]:
+                continue
+            nearest = -1
+            nearest_dist_sq = np.inf
+            for e in range(max_enemies):
+                delta_x = (bullets_gl_pos[k, b, 0] - enemies_gl_pos[k, e, 0]) * pixel_scale[0]
+                delta_y = (bullets_gl_pos[k, b, 1] - enemies_gl_pos[k, e, 1]) * pixel_scale[1]
+                dist_sq = delta_x * delta_x + delta_y * delta_y
+                if enemies_alive[k, e] and dist_sq <= bullet_reach_sq and dist_sq < nearest_dist_sq:
+                    nearest = e
+                    nearest_dist_sq = dist_sq
+            if nearest >= 0:
+                enemies_hitpoints[k, nearest] -= PLAYER_DAMAGE
+                bullets_alive[k, b] = False
+                bullets_hit[k] += 1
+
+        # remove dead
+        killed = 0
+        for e in range(max_enemies):
+            if enemies_alive[k, e] and enemies_hitpoints[k, e] <= 0:
+                enemies_alive[k, e] = False
+                killed += 1
+        score[k] += killed
+
+        # enemies (steering.steer_enemies): seek + separation + cohesion, positions are read before any moves
+        for i in range(max_enemies):
+            if not enemies_alive[k, i]:
+                continue
+            ex = enemies_gl_pos[k, i, 0]
+            ey = enemies_gl_pos[k, i, 1]
+            seek_x = px - ex
+            seek_y = py - ey
+            seek_len = np.sqrt(seek_x * seek_x + seek_y * seek_y) + STEERING_EPSILON
+            steer_x = SEEK_WEIGHT * seek_x / seek_len
+            steer_y = SEEK_WEIGHT * seek_y / seek_len
+            separation_x = 0.0
+            separation_y = 0.0
+            center_x = 0.0
+            center_y = 0.0
+            neighbours = 0
+            for j in range(max_enemies):
+                if j == i or not enemies_alive[k, j]:
+                    continue
+                delta_x = ex - enemies_gl_pos[k, j, 0]
+                delta_y = ey - enemies_gl_pos[k, j, 1]
+                dist_sq = delta_x * delta_x + delta_y * delta_y
+                if dist_sq > neighbour_radius_sq:
+                    continue
+                center_x += enemies_gl_pos[k, j, 0]
+                center_y += enemies_gl_pos[k, j, 1]
+                neighbours += 1
+                if dist_sq < separation_radius_sq:
+                    inv = 1.0 / (dist_sq + STEERING_EPSILON)
+                    separation_x += delta_x * inv
+                    separation_y += delta_y * inv
+            if neighbours > 0:
+                cohesion_x = center_x / neighbours - ex
+                cohesion_y = center_y / neighbours - ey
+                cohesion_len = np.sqrt(cohesion_x * cohesion_x + cohesion_y * cohesion_y) + STEERING_EPSILON
+                steer_x += SEPARATION_WEIGHT * separation_x + COHESION_WEIGHT * cohesion_x / cohesion_len
+                steer_y += SEPARATION_WEIGHT * separation_y + COHESION_WEIGHT * cohesion_y / cohesion_len
+            steer_len = np.sqrt(steer_x * steer_x + steer_y * steer_y)
+            if steer_len > STEERING_EPSILON:
+                steer_x /= steer_len
+                steer_y /= steer_len
+            enemies_velocity[k, i, 0] = steer_x
+            enemies_velocity[k, i, 1] = steer_y
+            enemies_new_gl_pos[k, i, 0] = ex + steer_x * enemy_speed[k] * dt
+            enemies_new_gl_pos[k, i, 1] = ey + steer_y * enemy_speed[k] * dt
+        for i in range(max_enemies):
+            if enemies_alive[k, i]:
+                enemies_gl_pos[k, i, 0] = enemies_new_gl_pos[k, i, 0]
+                enemies_gl_pos[k, i, 1] = enemies_new_gl_pos[k, i, 1]
+
+        # shoot (Player.shoot), first free slot
+        if is_shooting[k] and cooldown_shoot[k] < EPSILON:
+            for b in range(bullet_capacity):
+                if bullets_alive[k, b]:
+                    continue
+                bullets_gl_pos[k, b, 0] = player_gl_pos[k, 0]
+                bullets_gl_pos[k, b, 1] = player_gl_pos[k, 1]
+                bullets_dir[k, b, 0] = weapon_dir[k, 0]
+                bullets_dir[k, b, 1] = weapon_dir[k, 1]
+                bullets_alive[k, b] = True
+                cooldown_shoot[k] = shoot_period[k]
+                bullets_shot[k] += 1
+                break
+        frames[k] += 1
+
+        rewards[k] = killed - HIT_PENALTY * (hitpoints_before - hitpoints[k])
+        done[k] = hitpoints[k] <= 0
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.zeros((2, 2), dtype=np.float32), np.zeros(2, dtype=np.float32),
+    np.zeros(2, dtype=np.float32), np.zeros((2, 3, 2), dtype=np.float32), np.zeros((2, 3), dtype=np.bool_),
+    np.zeros((2, OBSERVATION_HEADER + 9), dtype=np.float32)
+), parallel=True, nogil=True)
+def observe_envs(player_gl_pos, weapon_dir, hitpoints, cooldown_shoot, enemies_gl_pos, enemies_alive, obs):
+    num_envs, max_enemies = enemies_alive.shape
+    for k in prange(num_envs):
+        obs[k, 0] = player_gl_pos[k, 0]
+        obs[k, 1] = player_gl_pos[k, 1]
+        obs[k, 2] = weapon_dir[k, 0]
+        obs[k, 3] = weapon_dir[k, 1]
+        obs[k, 4] = hitpoints[k]
+        obs[k, 5] = cooldown_shoot[k]
+        for e in range(max_enemies):
+            obs[k, OBSERVATION_HEADER + 2 * e] = enemies_gl_pos[k, e, 0] - player_gl_pos[k, 0]
+            obs[k, OBSERVATION_HEADER + 2 * e + 1] = enemies_gl_pos[k, e, 1] - player_gl_pos[k, 1]
+            obs[k, OBSERVATION_HEADER + 2 * max_enemies + e] = enemies_alive[k, e]
+
+
+class VecScene:
+    '''
+    num_envs sessions, player columns are (K, ...), enemies (K, E, ...), bullets (K, B, ...)
+    dead enemies and bullets stay in their rows with alive = False
+    '''
+    def __init__(self, num_envs: int, params: VecSceneParams = None, seed: int = None,
+                 max_enemies: int = VEC_MAX_ENEMIES, bullet_capacity: int = VEC_BULLET_CAPACITY,
+                 auto_reset: bool = True) -> None:
+        self.num_envs = num_envs
+        self.max_enemies = max_enemies
+        self.bullet_capacity = bullet_capacity
+        self.params = params if params is not None else VecSceneParams(num_envs)
+        self.seed = new_seed() if seed is None else seed
+        self.rng = np.random.default_rng(self.seed)
+        self.auto_reset = auto_reset
+        K, E, B = num_envs, max_enemies, bullet_capacity
+
+        self.player_gl_pos = np.zeros((K, 2), dtype=np.float32)
+        self.player_velocity = np.zeros((K, 2), dtype=np.float32)
+        self.weapon_dir = np.zeros((K, 2), dtype=np.float32)
+        self.hitpoints = np.zeros(K, dtype=np.float32)
+        self.cooldown_shoot = np.zeros(K, dtype=np.float32)
+        self.is_invincible = np.zeros(K, dtype=bool)
+        self.invincibility_left = np.zeros(K, dtype=np.float32)
+        self.is_knockbacked = np.zeros(K, dtype=bool)
+        self.knockback_left = np.zeros(K, dtype=np.float32)
+        self.knockback_vec = np.zeros((K, 2), dtype=np.float32)
+        self.score = np.zeros(K, dtype=np.int64)
+        self.bullets_shot = np.zeros(K, dtype=np.int64)
+        self.bullets_hit = np.zeros(K, dtype=np.int64)
+        self.frames = np.zeros(K, dtype=np.int64)
+        self.episodes = np.zeros(K, dtype=np.int64)
+
+        self.enemies_gl_pos = np.zeros((K, E, 2), dtype=np.float32)
+        self.enemies_velocity = np.zeros((K, E, 2), dtype=np.float32)
+        self.enemies_hitpoints = np.zeros((K, E), dtype=np.float32)
+        self.enemies_alive = np.zeros((K, E), dtype=bool)
+        self.enemies_new_gl_pos = np.zeros((K, E, 2), dtype=np.float32)  # steering scratch
+
+        self.bullets_gl_pos = np.zeros((K, B, 2), dtype=np.float32)
+        self.bullets_dir = np.zeros((K, B, 2), dtype=np.float32)
+        self.bullets_alive = np.zeros((K, B), dtype=bool)
+
+        # step outputs, overwritten by the next step
+        self.spawn_random = np.zeros((K, E, 2), dtype=np.float64)
+        self.rewards = np.zeros(K, dtype=np.float32)
+        self.done = np.zeros(K, dtype=bool)
+        self.env_index = np.arange(K)
+        self.observations = np.zeros((K, OBSERVATION_HEADER + 3 * E), dtype=np.float32)
+        self.reset()
+
+    def __len__(self) -> int:
+        return self.num_envs
+
+    def reset(self, mask: np.array = None) -> np.array:
+        envs = self.env_index if mask is None else np.flatnonzero(mask)
+        self.player_gl_pos[envs] = 0.0
+        self.player_velocity[envs] = 0.0
+        self.weapon_dir[envs] = (1.0, 0.0)
+        self.hitpoints[envs] = PLAYER_HITPOINTS
+        self.cooldown_shoot[envs] = 0.0
+        self.is_invincible[envs] = False
+        self.invincibility_left[envs] = 0.0
+        self.is_knockbacked[envs] = False
+        self.knockback_left[envs] = 0.0
+        self.knockback_vec[envs] = 0.0
+        self.score[envs] = 0
+        self.bullets_shot[envs] = 0
+        self.bullets_hit[envs] = 0
+        self.frames[envs] = 0
+        self.enemies_alive[envs] = False
+        self.bullets_alive[envs] = False
+        return self.observe()
+
+    def step(self, dt: float, move_dir: np.array, aim_gl_pos: np.array,
+             is_shooting: np.array) -> Tuple[np.array, np.array, np.array]:
+        '''
+        move_dir (K, 2) unit or zero vectors, aim_gl_pos (K, 2), is_shooting (K,) bool
+        returns (observations, rewards, done), done envs are reset afterwards when auto_reset is set
+        returned arrays are reused by the next step
+        '''
+        params = self.params
+        self.rng.random(out=self.spawn_random)
+        step_envs(
+            dt, move_dir, aim_gl_pos, is_shooting, self.spawn_random,
+            params.enemy_speed, params.enemy_damage, params.enemy_hitpoints, params.shoot_period, params.spawn_distance,
+            self.player_gl_pos, self.player_velocity, self.weapon_dir, self.hitpoints, self.cooldown_shoot,
+            self.is_invincible, self.invincibility_left, self.is_knockbacked, self.knockback_left, self.knockback_vec,
+            self.score, self.bullets_shot, self.bullets_hit, self.frames,
+            self.enemies_gl_pos, self.enemies_velocity, self.enemies_hitpoints, self.enemies_alive,
+            self.enemies_new_gl_pos, self.bullets_gl_pos, self.bullets_dir, self.bullets_alive,
+            GL_TO_PIXELS, self.rewards, self.done
+        )
+        if self.done.any():
+            self.episodes += self.done
+            if self.auto_reset:
+                self.reset(self.done)  # observes too
+                return self.observations, self.rewards, self.done
+        return self.observe(), self.rewards, self.done
+
+    # ===== OBSERVATIONS =====
+    def observe(self) -> np.array:
+        observe_envs(
+            self.player_gl_pos, self.weapon_dir, self.hitpoints, self.cooldown_shoot,
+            self.enemies_gl_pos, self.enemies_alive, self.observations
+        )
+        return self.observations
+
+    def accuracy(self) -> np.array:
+        return self.bullets_hit / np.maximum(self.bullets_shot, 1)
+
+    def metrics(self) -> Dict[str, np.array]:
+        return {
+            'hitpoints': self.hitpoints.copy(), 'score': self.score.copy(), 'accuracy': self.accuracy(),
+            'frames': self.frames.copy(), 'episodes': self.episodes.copy(),
+        }
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 3, 2), dtype=np.float32), np.zeros((2, 3), dtype=np.bool_), np.zeros((2, 2), dtype=np.float32),
+    np.zeros((2, 2), dtype=np.float32)
+), parallel=True, nogil=True)
+def aim_at_nearest(enemies_gl_pos, enemies_alive, player_gl_pos, aim_gl_pos):
+    '''
+    aim_gl_pos: nearest alive enemy of every env, the first enemy row when none is alive
+    '''
+    num_envs, max_enemies = enemies_alive.shape
+    for k in prange(num_envs):
+        nearest = 0
+        nearest_dist_sq = np.inf
+        for e in range(max_enemies):
+            if not enemies_alive[k, e]:
+                continue
+            dx = enemies_gl_pos[k, e, 0] - player_gl_pos[k, 0]
+            dy = enemies_gl_pos[k, e, 1] - player_gl_pos[k, 1]
+            if dx * dx + dy * dy < nearest_dist_sq:
+                nearest = e
+                nearest_dist_sq = dx * dx + dy * dy
+        aim_gl_pos[k, 0] = enemies_gl_pos[k, nearest, 0]
+        aim_gl_pos[k, 1] = enemies_gl_pos[k, nearest, 1]
+
+
+class ScriptedPolicy:
+    '''
+    vectorized counterpart of headless.ScriptedInput: walk a square, aim at the nearest enemy, always shoot
+    action arrays are kept between calls (sized on the first call)
+    '''
+    MOVES = np.array([(1, 0), (-1, 0), (0, -1), (0, 1)], dtype=np.float32)
+
+    def __init__(self, walk_period: int = 120) -> None:
+        self.walk_period = walk_period
+        self.move_dir = np.zeros((0, 2), dtype=np.float32)
+        self.aim_gl_pos = np.zeros((0, 2), dtype=np.float32)
+        self.is_shooting = np.ones(0, dtype=bool)
+
+    def __call__(self, vec_scene: VecScene, frame: int) -> Tuple[np.array, np.array, np.array]:
+        K = vec_scene.num_envs
+        if len(self.move_dir) != K:
+            self.move_dir = np.zeros((K, 2), dtype=np.float32)
+            self.aim_gl_pos = np.zeros((K, 2), dtype=np.float32)
+            self.is_shooting = np.ones(K, dtype=bool)
+        self.move_dir[:] = self.MOVES[(frame // self.walk_period) % len(self.MOVES)]
+        aim_at_nearest(vec_scene.enemies_gl_pos, vec_scene.enemies_alive, vec_scene.player_gl_pos, self.aim_gl_pos)
+        return self.move_dir, self.aim_gl_pos, self.is_shooting
+
+
+def rollout(vec_scene: VecScene, steps: int, dt: float = SIMULATION_DT, policy: ScriptedPolicy = None) -> np.array:
+    '''
+    steps all environments with policy, returns summed rewards per env
+    '''
+    policy = policy if policy is not None else ScriptedPolicy()
+    total_rewards = np.zeros(vec_scene.num_envs, dtype=np.float32)
+    for frame in range(steps):
+        _, rewards, _ = vec_scene.step(dt, *policy(vec_scene, frame))
+        total_rewards += rewards
+    return total_rewards
+
+
+# ===== PROCESS POOL SHARDING =====
+# every worker process owns exactly one shard (one single-worker pool per shard keeps shard state in place),
+# workers are spawned, not forked: forking after numba started its thread pool can deadlock the child
+worker_shard: VecScene = None
+
+
+def init_worker(num_envs: int, params: dict, seed: int, options: dict) -> None:
+    global worker_shard
+    worker_shard = VecScene(num_envs, VecSceneParams(num_envs, **params), seed, **options)
+
+
+def worker_step(dt: float, move_dir: np.array, aim_gl_pos: np.array, is_shooting: np.array):
+    return worker_shard.step(dt, move_dir, aim_gl_pos, is_shooting)
+
+
+def worker_rollout(steps: int, dt: float) -> Tuple[np.array, Dict[str, np.array]]:
+    return rollout(worker_shard, steps, dt), worker_shard.metrics()
+
+
+def worker_reset() -> np.array:
+    return worker_shard.reset()
+
+
+class ShardedVecScene:
+    '''
+    splits num_envs environments into num_workers VecScene shards living in worker processes
+    step() sends actions to every shard and concatenates results; rollout() runs whole rollouts
+    inside the workers so only the results cross process boundaries
+    '''
+    def __init__(self, num_envs: int, num_workers: int = None, params: VecSceneParams = None,
+                 seed: int = None, **options) -> None:
+        num_workers = num_workers or os.cpu_count() or 1
+        num_workers = max(1, min(num_workers, num_envs))
+        self.num_envs = num_envs
+        self.params = params if params is not None else VecSceneParams(num_envs)
+        self.seed = new_seed() if seed is None else seed
+        self.bounds = np.linspace(0, num_envs, num_workers + 1).astype(np.int64)
+        shard_seeds = np.random.SeedSequence(self.seed).generate_state(num_workers, np.uint64)
+        self.pools: List[ProcessPoolExecutor] = []
+        mp_context = multiprocessing.get_context('spawn')
+        for shard, (begin, end) in enumerate(zip(self.bounds[:-1], self.bounds[1:])):
+            self.pools.append(ProcessPoolExecutor(
+                max_workers=1, mp_context=mp_context, initializer=init_worker,
+                initargs=(int(end - begin), self.params.shard(begin, end), int(shard_seeds[shard]), options)
+            ))
+
+    def __len__(self) -> int:
+        return self.num_envs
+
+    def __enter__(self) -> 'ShardedVecScene':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def shard_slices(self) -> List[slice]:
+        return [slice(begin, end) for begin, end in zip(self.bounds[:-1], self.bounds[1:])]
+
+    def reset(self) -> np.array:
+        return np.concatenate([f.result() for f in [pool.submit(worker_reset) for pool in self.pools]])
+
+    def step(self, dt: float, move_dir: np.array, aim_gl_pos: np.array,
+             is_shooting: np.array) -> Tuple[np.array, np.array, np.array]:
+        futures = [
+            pool.submit(worker_step, dt, move_dir[envs], aim_gl_pos[envs], is_shooting[envs])
+            for pool, envs in zip(self.pools, self.shard_slices())
+        ]
+        observations, rewards, done = zip(*(future.result() for future in futures))
+        return np.concatenate(observations), np.concatenate(rewards), np.concatenate(done)
+
+    def rollout(self, steps: int, dt: float = SIMULATION_DT) -> Tuple[np.array, Dict[str, np.array]]:
+        futures = [pool.submit(worker_rollout, steps, dt) for pool in self.pools]
+        results = [future.result() for future in futures]
+        rewards = np.concatenate([shard_rewards for shard_rewards, _ in results])
+        metrics = {name: np.concatenate([m[name] for _, m in results]) for name in results[0][1]}
+        return rewards, metrics
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.shutdown()
+        self.pools = []
+
+
+def scene_loop_frames_per_second(num_scenes: int, steps: int, warmup_steps: int = 60) -> float:
+    '''
+    baseline: stepping Scene objects one by one (as balancing scripts did before)
+    kernels are compiled and scenes warmed up first, jit time is not part of the measurement
+    '''
+    import kernels
+    from headless import HeadlessRunner
+    kernels.warmup()
+    runners = [HeadlessRunner(Scene(seed)) for seed in range(num_scenes)]
+    for runner in runners:
+        runner.run(warmup_steps)
+    t_start = time.perf_counter()
+    for _ in range(steps):
+        for runner in runners:
+            runner.step(timed=False)
+    return num_scenes * steps / (time.perf_counter() - t_start)
+
+
+def vec_scene_frames_per_second(num_envs: int, steps: int, warmup_steps: int = 60) -> float:
+    '''
+    one VecScene in this process, policy included, jit time is not part of the measurement
+    '''
+    vec_scene = VecScene(num_envs, seed=0)
+    policy = ScriptedPolicy()
+    rollout(vec_scene, warmup_steps, policy=policy)
+    t_start = time.perf_counter()
+    rollout(vec_scene, steps, policy=policy)
+    return num_envs * steps / (time.perf_counter() - t_start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='batched simulation throughput, prints the speedup over the Scene loop')
+    parser.add_argument('--envs', type=int, default=4096)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--steps', type=int, default=600)
+    parser.add_argument('--baseline-scenes', type=int, default=8)
+    args = parser.parse_args()
+
+    baseline = scene_loop_frames_per_second(args.baseline_scenes, min(args.steps, 200))
+    print(f'Scene loop: {baseline:,.0f} env-frames/s')
+
+    throughput = vec_scene_frames_per_second(args.envs, args.steps)
+    print(f'VecScene x{args.envs} in process: {throughput:,.0f} env-frames/s ({throughput / baseline:.0f}x)')
+
+    with ShardedVecScene(args.envs, args.workers, seed=0) as vec_scene:
+        vec_scene.rollout(1)  # workers are started lazily, keep startup out of the measurement
+        t_start = time.perf_counter()
+        rewards, metrics = vec_scene.rollout(args.steps)
+        elapsed = time.perf_counter() - t_start
+    throughput = args.envs * args.steps / elapsed
+    print(f'VecScene x{args.envs} on {args.workers} workers: {throughput:,.0f} env-frames/s ({throughput / baseline:.0f}x)')
+    print(f'mean score {metrics["score"].mean():.2f}, mean accuracy {metrics["accuracy"].mean():.2%}, '
+          f'episodes {metrics["episodes"].sum()}, mean reward {rewards.mean():.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,128 +3,147 @@ import os
 import pygame
 import pygame.locals as locals
 import time
+import json
 import numpy as np
-import copy
-import numba
 import random
 
 # custom src code
 from button import Button
 from scene import ( 
-    Scene, Bullet, Enemy, Camera, Player,
+    Scene, Bullet, Enemy, Camera, Player, ScratchBuffer, FrameState, ViewTransform, SCREEN_VIEW, BULLET_POOL_CAPACITY,
     # map_opengl_to_pg_coordinates_2d, map_pg_to_opengl_coordinates_2d,
-    ctypes_map_opengl_to_screen, ctypes_map_screen_to_opengl
+    ctypes_map_opengl_to_screen, ctypes_map_screen_to_opengl,
+    map_opengl_to_screen_batch
 )
 from hud import HeadupDisplay
+from animation import Animation, DEATH_EFFECT_PARTICLES
+from fonts import get_font, render_text, use_font_source
+from sprites import SpriteBatch
+from compositor import DirtyRectCompositor
+from profiler import FrameProfiler, PHASE_INPUT, PHASE_RENDER, PHASE_PRESENT
+import kernels
+import startup
+from music import MusicStreamer
+from assets import AssetManager, ASSETS_FOLDER
+from recording import InputRecorder, movement_keys_bitmask, VELOCITY_UPDATE_BIT
+from snapshot import SceneSnapshot, load_snapshot
+from spawning import WaveCurve, WAVE_PEAK_POPULATION
+from governor import FrameGovernor, RENDER_DETAIL_NONE, RENDER_DETAIL_LOW, RENDER_DETAIL_FULL
 
 
 ###############
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 400
 WINDOW_CAPTION = "Happy Days"
+RENDER_FPS = 120
+SIMULATION_DT = 1 / 120  # fixed simulation step, independent of RENDER_FPS
+MAX_SIMULATION_STEPS_PER_FRAME = 5
+MAX_FRAME_DT = 0.25  # longer hitches (window dragged, breakpoint) are clamped
+EPSILON = 0.000001
+PROFILES_FOLDER = 'profiles/'
+SAVES_FOLDER = 'saves/'
+QUICKSAVE_FILE = 'quicksave.snap'
+FONT_ASSET = 'font.ttf'
+WALL_COLOR = (70, 70, 90)
 ###############
 
 
-# ======= HELPER FUNCTIONS =============
-def get_font(size):
-    return pygame.font.Font("assets/font.ttf", size)
-
-
 # ======= RENDER FUNCTIONS =============
-def render_cursor(screen_ptr: pygame.Surface, pg_cursor_pos: np.array, size: int) -> None:
-    cursor_texture = get_font(size).render('+', True, 'red')
-    screen_ptr.blit(cursor_texture, pg_cursor_pos)
-
-
-def render_player(screen_ptr: pygame.Surface, player: Player) -> None:
-    gl_pos = player.current_position.copy()
-    viewport = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
-    # pg_pos = map_opengl_to_pg_coordinates_2d(gl_pos, viewport)
-    pg_pos = ctypes_map_opengl_to_screen(gl_pos, viewport)
-    pygame.draw.circle(screen_ptr, "white", pg_pos, player.base_radius)
-
-
-def render_bullet(screen_ptr: pygame.Surface, bullet: Bullet) -> None:
-    gl_pos = bullet.gl_pos.copy()
-    viewport = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
-    # pg_pos = map_opengl_to_pg_coordinates_2d(gl_pos, viewport)
-    pg_pos = ctypes_map_opengl_to_screen(gl_pos, viewport)
+def render_cursor(screen_ptr: pygame.Surface, pg_cursor_pos: np.array, size: int) -> pygame.Rect:
+    cursor_texture = render_text('+', size, 'red')
+    return screen_ptr.blit(cursor_texture, pg_cursor_pos)
 
-    pygame.draw.circle(screen_ptr, "white", pg_pos, bullet.pg_radius)
 
+# screen space buffers for batch transforms (reused every frame)
+player_pg_pos_buffer = ScratchBuffer(1)
+bullets_pg_pos_buffer = ScratchBuffer()
+enemies_pg_pos_buffer = ScratchBuffer()
+walls_pg_buffer = ScratchBuffer()
+walls_rect_buffer = ScratchBuffer(width=4)  # left, top, width, height
+player_radius_buffer = np.zeros(1, dtype=np.float32)
+# rounded radii of projected circles, grown with the entity count
+sprite_radius_buffer = np.zeros(BULLET_POOL_CAPACITY, dtype=np.int32)
+# render_player / render_bullets / render_enemies queue sprites, render_scene_* flushes them
+sprite_batch = SpriteBatch()
 
-def render_enemy(screen_ptr: pygame.Surface, enemy: Enemy) -> None:
-    gl_pos = enemy.gl_pos.copy()
-    viewport = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
-    # pg_pos = map_opengl_to_pg_coordinates_2d(gl_pos, viewport)
-    pg_pos = ctypes_map_opengl_to_screen(gl_pos, viewport)
 
-    pygame.draw.circle(screen_ptr, "red", pg_pos, enemy.radius)
+def sprite_radii(n: int) -> np.array:
+    global sprite_radius_buffer
+    if n > len(sprite_radius_buffer):
+        sprite_radius_buffer = np.zeros(max(n, 2 * len(sprite_radius_buffer)), dtype=np.int32)
+    return sprite_radius_buffer
 
 
-def render_scene_camera_offset(screen_ptr: pygame.Surface, scene: Scene) -> None:
-    
-    # todo later (do not render shit too far away from player)
+def render_player(screen_ptr: pygame.Surface, gl_pos: np.array, radius: float, view: ViewTransform = SCREEN_VIEW) -> None:
+    player_radius_buffer[0] = radius
+    corners, int_radius = view.project_circles(gl_pos, player_radius_buffer, player_pg_pos_buffer, sprite_radii(1))
+    sprite_batch.add_sprites(corners, int_radius, "white")
 
-    # make copies of objects of the scene (to ensure original objects did not modified)
-    player_copy = copy.deepcopy(scene.player)
-    bullets_alive_copy = copy.deepcopy(player_copy.bullets_alive)
-    enemies_alive_copy = copy.deepcopy(scene.enemies_alive)
-    camera_copy = copy.deepcopy(scene.camera)
-    
-    # apply camera to all objects of the scene (player, bullets, enemies)
-    player_copy.current_position = camera_copy.apply(player_copy.current_position)
-    render_player(screen_ptr, player_copy)
 
-    for bullet in bullets_alive_copy:
-        bullet.gl_pos = camera_copy.apply(bullet.gl_pos)
-        render_bullet(screen_ptr, bullet)
+def render_bullets(screen_ptr: pygame.Surface, gl_pos: np.array, pg_radius: np.array, view: ViewTransform = SCREEN_VIEW) -> None:
+    corners, int_radius = view.project_circles(gl_pos, pg_radius, bullets_pg_pos_buffer, sprite_radii(len(gl_pos)))
+    sprite_batch.add_sprites(corners, int_radius, "white")
 
-    for enemy in enemies_alive_copy:
-        enemy.gl_pos = camera_copy.apply(enemy.gl_pos)
-        render_enemy(screen_ptr, enemy)
 
+def render_enemies(screen_ptr: pygame.Surface, gl_pos: np.array, radius: np.array, view: ViewTransform = SCREEN_VIEW) -> None:
+    corners, int_radius = view.project_circles(gl_pos, radius, enemies_pg_pos_buffer, sprite_radii(len(gl_pos)))
+    sprite_batch.add_sprites(corners, int_radius, "red")
 
-def render_scene_no_camera_offset(screen_ptr: pygame.Surface, scene: Scene) -> None:
-    
-    # todo later (do not render shit too far away from player)
 
-    # make copies of objects of the scene (to ensure original objects did not modified)
-    player_copy = copy.deepcopy(scene.player)
-    bullets_alive_copy = copy.deepcopy(player_copy.bullets_alive)
-    enemies_alive_copy = copy.deepcopy(scene.enemies_alive)
-    
-    # apply camera to all objects of the scene (player, bullets, enemies)
-    render_player(screen_ptr, player_copy)
-    for bullet in bullets_alive_copy: render_bullet(screen_ptr, bullet)
-    for enemy in enemies_alive_copy: render_enemy(screen_ptr, enemy)
+def render_walls(screen_ptr: pygame.Surface, walls_gl: np.array, view: ViewTransform = SCREEN_VIEW, dirty_rects: list = None) -> None:
+    if len(walls_gl) == 0:
+        return
+    # both corners of every box through the view in one batch, rect columns are written into walls_rect_buffer
+    corners_pg = view.apply(walls_gl.reshape(-1, 2), out=walls_pg_buffer.get(2 * len(walls_gl))).reshape(-1, 4)
+    rects = walls_rect_buffer.get(len(walls_gl))
+    np.minimum(corners_pg[:, :2], corners_pg[:, 2:], out=rects[:, :2])
+    np.subtract(corners_pg[:, 2:], corners_pg[:, :2], out=rects[:, 2:])
+    np.abs(rects[:, 2:], out=rects[:, 2:])
+    rects[:, 2:] += 1
+    for rect in rects.tolist():
+        drawn_rect = pygame.draw.rect(screen_ptr, WALL_COLOR, rect)
+        if dirty_rects is not None:
+            dirty_rects.append(drawn_rect)
+
+
+def render_scene_camera_offset(screen_ptr: pygame.Surface, frame: FrameState, dirty_rects: list = None) -> None:
+    # camera and viewport are one matrix, entities off screen are culled before transform and draw
+    render_walls(screen_ptr, frame.walls_gl, frame.camera_view, dirty_rects)
+    render_player(screen_ptr, frame.player_gl_pos, frame.player_radius, frame.camera_view)
+    render_bullets(screen_ptr, frame.bullets_gl_pos, frame.bullets_pg_radius, frame.camera_view)
+    render_enemies(screen_ptr, frame.enemies_gl_pos, frame.enemies_radius, frame.camera_view)
+    sprite_batch.flush(screen_ptr, dirty_rects)
+
+
+def render_scene_no_camera_offset(screen_ptr: pygame.Surface, frame: FrameState, dirty_rects: list = None) -> None:
+    render_walls(screen_ptr, frame.walls_gl, dirty_rects=dirty_rects)
+    render_player(screen_ptr, frame.player_gl_pos, frame.player_radius)
+    render_bullets(screen_ptr, frame.bullets_gl_pos, frame.bullets_pg_radius)
+    render_enemies(screen_ptr, frame.enemies_gl_pos, frame.enemies_radius)
+    sprite_batch.flush(screen_ptr, dirty_rects)
 
 
 # ======= GAME WINDOW ======================
 class Window:
 
-    def __init__(self) -> None:
+    def __init__(self, seed: int = None, record_path: str = None, world_path: str = None, governor: bool = True,
+                 waves: bool = False) -> None:
         pygame.init()
         pygame.mixer.init()
-        pygame.mixer.Channel(0).set_volume(0.02)
 
         self.clock = pygame.time.Clock()
         
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption(WINDOW_CAPTION)
 
-        self.main_menu_bg = pygame.image.load("assets/Main_menu_bg.png").convert()
-        self.main_menu_font = pygame.font.Font("assets/font.ttf", 32)
+        # assets are loaded on a worker thread while main menu shows loading bar
+        self.assets = AssetManager(ASSETS_FOLDER)
+        self.assets.start_preload()
+        self.main_menu_bg = None
+        self.main_menu_font = None
         # 
         self.gray = "#d7fcd"
-        self.main_menu_buttons = (
-            Button(image=pygame.image.load("assets/Play Rect.png"), pos=(400, 50), 
-                        text_input="PLAY", font=get_font(75), base_color="Black", hovering_color="Red"),
-            Button(image=pygame.image.load("assets/Options Rect.png"), pos=(400, 200), 
-                        text_input="OPTIONS", font=get_font(75), base_color="Black", hovering_color="Red"),
-            Button(image=pygame.image.load("assets/Quit Rect.png"), pos=(400, 350), 
-                        text_input="QUIT", font=get_font(75), base_color="Black", hovering_color="Red")
-        )
+        self.main_menu_buttons = ()
 
         # PLAY_BUTTON = Button(image=pygame.image.load("assets/Play Rect.png"), pos=(640, 250), 
         #                     text_input="PLAY", font=self.main_menu_font(75), base_color="#d7fcd4", hovering_color="White")
@@ -133,16 +152,34 @@ class Window:
         # QUIT_BUTTON = Button(image=pygame.image.load("assets/Quit Rect.png"), pos=(640, 550), 
         #                     text_input="QUIT", font=self.main_menu_font(75), base_color="#d7fcd4", hovering_color="White")
 
-        self.game_scene = Scene()
+        self.game_scene = Scene(seed)
+        if world_path is not None:
+            self.game_scene.load_world(world_path)
+        if waves:
+            # population follows repeating waves up to their peak instead of staying at max_enemies
+            self.game_scene.spawner.curve = WaveCurve.game_waves()
+            self.game_scene.max_enemies = WAVE_PEAK_POPULATION
+        # input recording (see recording.py), inputs of every simulation step are logged
+        self.record_path = record_path
+        self.recorder = InputRecorder(self.game_scene.seed, world_path) if record_path is not None else None
+        self.movement_keys_bitmask = 0
+        self.velocity_update_pending = False
         self.current_game_state = 'main'
-        self.current_track = ''
-        self.prev_track = ''
-        self.mixer_is_idle = True
-        self.play_menu_track_queue = []
         self.track_list_folder = 'assets/music/'
-        self.track_list = os.listdir(self.track_list_folder)
-        # self.current_game_score = 0
+        self.track_list = sorted(os.listdir(self.track_list_folder))
+        self.music = MusicStreamer(self.track_list_folder, self.track_list)
         self.game_is_paused = False
+        # F5 / F9 quick save and load, retry restores the scene as it was when play started (see snapshot.py)
+        self.quicksave = SceneSnapshot()
+        self.retry_snapshot = SceneSnapshot()
+        self.animation = Animation()  # particles, cosmetic only
+        self.profiler = None  # F3 toggles frame profiler overlay, F4 dumps traces
+        # frame-budget governor scales quality knobs to hold RENDER_FPS, None keeps full quality
+        # simulation knobs stay fixed while recording (replays run without a governor)
+        self.governor = None
+        if governor:
+            self.governor = FrameGovernor(target_frame_time=1 / RENDER_FPS, simulation_knobs=record_path is None)
+            self.governor.attach(self.game_scene, self.animation)
     
     def handle_keyboard_events_main_menu(self):
         menu_mouse_pos = pygame.mouse.get_pos()
@@ -173,8 +210,52 @@ class Window:
             
         return
     
+    def loading_screen(self):
+        # assets load on worker thread, hot kernels are compiled one per frame (no jit hitches in play later)
+        # window stays responsive and draws progress bar (no fonts needed)
+        with startup.timed('loading screen'):
+            self.run_loading_screen()
+        print(self.assets.report())
+        print(startup.report())
+
+    def run_loading_screen(self):
+        total_kernels = len(kernels.registry)
+        while True:
+            assets_ready = self.assets.poll()
+            kernels_ready = kernels.warmup_next()
+            if assets_ready and kernels_ready:
+                break
+            self.clock.tick(60)
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+            self.screen.fill("black")
+            bar_rect = pygame.Rect(WINDOW_WIDTH // 4, WINDOW_HEIGHT // 2 - 5, WINDOW_WIDTH // 2, 10)
+            pygame.draw.rect(self.screen, "gray30", bar_rect)
+            kernels_progress = 1.0 - len(kernels.pending_kernels()) / max(total_kernels, 1)
+            progress = 0.5 * (self.assets.progress() + kernels_progress)
+            pygame.draw.rect(self.screen, "white", (bar_rect.x, bar_rect.y, bar_rect.w * progress, bar_rect.h))
+            pygame.display.update()
+
+    def create_main_menu(self):
+        use_font_source(lambda: self.assets.font_file(FONT_ASSET))
+        self.main_menu_bg = self.assets.image("Main_menu_bg.png")
+        self.main_menu_font = get_font(32)
+        self.main_menu_buttons = (
+            Button(image=self.assets.image("Play Rect.png"), pos=(400, 50), 
+                        text_input="PLAY", font=get_font(75), base_color="Black", hovering_color="Red"),
+            Button(image=self.assets.image("Options Rect.png"), pos=(400, 200), 
+                        text_input="OPTIONS", font=get_font(75), base_color="Black", hovering_color="Red"),
+            Button(image=self.assets.image("Quit Rect.png"), pos=(400, 350), 
+                        text_input="QUIT", font=get_font(75), base_color="Black", hovering_color="Red")
+        )
+
     def main_menu(self):
-        pygame.mixer.music.load("assets/ambientmain_0.ogg")
+        if len(self.main_menu_buttons) == 0:
+            self.loading_screen()
+            self.create_main_menu()
+        pygame.mixer.music.load(self.assets.path("ambientmain_0.ogg"))
         pygame.mixer.music.set_volume(0.1)
         pygame.mixer.music.play(-1)
         menu_is_active = True
@@ -228,9 +309,23 @@ class Window:
     def handle_events_play(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self.save_recording()
                 pygame.quit()
                 sys.exit()
             
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_profiler()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.dump_profile()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                self.game_is_paused = not self.game_is_paused
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                self.quick_save()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                self.quick_load()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_r and self.game_scene.player.hitpoints <= 0:
+                self.retry()
+
             if event.type == pygame.KEYDOWN or event.type == pygame.KEYUP:
                 keys_pressed = pygame.key.get_pressed()
                 # keys_movement = (pygame.K_d, pygame.K_a, pygame.K_s, pygame.K_w)
@@ -241,86 +336,167 @@ class Window:
                 # new_velocity_vector = sum(current_move_vectors)
                 # self.current_velocity = new_velocity_vector
                 self.game_scene.player.update_velocity_vector(keys_pressed)
+                self.movement_keys_bitmask = movement_keys_bitmask(keys_pressed)
+                self.velocity_update_pending = True
                 # self.game_scene.player.normalize_velocity_vector()
 
+    def toggle_profiler(self):
+        # disabled profiler is None, frame loop then skips all instrumentation
+        self.profiler = FrameProfiler() if self.profiler is None else None
+
+    def dump_profile(self):
+        if self.profiler is None:
+            return
+        os.makedirs(PROFILES_FOLDER, exist_ok=True)
+        trace_name = os.path.join(PROFILES_FOLDER, time.strftime('trace_%Y%m%d_%H%M%S'))
+        self.profiler.export_chrome_trace(trace_name + '.json')
+        self.profiler.export_csv(trace_name + '.csv')
+        if self.governor is not None:
+            with open(trace_name + '_governor.json', 'w') as f:
+                json.dump(self.governor.metrics(), f, indent=2)
+        print(f'profile saved to {trace_name}.json / .csv')
+
+    def quick_save(self):
+        os.makedirs(SAVES_FOLDER, exist_ok=True)
+        path = os.path.join(SAVES_FOLDER, QUICKSAVE_FILE)
+        self.quicksave.capture(self.game_scene).save(path)
+        print(f'scene saved to {path} ({self.quicksave.nbytes} bytes)')
+
+    def can_rewind(self) -> bool:
+        # a recording only holds inputs, replay can not follow a jump to another state
+        if self.recorder is not None:
+            print('load / retry is disabled while recording')
+            return False
+        return True
+
+    def quick_load(self):
+        path = os.path.join(SAVES_FOLDER, QUICKSAVE_FILE)
+        if not os.path.exists(path) or not self.can_rewind():
+            return
+        load_snapshot(path).restore(self.game_scene)
+        self.velocity_update_pending = True
+        if self.governor is not None:
+            self.governor.apply()  # caps of the current quality level replace max_enemies stored in the snapshot
+
+    def retry(self):
+        if not self.can_rewind():
+            return
+        self.retry_snapshot.restore(self.game_scene)
+        self.animation.count = 0
+        self.game_is_paused = False
+        if self.governor is not None:
+            self.governor.apply()
+
     def play_music(self):
-        if not pygame.mixer.Channel(0).get_busy():
-            
-            if self.prev_track == '':
-                next_track_name = random.choice(self.track_list)
-            else:
-                tracklist_copy = self.track_list.copy()
-                tracklist_copy.remove(self.prev_track)
-                next_track_name = random.choice(self.track_list.copy())
-            
-            next_track = pygame.mixer.Sound(
-                self.track_list_folder + next_track_name
-            )
-            self.prev_track = next_track_name
-            pygame.mixer.Channel(0).play(next_track, fade_ms=3000)
+        self.music.update()
+
+    def simulation_step(self, dt: float, m_xpos: int, m_ypos: int, is_shooting: bool, phase_ns: np.array = None) -> int:
+        '''
+        advances game scene by one fixed step, returns number of enemies killed
+        '''
+        if self.recorder is not None:
+            keys_bitmask = self.movement_keys_bitmask | (VELOCITY_UPDATE_BIT if self.velocity_update_pending else 0)
+            self.recorder.record(dt, keys_bitmask, m_xpos, m_ypos, is_shooting)
+        self.velocity_update_pending = False
+        self.game_scene.store_previous_state()
+        enemies_dead = self.game_scene.step(dt, m_xpos, m_ypos, is_shooting, phase_ns)
+        if enemies_dead and self.render_detail() != RENDER_DETAIL_NONE:
+            particles_per_enemy = DEATH_EFFECT_PARTICLES // 4 if self.render_detail() == RENDER_DETAIL_LOW else DEATH_EFFECT_PARTICLES
+            self.animation.create_enemy_death_effect(self.game_scene.enemies.dead_gl_pos, particles_per_enemy)
+        return enemies_dead
+
+    def render_detail(self) -> int:
+        return self.governor.render_detail if self.governor is not None else RENDER_DETAIL_FULL
+
+    def save_recording(self):
+        if self.recorder is None:
+            return
+        self.recorder.save(self.record_path, self.game_scene)
+        print(f'recording saved to {self.record_path} ({len(self.recorder)} steps, seed {self.recorder.seed})')
 
     def play(self):
         debug_mode = True
         pygame.mouse.set_cursor((8,8),(0,0),(0,0,0,0,0,0,0,0),(0,0,0,0,0,0,0,0)) # invisible cursor
         current_session_hud = HeadupDisplay(player_max_hp=self.game_scene.player.hitpoints)
-        viewport = np.array([WINDOW_WIDTH, WINDOW_HEIGHT])
-        fps = 120
+        compositor = DirtyRectCompositor(background_color="black")
+        fps = RENDER_FPS
         game_over = False
-        t1 = time.time()
-        time.sleep(1 / fps)
-        current_game_score = 0
+        # fixed timestep: simulation runs in SIMULATION_DT steps, rendering interpolates between last two steps
+        accumulator = 0.0
+        self.retry_snapshot.capture(self.game_scene)
+        t1 = time.perf_counter()
         while not game_over:
             self.play_music()
             self.clock.tick(fps)  
-            self.screen.fill("black")
+            t2 = time.perf_counter()
+            frame_dt = min(t2 - t1, MAX_FRAME_DT)
+            t1 = t2
+            accumulator += frame_dt
+            profiler = self.profiler  # toggling takes effect from the next frame
+            if profiler is not None: profiler.begin_frame()
+
+            erased_rects = compositor.begin_frame(self.screen)
+            current_session_hud.invalidate_overlapping(erased_rects)
+
             # update states
-            t2 = time.time()
-            dt = t2 - t1
-            t1 = time.time()
             m_xpos, m_ypos = pygame.mouse.get_pos()
             self.handle_events_play()
-            # player
-            self.game_scene.player.update_state(dt, m_xpos, m_ypos)
-
-            # enemies
-            self.game_scene.add_enemies()
-            self.game_scene.process_collisions()
-            this_frame_enemies_dead = self.game_scene.remove_dead_enemies()
-            current_game_score += this_frame_enemies_dead
-            self.game_scene.update_enemies(dt, self.game_scene.player.current_position)
+            is_shooting = pygame.mouse.get_pressed()[0] # Left click
+            if profiler is not None: profiler.mark(PHASE_INPUT)
+
+            simulation_steps = 0
+            phase_ns = profiler.simulation_phase_ns if profiler is not None else None
+            game_is_over = self.game_scene.player.hitpoints <= 0
+            if self.game_is_paused or game_is_over:
+                # scene is frozen, time spent in menus is not simulated afterwards
+                accumulator = 0.0
+                frame_dt = 0.0
+            while accumulator >= SIMULATION_DT and simulation_steps < MAX_SIMULATION_STEPS_PER_FRAME:
+                self.simulation_step(SIMULATION_DT, m_xpos, m_ypos, is_shooting, phase_ns)
+                accumulator -= SIMULATION_DT
+                simulation_steps += 1
+            if profiler is not None: profiler.resync()
+            if simulation_steps == MAX_SIMULATION_STEPS_PER_FRAME:
+                # too far behind, drop the backlog instead of spiralling
+                accumulator = min(accumulator, SIMULATION_DT)
+            interpolation_alpha = accumulator / SIMULATION_DT
+            # particles are cosmetic, they follow frame time instead of the fixed step
+            render_detail = self.render_detail()
+            if render_detail != RENDER_DETAIL_NONE:
+                self.animation.update_state(frame_dt)
 
             # hud
             current_session_hud.update_hud(self.game_scene.player.hitpoints)
 
-            # camera
-            # self.game_scene.camera.update_velocity_vector(self.game_scene.player.current_position)
-            # self.game_scene.camera.update_position(dt)
-
-
-            if pygame.mouse.get_pressed()[0]: # Left click
-                self.game_scene.player.shoot()
-
             # ========= rendering part
-            render_cursor(self.screen, np.array([m_xpos, m_ypos]), size=16)
-
-            # render_scene_no_camera_offset(self.screen, self.game_scene)
-            render_scene_no_camera_offset(self.screen, self.game_scene)
+            compositor.add(render_cursor(self.screen, (m_xpos, m_ypos), size=16))
+
+            frame = self.game_scene.frame_state(interpolation_alpha)
+            # render_scene_camera_offset(self.screen, frame, compositor.current_rects)
+            render_scene_no_camera_offset(self.screen, frame, compositor.current_rects)
+            if render_detail != RENDER_DETAIL_NONE:
+                compositor.add_rects(self.animation.draw(self.screen))
+            if game_is_over:
+                self.gameover_menu(compositor)
+            elif self.game_is_paused:
+                self.pause_menu(compositor)
 
             # hud is last to render (nearest to the user)
-            current_session_hud.draw_hud_elements(self.screen)
-            game_score_text = get_font(size=32).render(f'Score: {current_game_score}', True, 'white')
+            compositor.add_rects(current_session_hud.draw_hud_elements(self.screen))
+            game_score_text = render_text(f'Score: {self.game_scene.score}', 32, 'white')
             player_accuracy = 0 if self.game_scene.player.bullets_shot == 0 else self.game_scene.player.bullets_hit / self.game_scene.player.bullets_shot
-            player_accuracy_text = get_font(size=8).render(f'Accuracy% : {player_accuracy * 100}', True, 'white')
+            player_accuracy_text = render_text(f'Accuracy% : {player_accuracy * 100}', 8, 'white')
 
-            self.screen.blit(game_score_text, (WINDOW_WIDTH // 2 - 100, 10))
-            self.screen.blit(player_accuracy_text, (10, 20))
+            compositor.blit(self.screen, game_score_text, (WINDOW_WIDTH // 2 - 100, 10))
+            compositor.blit(self.screen, player_accuracy_text, (10, 20))
 
             if debug_mode:
                 # pg_direction_text = get_font(size=8).render(f'pg_weapon_direction: {pg_player_dir_vector_endpoint}', True, "white")
                 # gl_direction_text = get_font(size=8).render(f'gl_weapon_dir_endpoint: {gl_weapon_dir_endpoint}', True, "white")
                 # velocity_text = get_font(size=8).render(f'player_velocity: {self.game_scene.player.current_velocity}', True, "white")
                 # player_pos_text = get_font(size=8).render(f'player_pos:{pg_player_pos}', True, "white")
-                fps_text = get_font(size=8).render(f'FPS: {int(1 / dt)}', True, 'white')
+                quality_label = '' if self.governor is None else f'  Q{self.governor.level}'
+                fps_text = render_text(f'FPS: {int(self.clock.get_fps())}{quality_label}', 8, 'white')
                 # debug_labels = (
                 #     pg_direction_text, gl_direction_text, velocity_text, 
                 #     player_pos_text, fps_text
@@ -330,26 +506,40 @@ class Window:
                 #         i -= 1
                 #         continue
                 #     self.screen.blit(label, (10, 10 * (i + 1)))
-                self.screen.blit(fps_text, (10, 10))
-
-            # render scene
-
-            pygame.display.update()
+                compositor.blit(self.screen, fps_text, (10, 10))
+
+            if profiler is not None:
+                # overlay shows the recorded frames, its own drawing is render time of this frame
+                compositor.add(profiler.draw_overlay(self.screen))
+                profiler.mark(PHASE_RENDER)
+
+            # only rects that changed since last frame go to display
+            compositor.end_frame()
+            if profiler is not None:
+                profiler.mark(PHASE_PRESENT)
+                profiler.end_frame()
+            if self.governor is not None:
+                # work time of the frame, waiting in clock.tick is headroom
+                self.governor.update(time.perf_counter() - t2)
     
-    def gameover_menu(self):
+    def gameover_menu(self, compositor: DirtyRectCompositor):
         # quit (to main menu button)
-        # retry button
-        ...
-
-    def pause_menu(self):
+        # retry (R) restores self.retry_snapshot
+        title_text = render_text('GAME OVER', 32, 'white')
+        hint_text = render_text('R - retry', 16, 'white')
+        compositor.blit(self.screen, title_text, (WINDOW_WIDTH // 2 - title_text.get_width() // 2, WINDOW_HEIGHT // 2 - 40))
+        compositor.blit(self.screen, hint_text, (WINDOW_WIDTH // 2 - hint_text.get_width() // 2, WINDOW_HEIGHT // 2 + 10))
 
-        # render scene but no dt = 0 each frame
+    def pause_menu(self, compositor: DirtyRectCompositor):
+        # scene is rendered but not simulated (play skips simulation steps while paused)
 
         # darken all game scene
 
         # draw pause buttons (resume, options, quit)
-
-        ...
+        title_text = render_text('PAUSED', 32, 'white')
+        hint_text = render_text('ESC - resume   F5 - save   F9 - load', 16, 'white')
+        compositor.blit(self.screen, title_text, (WINDOW_WIDTH // 2 - title_text.get_width() // 2, WINDOW_HEIGHT // 2 - 40))
+        compositor.blit(self.screen, hint_text, (WINDOW_WIDTH // 2 - hint_text.get_width() // 2, WINDOW_HEIGHT // 2 + 10))
 
     def window_game_main_loop(self):   
         self.main_menu()
@@ -0,0 +1,379 @@
+'''
+chunked world with static wall geometry
+
+walls are axis aligned boxes (min_x, min_y, max_x, max_y) in gl coordinates. The world is a grid of square chunks,
+every chunk lists the walls overlapping it (walls crossing chunk borders are stored in every chunk they touch),
+which doubles as the static collision index: a query only looks at the chunks its bounding box overlaps,
+circle queries (resolve_circles, hit_circles) only at the resident ones among them.
+
+file layout (little endian), read through np.memmap so only touched chunks are paged in:
+    header: magic b'HDWL', version u16, reserved u16, chunk size f32, origin x f32, origin y f32,
+            chunks x u32, chunks y u32, wall count u32
+    chunk table: chunks x * chunks y records of CHUNK_DTYPE (row major, index = cy * chunks_x + cx)
+    walls: wall count records of (4,) float32, grouped by chunk
+
+only chunks around the player and the camera stay resident, so memory use and per-frame cost
+do not depend on world size
+
+    python source/world.py arena.world --chunks 16 16 --seed 0   # then: python source/main.py --world arena.world
+'''
+import struct
+import argparse
+import numpy as np
+
+from collections import OrderedDict
+from typing import Dict, Iterable, Tuple
+from config import EPSILON
+from kernels import kernel
+from scene import GL_TO_PIXELS
+
+WORLD_MAGIC = b'HDWL'
+WORLD_VERSION = 1
+HEADER_FORMAT = '<4sHHfffIII'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+CHUNK_DTYPE = np.dtype([('first', '<u4'), ('count', '<u4')])
+WALL_FIELDS = 4
+
+CHUNK_SIZE = 2.0  # gl units, one screen at zoom 1
+STREAM_RADIUS = 1  # chunks kept around every streaming center
+MAX_RESIDENT_CHUNKS = 64
+
+# radii are in pg pixels (see Scene.process_collisions), collisions are resolved in pixel scaled space (GL_TO_PIXELS)
+
+
+class WallChunk:
+    '''
+    walls of one chunk, boxes is a read-only view into the memory mapped file
+    '''
+    __slots__ = ('key', 'boxes')
+
+    def __init__(self, key: Tuple[int, int], boxes: np.array) -> None:
+        self.key = key
+        self.boxes = boxes
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+
+def read_only_boxes() -> np.array:
+    boxes = np.zeros((2, WALL_FIELDS), dtype=np.float32)
+    boxes.setflags(write=False)  # chunk boxes are views of the read-only memmap
+    return boxes
+
+
+@kernel(warmup_args=lambda: (
+    read_only_boxes(), np.zeros(2, dtype=np.float32), np.float32(CHUNK_SIZE), 2, 2,
+    np.zeros((2, 2), dtype=np.int64), 1, np.zeros((4, WALL_FIELDS), dtype=np.float32), 0
+))
+def gather_chunk_boxes(boxes, origin, chunk_size, chunks_x, chunks_y, gathered_keys, n_gathered, out, count):
+    '''
+    appends boxes of one chunk to out from row count, returns the new count
+    walls crossing chunk borders are stored in every chunk they touch, a box is skipped when it also touches
+    one of the n_gathered chunks already appended (gathered_keys), chunk range computed as in write_world
+    '''
+    for i in range(len(boxes)):
+        x0 = min(max(np.int64(np.floor((boxes[i, 0] - origin[0]) / chunk_size)), 0), chunks_x - 1)
+        y0 = min(max(np.int64(np.floor((boxes[i, 1] - origin[1]) / chunk_size)), 0), chunks_y - 1)
+        x1 = min(max(np.int64(np.floor((boxes[i, 2] - origin[0]) / chunk_size)), 0), chunks_x - 1)
+        y1 = min(max(np.int64(np.floor((boxes[i, 3] - origin[1]) / chunk_size)), 0), chunks_y - 1)
+        duplicate = False
+        for g in range(n_gathered):
+            if x0 <= gathered_keys[g, 0] <= x1 and y0 <= gathered_keys[g, 1] <= y1:
+                duplicate = True
+                break
+        if duplicate:
+            continue
+        for field in range(WALL_FIELDS):
+            out[count, field] = boxes[i, field]
+        count += 1
+    return count
+
+
+@kernel(warmup_args=lambda: (
+    np.zeros((2, 2), dtype=np.float32), np.ones(2, dtype=np.float32), np.zeros((2, WALL_FIELDS), dtype=np.float32),
+    2, np.ones(2, dtype=np.float32), True, np.zeros(2, dtype=np.bool_)
+))
+def push_circles(gl_pos, pg_radius, boxes, m, pixel_scale, resolve, touched):
+    '''
+    circles (gl_pos, pg_radius) against the first m boxes in pixel space, touched[i]: circle i overlaps a wall
+    resolve: every overlap pushes the circle out along the wall normal (summed over walls), gl_pos moves in place
+    a center inside a box is pushed out through the nearest face
+    '''
+    for i in range(len(gl_pos)):
+        x = gl_pos[i, 0] * pixel_scale[0]
+        y = gl_pos[i, 1] * pixel_scale[1]
+        radius = pg_radius[i]
+        push_x = 0.0
+        push_y = 0.0
+        touched[i] = False
+        for j in range(m):
+            min_x = boxes[j, 0] * pixel_scale[0]
+            min_y = boxes[j, 1] * pixel_scale[1]
+            max_x = boxes[j, 2] * pixel_scale[0]
+            max_y = boxes[j, 3] * pixel_scale[1]
+            delta_x = x - min(max(x, min_x), max_x)
+            delta_y = y - min(max(y, min_y), max_y)
+            dist = np.sqrt(delta_x * delta_x + delta_y * delta_y)
+            if dist < EPSILON:
+                # faces -x, -y, +x, +y
+                face_dist = x - min_x
+                normal_x, normal_y = -1.0, 0.0
+                if y - min_y < face_dist:
+                    face_dist = y - min_y
+                    normal_x, normal_y = 0.0, -1.0
+                if max_x - x < face_dist:
+                    face_dist = max_x - x
+                    normal_x, normal_y = 1.0, 0.0
+                if max_y - y < face_dist:
+                    face_dist = max_y - y
+                    normal_x, normal_y = 0.0, 1.0
+                depth = radius + face_dist
+            else:
+                depth = radius - dist
+                normal_x = delta_x / dist
+                normal_y = delta_y / dist
+            if depth <= 0:
+                continue
+            touched[i] = True
+            if not resolve:
+                break
+            push_x += depth * normal_x
+            push_y += depth * normal_y
+        if resolve:
+            gl_pos[i, 0] += push_x / pixel_scale[0]
+            gl_pos[i, 1] += push_y / pixel_scale[1]
+
+
+class World:
+    '''
+    memory mapped world file with LRU set of resident chunks
+    '''
+    def __init__(self, path: str, max_resident: int = MAX_RESIDENT_CHUNKS) -> None:
+        self.path = path
+        with open(path, 'rb') as world_file:
+            header = struct.unpack(HEADER_FORMAT, world_file.read(HEADER_SIZE))
+        magic, version, _, chunk_size, origin_x, origin_y, chunks_x, chunks_y, wall_count = header
+        if magic != WORLD_MAGIC or version != WORLD_VERSION:
+            raise ValueError(f'{path} is not a world file (version {WORLD_VERSION})')
+        self.chunk_size = chunk_size
+        self.origin = np.array([origin_x, origin_y], dtype=np.float32)
+        self.chunks_shape = (chunks_x, chunks_y)
+        self.chunk_table = np.memmap(
+            path, dtype=CHUNK_DTYPE, mode='r', offset=HEADER_SIZE, shape=(chunks_x * chunks_y,)
+        )
+        walls_offset = HEADER_SIZE + self.chunk_table.nbytes
+        if wall_count == 0:
+            self.walls = np.zeros((0, WALL_FIELDS), dtype='<f4')  # nothing to map, np.memmap rejects empty ranges
+        else:
+            self.walls = np.memmap(
+                path, dtype='<f4', mode='r', offset=walls_offset, shape=(wall_count, WALL_FIELDS)
+            )
+        self.max_resident = max_resident
+        self.resident: Dict[Tuple[int, int], WallChunk] = OrderedDict()
+        self.view_keys = set()  # chunks of the last boxes_in(keep=True) rectangle (render view), stream keeps them
+        # circle queries gather walls of resident chunks here (grown on demand), touched masks are returned as views
+        self.query_boxes = np.zeros((64, WALL_FIELDS), dtype=np.float32)
+        self.query_keys = np.zeros((max_resident, 2), dtype=np.int64)
+        self.touched = np.zeros(64, dtype=np.bool_)
+        self.loads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.resident)
+
+    @property
+    def gl_min(self) -> np.array:
+        return self.origin
+
+    @property
+    def gl_max(self) -> np.array:
+        return self.origin + self.chunk_size * np.array(self.chunks_shape, dtype=np.float32)
+
+    # ===== STREAMING =====
+    def chunk_of(self, gl_pos: np.array) -> Tuple[int, int]:
+        cx, cy = np.floor((np.asarray(gl_pos, dtype=np.float32) - self.origin) / self.chunk_size).astype(int)
+        return int(cx), int(cy)
+
+    def chunk(self, key: Tuple[int, int]) -> WallChunk:
+        '''
+        resident chunk (loaded on demand), out of world keys give empty chunks
+        '''
+        chunk = self.resident.get(key)
+        if chunk is not None:
+            self.resident.move_to_end(key)
+            return chunk
+        cx, cy = key
+        chunks_x, chunks_y = self.chunks_shape
+        if 0 <= cx < chunks_x and 0 <= cy < chunks_y:
+            first, count = self.chunk_table[cy * chunks_x + cx]
+            boxes = self.walls[first:first + count]
+        else:
+            boxes = self.walls[:0]
+        chunk = WallChunk(key, boxes)
+        self.resident[key] = chunk
+        self.loads += 1
+        while len(self.resident) > self.max_resident:
+            self.resident.popitem(last=False)  # evict least recently used
+            self.evictions += 1
+        return chunk
+
+    def stream(self, centers_gl_pos: Iterable[np.array], radius: int = STREAM_RADIUS) -> None:
+        '''
+        keeps chunks within radius of every center (player, camera) and the render view resident, evicts the rest
+        '''
+        wanted = set(self.view_keys)
+        for center in centers_gl_pos:
+            cx, cy = self.chunk_of(center)
+            wanted.update((cx + dx, cy + dy) for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1))
+        for key in [key for key in self.resident if key not in wanted]:
+            del self.resident[key]
+            self.evictions += 1
+        for key in wanted:
+            self.chunk(key)
+
+    # ===== QUERIES =====
+    def boxes_in(self, gl_min: np.array, gl_max: np.array, keep: bool = False) -> np.array:
+        '''
+        (M, 4) walls of all chunks overlapping the rectangle
+        keep: rectangle is the render view, its chunks stay resident across stream calls until the next keep query
+        '''
+        cx_min, cy_min = self.chunk_of(gl_min)
+        cx_max, cy_max = self.chunk_of(gl_max)
+        keys = [(cx, cy) for cx in range(cx_min, cx_max + 1) for cy in range(cy_min, cy_max + 1)]
+        if keep:
+            self.view_keys = set(keys)
+        chunks = [self.chunk(key).boxes for key in keys]
+        chunks = [boxes for boxes in chunks if len(boxes) > 0]
+        if len(chunks) == 0:
+            return self.walls[:0]
+        if len(chunks) == 1:
+            return chunks[0]
+        return np.unique(np.concatenate(chunks), axis=0)  # drop walls shared by several chunks
+
+    def nearby_boxes(self, gl_pos: np.array, pg_radius: np.array) -> int:
+        '''
+        gathers walls of the resident chunks around circles (bounding box plus reach) into query_boxes,
+        returns their count, chunks outside the streamed set are not loaded (stream would evict them again)
+        '''
+        reach_x, reach_y = float(pg_radius.max()) / GL_TO_PIXELS
+        cx_min, cy_min = self.chunk_of((float(gl_pos[:, 0].min()) - reach_x, float(gl_pos[:, 1].min()) - reach_y))
+        cx_max, cy_max = self.chunk_of((float(gl_pos[:, 0].max()) + reach_x, float(gl_pos[:, 1].max()) + reach_y))
+        count = 0
+        n_gathered = 0
+        chunk_size = np.float32(self.chunk_size)
+        chunks_x, chunks_y = self.chunks_shape
+        for (cx, cy), chunk in self.resident.items():
+            if len(chunk) == 0 or not (cx_min <= cx <= cx_max and cy_min <= cy <= cy_max):
+                continue
+            if count + len(chunk) > len(self.query_boxes):
+                grown = np.zeros((2 * (count + len(chunk)), WALL_FIELDS), dtype=np.float32)
+                grown[:count] = self.query_boxes[:count]
+                self.query_boxes = grown
+            count = gather_chunk_boxes(
+                chunk.boxes, self.origin, chunk_size, chunks_x, chunks_y, self.query_keys, n_gathered,
+                self.query_boxes, count
+            )
+            self.query_keys[n_gathered] = cx, cy
+            n_gathered += 1
+        return count
+
+    def query_circles(self, gl_pos: np.array, pg_radius: np.array, resolve: bool) -> np.array:
+        n = len(gl_pos)
+        if n > len(self.touched):
+            self.touched = np.zeros(2 * n, dtype=np.bool_)
+        touched = self.touched[:n]
+        if n == 0:
+            return touched
+        m = self.nearby_boxes(gl_pos, pg_radius)
+        push_circles(gl_pos, pg_radius, self.query_boxes, m, GL_TO_PIXELS, resolve, touched)
+        return touched
+
+    def resolve_circles(self, gl_pos: np.array, pg_radius: np.array) -> np.array:
+        '''
+        pushes (N, 2) circles out of walls in place, returns bool mask of circles that touched a wall
+        (view of a buffer reused by the next query)
+        '''
+        return self.query_circles(gl_pos, pg_radius, True)
+
+    def hit_circles(self, gl_pos: np.array, pg_radius: np.array) -> np.array:
+        '''
+        bool mask of (N, 2) circles overlapping any wall (view of a buffer reused by the next query)
+        '''
+        return self.query_circles(gl_pos, pg_radius, False)
+
+
+# ===== WRITING =====
+def write_world(path: str, boxes: np.array, chunks_shape: Tuple[int, int],
+                chunk_size: float = CHUNK_SIZE, origin: Tuple[float, float] = None) -> None:
+    '''
+    boxes: (N, 4) walls in gl coordinates, origin defaults to a world centered at (0, 0)
+    '''
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, WALL_FIELDS)
+    chunks_x, chunks_y = chunks_shape
+    if origin is None:
+        origin = (-0.5 * chunk_size * chunks_x, -0.5 * chunk_size * chunks_y)
+    origin = np.asarray(origin, dtype=np.float32)
+
+    # every wall goes to all chunks it overlaps
+    first_chunk = np.clip(np.floor((boxes[:, :2] - origin) / chunk_size).astype(np.int64), 0, (chunks_x - 1, chunks_y - 1))
+    last_chunk = np.clip(np.floor((boxes[:, 2:] - origin) / chunk_size).astype(np.int64), 0, (chunks_x - 1, chunks_y - 1))
+    wall_index, chunk_index = [], []
+    for i, ((x0, y0), (x1, y1)) in enumerate(zip(first_chunk, last_chunk)):
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                wall_index.append(i)
+                chunk_index.append(cy * chunks_x + cx)
+    wall_index = np.array(wall_index, dtype=np.int64)
+    chunk_index = np.array(chunk_index, dtype=np.int64)
+    order = np.argsort(chunk_index, kind='stable')
+
+    table = np.zeros(chunks_x * chunks_y, dtype=CHUNK_DTYPE)
+    table['count'] = np.bincount(chunk_index, minlength=len(table))
+    table['first'] = np.cumsum(table['count']) - table['count']
+    walls = boxes[wall_index[order]]
+
+    with open(path, 'wb') as world_file:
+        world_file.write(struct.pack(
+            HEADER_FORMAT, WORLD_MAGIC, WORLD_VERSION, 0, chunk_size, origin[0], origin[1],
+            chunks_x, chunks_y, len(walls)
+        ))
+        world_file.write(table.tobytes())
+        world_file.write(walls.astype('<f4').tobytes())
+
+
+def generate_arena(path: str, chunks_shape: Tuple[int, int] = (16, 16), walls_per_chunk: int = 6,
+                   seed: int = 0, chunk_size: float = CHUNK_SIZE) -> None:
+    '''
+    border walls plus random pillars, keeps the chunk around (0, 0) free for the player spawn
+    '''
+    rng = np.random.default_rng(seed)
+    chunks_x, chunks_y = chunks_shape
+    half_w, half_h = 0.5 * chunk_size * chunks_x, 0.5 * chunk_size * chunks_y
+    thickness = 0.05
+    border = [
+        (-half_w, -half_h, half_w, -half_h + thickness), (-half_w, half_h - thickness, half_w, half_h),
+        (-half_w, -half_h, -half_w + thickness, half_h), (half_w - thickness, -half_h, half_w, half_h),
+    ]
+    n = chunks_x * chunks_y * walls_per_chunk
+    centers = rng.uniform((-half_w, -half_h), (half_w, half_h), size=(n, 2))
+    centers = centers[np.abs(centers).max(axis=1) > chunk_size]
+    extents = rng.uniform(0.03, 0.25, size=(len(centers), 2))
+    pillars = np.concatenate((centers - extents, centers + extents), axis=1)
+    write_world(path, np.concatenate((np.array(border), pillars)), chunks_shape, chunk_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='write a generated arena world file, play it with main.py --world PATH')
+    parser.add_argument('path')
+    parser.add_argument('--chunks', type=int, nargs=2, default=(16, 16), metavar=('X', 'Y'))
+    parser.add_argument('--walls-per-chunk', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_arena(args.path, tuple(args.chunks), args.walls_per_chunk, args.seed)
+    world = World(args.path)
+    print(f'{args.path}: {world.chunks_shape[0]}x{world.chunks_shape[1]} chunks, {len(world.walls)} wall records')
+
+
+if __name__ == '__main__':
+    main()
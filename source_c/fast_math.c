@@ -1,31 +1,73 @@
 #include <stdio.h>
+#include <stdint.h>
+#include <string.h>
 #include <math.h>
 
+#include "fast_math.h"
+
 float Q_rsqrt(float number)  // understand it later
 {
-    long i;
+    int32_t i;  // must be 32 bit (long is 64 bit on linux)
     float x2, y;
     const float threehalfs = 1.5F;
 
     x2 = number * 0.5F;
     y  = number;
-    i  = * ( long * ) &y;                       // evil floating point bit level hacking
+    memcpy(&i, &y, sizeof(i));                  // evil floating point bit level hacking (without breaking strict aliasing)
     i  = 0x5f3759df - ( i >> 1 );               // what the fuck?
-    y  = * ( float * ) &i;
+    memcpy(&y, &i, sizeof(y));
     y  = y * ( threehalfs - ( x2 * y * y ) );   // 1st iteration
     // y  = y * ( threehalfs - ( x2 * y * y ) );   // 2nd iteration, this can be removed
 
     return y;
 }
 
-float map_opengl_to_screen_2d(float x, float y, short int w, short int h, float* result) {
+void map_opengl_to_screen_2d(float x, float y, short int w, short int h, float* result) {
     result[0] = (x + 1) * 0.5 * w;
     result[1] = (-y + 1) * 0.5 * h;
 }
 
-float map_screen_to_opengl(float x, float y, short int w, short int h, float* result) {
+void map_screen_to_opengl(float x, float y, short int w, short int h, float* result) {
     result[0] = -1 + x * (2.0 / w);
     result[1] = -y * (2.0 / h) + 1;
 }
 
+// ======== batch kernels
+
+void batch_rsqrt(const float* numbers, float* result, int n) {
+    for (int i = 0; i < n; i++) {
+        result[i] = Q_rsqrt(numbers[i]);
+    }
+}
+
+void batch_normalize_2d(float* vectors, int n) {
+    for (int i = 0; i < n; i++) {
+        float x = vectors[2 * i];
+        float y = vectors[2 * i + 1];
+        float inv_norm = Q_rsqrt(x * x + y * y);
+        vectors[2 * i] = x * inv_norm;
+        vectors[2 * i + 1] = y * inv_norm;
+    }
+}
+
+void distance_matrix_2d(const float* a, int na, const float* b, int nb, float* result) {
+    for (int i = 0; i < na; i++) {
+        float ax = a[2 * i];
+        float ay = a[2 * i + 1];
+        float* row = result + (size_t)i * nb;
+        for (int j = 0; j < nb; j++) {
+            float dx = ax - b[2 * j];
+            float dy = ay - b[2 * j + 1];
+            row[j] = sqrtf(dx * dx + dy * dy);
+        }
+    }
+}
 
+void affine_transform_2d(const float* points, float* result, int n, const float* scale, const float* offset) {
+    const float sx = scale[0], sy = scale[1];
+    const float ox = offset[0], oy = offset[1];
+    for (int i = 0; i < n; i++) {
+        result[2 * i] = points[2 * i] * sx + ox;
+        result[2 * i + 1] = points[2 * i + 1] * sy + oy;
+    }
+}
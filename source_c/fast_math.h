@@ -1,5 +1,28 @@
+#ifndef FAST_MATH_H
+#define FAST_MATH_H
+
+#if defined(_WIN32)
+    #define FAST_MATH_API __declspec(dllexport)
+#else
+    #define FAST_MATH_API __attribute__((visibility("default")))
+#endif
+
+#ifdef __cplusplus
 extern "C" {
-    __declspec(dllexport) float Q_rsqrt(float number);
-    __declspec(dllexport) float map_opengl_to_screen_2d(float x, float y, short int w, short int h, float* result);
-    __declspec(dllexport) float map_screen_to_opengl(float x, float y, short int w, short int h, float* result);
+#endif
+
+FAST_MATH_API float Q_rsqrt(float number);
+FAST_MATH_API void map_opengl_to_screen_2d(float x, float y, short int w, short int h, float* result);
+FAST_MATH_API void map_screen_to_opengl(float x, float y, short int w, short int h, float* result);
+
+// batch kernels, all arrays are contiguous float32, points are (n, 2) row-major
+FAST_MATH_API void batch_rsqrt(const float* numbers, float* result, int n);
+FAST_MATH_API void batch_normalize_2d(float* vectors, int n);
+FAST_MATH_API void distance_matrix_2d(const float* a, int na, const float* b, int nb, float* result);
+FAST_MATH_API void affine_transform_2d(const float* points, float* result, int n, const float* scale, const float* offset);
+
+#ifdef __cplusplus
 }
+#endif
+
+#endif